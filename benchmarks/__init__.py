@@ -0,0 +1 @@
+"""Бенчмарки Sleep-Ai. Запускаются из корня проекта: `python -m benchmarks.<имя>`."""
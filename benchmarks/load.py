@@ -0,0 +1,257 @@
+"""Нагрузочный тест с заглушками Gemini, Telegraph и Telegram.
+
+Приложение собирается так же, как в main.py, с общим httpx AsyncClient,
+но внешние сервисы заменены заглушками из benchmarks.standins, а база
+данных - временный SQLite. Каждый сценарий выполняется с постоянной частотой
+запросов (открытая модель: запросы отправляются по расписанию, не дожидаясь
+предыдущих), в конце печатаются пропускная способность и p50/p95/p99.
+
+Сценарии:
+    api.add        POST /api/add, до ответа 202
+    api.add.done   POST /api/add и ожидание задачи (опрос /api/jobs/{id}), полный путь через AI и базу
+    api.memory     GET /api/memory/{id}
+    bot.create     диалог /create -> название -> содержание в хэндлерах бота, ответ AI стримится
+    bot.memory     /memory <id> в хэндлерах бота
+
+    python -m benchmarks.load --rps 20 --seconds 10
+    python -m benchmarks.load --scenario api.memory --rps 200 --save
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from aiogram.types import Chat, Message, Update, User
+from httpx import AsyncClient
+from loguru import logger
+from sqlalchemy import insert, select
+
+from src.bot import setup_bot
+from src.core import config
+from src.core.entites.models import SleepMemory, upgrade_schema
+from src.core.manager import MemoryManager
+from src.core.manager.ai import ResponseCache, create_ai
+from src.core.manager.backfill import BackfillManager
+from src.core.manager.create_memory import CreateMemoryManager
+from src.core.manager.jobs import JobManager
+from src.core.service import Telegraph
+from src.core.storage import create_storage
+from src.frontend import setup_frontend
+
+from . import results, standins
+
+
+SCENARIOS = ("api.add", "api.add.done", "api.memory", "bot.create", "bot.memory")
+
+
+async def run_scenario(
+    rps: float, seconds: float, call: Callable[[int], Awaitable[bool]]
+) -> tuple[results.Recorder, float]:
+    """Вызывать call с частотой rps в течение seconds секунд
+
+    Returns:
+        tuple[results.Recorder, float]: Замеры и время от первого запроса до последнего ответа.
+    """
+    recorder = results.Recorder()
+    tasks: set[asyncio.Task] = set()
+    started = time.perf_counter()
+    for number in range(int(rps * seconds)):
+        await asyncio.sleep(max(0.0, started + number / rps - time.perf_counter()))
+        task = asyncio.create_task(recorder.measure(lambda n=number: call(n)))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return recorder, time.perf_counter() - started
+
+
+class Application:
+    """Приложение, собранное как в main.py, но с заглушками вместо внешних сервисов"""
+
+    def __init__(self, directory: Path, urls: dict[str, str]):
+        config.database_url = f"sqlite+aiosqlite:///{directory / 'load.db'}"
+        config.vector_index_path = str(directory / "vectors")
+        config.gemini_base_url = urls["gemini"]
+        config.telegraph_base_url = urls["telegraph"]
+        config.telegram_api_url = urls["telegram"]
+        config.gemini_api_key = "stand-in"
+        config.gemini_model = config.gemini_model or "gemini-2.5-flash"
+        config.gemini_context_cache = False
+        config.ai_backends = None
+        config.access_token = None
+        config.proxy = None
+        # ограничения на клиента и очередь мерили бы сами себя
+        config.ai_client_rpm = 1_000_000
+        config.ai_client_burst = 1_000_000
+        config.ai_queue_size = 1_000_000
+        self.users = itertools.count(1_000)
+        self.updates = itertools.count(1)
+
+    async def start(self) -> None:
+        self.storage = create_storage()
+        async with self.storage.engine.begin() as conn:
+            await conn.run_sync(upgrade_schema)
+
+        self.client = AsyncClient()
+        telegraph = Telegraph(self.client)
+        ai = create_ai(self.client, cache=ResponseCache(self.storage.engine))
+        api = MemoryManager(self.storage.engine, reader=self.storage.reader)
+        self.manager = CreateMemoryManager(ai, telegraph, api)
+        self.jobs = JobManager(self.manager, self.storage.engine)
+        backfill = BackfillManager(self.manager.scheduler, api)
+
+        await self.manager.search.setup()
+        await self.manager.similar.setup()
+        await self.manager.publisher.start()
+        await self.jobs.start()
+
+        frontend = setup_frontend(self.manager, self.jobs, backfill)
+        self.server, self.server_task, url = await standins.serve(frontend.app)
+        self.http = AsyncClient(base_url=url, timeout=120)
+        self.bot = await setup_bot(self.manager, token="123456:stand-in")
+
+    async def stop(self) -> None:
+        self.server.should_exit = True
+        await self.server_task
+        await self.http.aclose()
+        await self.bot.bot.session.close()
+        await self.jobs.stop()
+        await self.manager.publisher.stop()
+        self.manager.similar.close()
+        await self.client.aclose()
+        await self.storage.dispose()
+
+    async def seed(self, rows: int) -> list[int]:
+        async with self.storage.engine.begin() as conn:
+            await conn.execute(
+                insert(SleepMemory),
+                [
+                    {
+                        "title": f"Сон {i}",
+                        "content": "Текст сна " * 50,
+                        "ai_thoughts": "…",
+                    }
+                    for i in range(rows)
+                ],
+            )
+            return list((await conn.scalars(select(SleepMemory.id))).all())
+
+    async def submit(self, number: int) -> str | None:
+        """Отправить воспоминание через POST /api/add
+
+        Returns:
+            str | None: id задачи или None, если запрос не принят.
+        """
+        response = await self.http.post(
+            "/api/add",
+            json={
+                "title": f"Сон {number}",
+                "content": f"Текст сна {number} {random.random()}",
+            },
+        )
+        if response.status_code != 202:
+            return None
+        return response.json()["content"]["id"]
+
+    async def api_add(self, number: int) -> bool:
+        return await self.submit(number) is not None
+
+    async def api_add_done(self, number: int) -> bool:
+        job = await self.submit(number)
+        if job is None:
+            return False
+        while True:
+            await asyncio.sleep(0.05)
+            status = (await self.http.get(f"/api/jobs/{job}")).json()["content"][
+                "status"
+            ]
+            if status in ("done", "failed"):
+                return status == "done"
+
+    async def api_memory(self, ids: list[int]) -> bool:
+        response = await self.http.get(f"/api/memory/{random.choice(ids)}")
+        return response.status_code == 200
+
+    async def bot_message(self, user: int, text: str) -> None:
+        message = Message(
+            message_id=next(self.updates),
+            date=datetime.now(),
+            chat=Chat(id=user, type="private"),
+            from_user=User(id=user, is_bot=False, first_name="Load"),
+            text=text,
+        )
+        await self.bot.dispatcher.feed_update(
+            self.bot.bot, Update(update_id=message.message_id, message=message)
+        )
+
+    async def bot_create(self, number: int) -> bool:
+        user = next(self.users)
+        await self.bot_message(user, "/create")
+        await self.bot_message(user, f"Сон {number}")
+        await self.bot_message(user, f"Текст сна {number} {random.random()}")
+        return True
+
+    async def bot_memory(self, ids: list[int]) -> bool:
+        await self.bot_message(next(self.users), f"/memory {random.choice(ids)}")
+        return True
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument(
+        "--save", action="store_true", help="Сохранить результаты как базовые"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="Порог ухудшения, доля"
+    )
+    standins.add_arguments(parser)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    stubs = standins.from_arguments(args)
+    await stubs.start()
+    with tempfile.TemporaryDirectory() as directory:
+        app = Application(Path(directory), stubs.urls)
+        await app.start()
+        try:
+            ids = await app.seed(args.rows)
+            calls = {
+                "api.add": app.api_add,
+                "api.add.done": app.api_add_done,
+                "api.memory": lambda n: app.api_memory(ids),
+                "bot.create": app.bot_create,
+                "bot.memory": lambda n: app.bot_memory(ids),
+            }
+            summary = {}
+            for name in args.scenario or SCENARIOS:
+                recorder, elapsed = await run_scenario(
+                    args.rps, args.seconds, calls[name]
+                )
+                summary[name] = recorder.summary(elapsed)
+        finally:
+            await app.stop()
+            await stubs.stop()
+
+    print(f"rps={args.rps:g}, seconds={args.seconds:g}, upstream={stubs.stats()}\n")
+    # сравнивать имеет смысл только прогоны с той же частотой
+    ok = results.report(f"load-{args.rps:g}rps", summary, args.save, args.threshold)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
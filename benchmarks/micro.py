@@ -0,0 +1,99 @@
+"""Микробенчмарки горячих функций: Telegraph._create_nodes и MemoryManager.build_memory.
+
+Результаты сравниваются с сохранёнными (--save), чтобы видеть ухудшения
+после изменений.
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro --save
+"""
+
+import argparse
+import random
+import sys
+import timeit
+
+from datetime import datetime
+
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core.entites.models import SleepMemory
+from src.core.entites.schemas import SleepMemoryCreateModel
+from src.core.manager import MemoryManager
+from src.core.manager.outbox import MEMORY_TEXT
+from src.core.service import Telegraph
+
+from . import results
+from .telegraph_nodes import ai_thoughts
+
+
+PAYLOADS = {"short": (1, 0), "typical": (3, 1), "long": (8, 2), "deep": (3, 12)}
+"""Размеры ответа AI: абзацев в разделе и глубина вложенности тегов."""
+
+
+def measure(func, repeat: int, number: int) -> dict[str, float]:
+    times = timeit.repeat(func, repeat=repeat, number=number)
+    return {
+        "best_us": min(times) / number * 1e6,
+        "mean_us": sum(times) / len(times) / number * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument(
+        "--save", action="store_true", help="Сохранить результаты как базовые"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="Порог ухудшения, доля"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    summary = {}
+
+    telegraph = Telegraph(AsyncClient())
+    for name, (paragraphs, nesting) in PAYLOADS.items():
+        content = MEMORY_TEXT.format(
+            id=1,
+            title="Сон",
+            content="Текст сна",
+            thoughts=ai_thoughts(rng, paragraphs, nesting),
+        )
+        summary[f"create_nodes.{name}"] = measure(
+            lambda content=content: telegraph._create_nodes(content),
+            args.repeat,
+            max(1, args.number // 10),
+        )
+
+    memory = MemoryManager(create_async_engine("sqlite+aiosqlite://"), cache_size=0)
+    thoughts = ai_thoughts(rng, 3, 1)
+    created = SleepMemoryCreateModel(
+        title="Сон", content="Текст сна " * 50, ai_thoughts=thoughts
+    )
+    stored = SleepMemory(
+        id=1,
+        title="Сон",
+        content="Текст сна " * 50,
+        ai_thoughts=thoughts,
+        created_at=datetime.now(),
+        updated_at=datetime.now(),
+        telegraph_url="https://telegra.ph/x",
+    )
+    summary["build_memory.to_row"] = measure(
+        lambda: memory.build_memory(created), args.repeat, args.number * 50
+    )
+    summary["build_memory.to_model"] = measure(
+        lambda: memory.build_memory(stored), args.repeat, args.number * 50
+    )
+
+    ok = results.report("micro", summary, args.save, args.threshold)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Замеры задержки и хранение результатов бенчмарков для сравнения между запусками.
+
+Результаты набора сохраняются в JSON (--save), следующий запуск сравнивается
+с сохранённым и помечает метрики, которые ухудшились больше порога.
+"""
+
+import json
+import platform
+import time
+
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+RESULTS_DIR = Path("var/benchmarks")
+
+LOWER_IS_BETTER = ("ms", "us")
+"""Суффиксы метрик, у которых меньше - лучше, у остальных (throughput) больше - лучше."""
+
+
+class Recorder:
+    """Задержки и ошибки одного сценария"""
+
+    def __init__(self):
+        self.ok = 0
+        self.errors = 0
+        self.latencies: list[float] = []
+
+    async def measure(self, call) -> None:
+        started = time.perf_counter()
+        try:
+            ok = await call()
+        except Exception:
+            ok = False
+        self.latencies.append(time.perf_counter() - started)
+        if ok is False:
+            self.errors += 1
+        else:
+            self.ok += 1
+
+    def percentile(self, q: float) -> float:
+        """Перцентиль задержки в миллисекундах"""
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+
+    def summary(self, elapsed: float) -> dict[str, float]:
+        return {
+            "throughput": self.ok / elapsed if elapsed else 0.0,
+            "errors": self.errors,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+        }
+
+
+def path(suite: str, directory: Path = RESULTS_DIR) -> Path:
+    return directory / f"{suite}.json"
+
+
+def save(
+    suite: str, results: dict[str, dict[str, float]], directory: Path = RESULTS_DIR
+) -> Path:
+    """Сохранить результаты набора как базовые для следующих сравнений"""
+    file = path(suite, directory)
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_text(
+        json.dumps(
+            {
+                "suite": suite,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.node(),
+                "results": results,
+            },
+            ensure_ascii=False,
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    return file
+
+
+def load(
+    suite: str, directory: Path = RESULTS_DIR
+) -> dict[str, dict[str, float]] | None:
+    file = path(suite, directory)
+    if not file.exists():
+        return None
+    return json.loads(file.read_text(encoding="utf-8"))["results"]
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """Метрики, которые ухудшились больше чем на threshold (доля, например 0.1)
+
+    Returns:
+        list[str]: Строки вида "api.memory p95_ms: 12.0 -> 15.3 (+27%)".
+    """
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            if not before or metric == "errors":
+                continue
+            change = (value - before) / before
+            worse = change if metric.endswith(LOWER_IS_BETTER) else -change
+            if worse > threshold:
+                regressions.append(
+                    f"{name} {metric}: {before:.2f} -> {value:.2f} ({change:+.0%})"
+                )
+    return regressions
+
+
+def print_table(results: dict[str, dict[str, float]]) -> None:
+    columns = list(
+        dict.fromkeys(key for metrics in results.values() for key in metrics)
+    )
+    print(f"{'name':<24}" + "".join(f"{column:>14}" for column in columns))
+    for name, metrics in results.items():
+        print(
+            f"{name:<24}"
+            + "".join(f"{metrics.get(column, 0):>14.2f}" for column in columns)
+        )
+
+
+def report(
+    suite: str,
+    results: dict[str, dict[str, float]],
+    store: bool,
+    threshold: float,
+    directory: Path = RESULTS_DIR,
+) -> bool:
+    """Напечатать результаты, сравнить с сохранёнными и при store сохранить
+
+    Returns:
+        bool: False, если есть ухудшения больше порога.
+    """
+    print_table(results)
+    baseline = load(suite, directory)
+    regressions = [] if baseline is None else compare(results, baseline, threshold)
+    if baseline is None:
+        print(f"\nСохранённых результатов {suite} нет, сравнивать не с чем")
+    elif regressions:
+        print(f"\nУхудшения больше {threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+    else:
+        print(f"\nУхудшений больше {threshold:.0%} нет")
+
+    if store:
+        print(f"Результаты сохранены в {save(suite, results, directory)}")
+    return not regressions
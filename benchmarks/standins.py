@@ -0,0 +1,340 @@
+"""Заглушки Gemini, Telegraph и Telegram Bot API для нагрузочного тестирования без внешних сервисов.
+
+Задержка каждого ответа берётся из распределения, часть ответов - ошибки 503.
+Приложение направляется на заглушки через GEMINI_BASE_URL, TELEGRAPH_BASE_URL
+и TELEGRAM_API_URL, поэтому так можно нагрузить и обычный main.py:
+
+    python -m benchmarks.standins --gemini-latency lognormal:800,0.5 --gemini-errors 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from dataclasses import dataclass
+from itertools import count
+from urllib.parse import parse_qs
+
+import uvicorn
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .telegraph_nodes import ai_thoughts
+
+
+@dataclass
+class Latency:
+    """Распределение задержки: fixed:MS, uniform:MIN,MAX или lognormal:MEDIAN,SIGMA (в мс)"""
+
+    kind: str
+    a: float
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        kind, _, values = spec.partition(":")
+        numbers = [float(value) for value in values.split(",") if value]
+        if kind not in ("fixed", "uniform", "lognormal") or not numbers:
+            raise argparse.ArgumentTypeError(f"Неизвестное распределение: {spec}")
+        return cls(kind, *numbers[:2])
+
+    def sample(self, rng: random.Random) -> float:
+        """Задержка в секундах"""
+        if self.kind == "uniform":
+            ms = rng.uniform(self.a, self.b)
+        elif self.kind == "lognormal":
+            ms = rng.lognormvariate(0, self.b) * self.a
+        else:
+            ms = self.a
+        return ms / 1000
+
+
+@dataclass
+class Upstream:
+    """Поведение одной заглушки"""
+
+    latency: Latency
+    error_rate: float = 0.0
+    seed: int = 0
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+        self.requests = 0
+        self.failed = 0
+
+    async def delay(self) -> bool:
+        """Подождать задержку ответа
+
+        Returns:
+            bool: False, если этот ответ должен быть ошибкой.
+        """
+        self.requests += 1
+        await asyncio.sleep(self.latency.sample(self.rng))
+        if self.rng.random() < self.error_rate:
+            self.failed += 1
+            return False
+        return True
+
+
+def gemini_app(upstream: Upstream, chunks: int = 8) -> FastAPI:
+    """Заглушка generateContent и streamGenerateContent Gemini API"""
+    app = FastAPI()
+    rng = random.Random(upstream.seed)
+    error = {"error": {"code": 503, "message": "stand-in", "status": "UNAVAILABLE"}}
+
+    def response(text: str, prompt: int, final: bool = True) -> dict:
+        result = {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    **({"finishReason": "STOP"} if final else {}),
+                }
+            ],
+            "modelVersion": "stand-in",
+        }
+        if final:
+            result["usageMetadata"] = {
+                "promptTokenCount": prompt // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": (prompt + len(text)) // 4,
+            }
+        return result
+
+    @app.post("/{version}/models/{call}")
+    async def generate(call: str, request: Request):
+        prompt = len(await request.body())
+        text = ai_thoughts(rng, paragraphs=3, nesting=1)
+        if call.endswith(":generateContent"):
+            if not await upstream.delay():
+                return JSONResponse(error, status_code=503)
+            return response(text, prompt)
+
+        # первый фрагмент через четверть задержки, остальные равномерно
+        total = upstream.latency.sample(upstream.rng)
+        upstream.requests += 1
+        await asyncio.sleep(total / 4)
+        if upstream.rng.random() < upstream.error_rate:
+            upstream.failed += 1
+            return JSONResponse(error, status_code=503)
+
+        size = -(-len(text) // chunks)
+        parts = [text[i : i + size] for i in range(0, len(text), size)]
+
+        async def events():
+            for number, part in enumerate(parts, 1):
+                if number > 1:
+                    await asyncio.sleep(total * 3 / 4 / len(parts))
+                data = response(part, prompt, final=number == len(parts))
+                yield f"data: {json.dumps(data)}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def telegraph_app(upstream: Upstream) -> FastAPI:
+    """Заглушка createAccount и createPage Telegraph API"""
+    app = FastAPI()
+    pages = count(1)
+
+    @app.api_route("/createAccount", methods=["GET", "POST"])
+    async def create_account():
+        if not await upstream.delay():
+            return JSONResponse({"ok": False, "error": "stand-in"}, status_code=503)
+        return {
+            "ok": True,
+            "result": {
+                "short_name": "ai-memory",
+                "author_name": "",
+                "author_url": "",
+                "access_token": "stand-in",
+                "auth_url": "https://edit.telegra.ph/auth/stand-in",
+            },
+        }
+
+    @app.api_route("/createPage", methods=["GET", "POST"])
+    async def create_page(request: Request):
+        if not await upstream.delay():
+            return JSONResponse({"ok": False, "error": "stand-in"}, status_code=503)
+        body = await request.json() if request.method == "POST" else {}
+        path = f"stand-in-{next(pages)}"
+        return {
+            "ok": True,
+            "result": {
+                "path": path,
+                "url": f"https://telegra.ph/{path}",
+                "title": body.get("title", ""),
+                "views": 0,
+            },
+        }
+
+    return app
+
+
+def telegram_app(upstream: Upstream) -> FastAPI:
+    """Заглушка Telegram Bot API: любые методы успешны, сообщения получают новые id"""
+    app = FastAPI()
+    messages = count(1)
+    user = {
+        "id": 1,
+        "is_bot": True,
+        "first_name": "Sleep-Ai",
+        "username": "sleep_ai_bot",
+    }
+
+    @app.post("/bot{token}/{method}")
+    async def call(method: str, request: Request):
+        if not await upstream.delay():
+            return JSONResponse(
+                {"ok": False, "error_code": 503, "description": "stand-in"},
+                status_code=503,
+            )
+        # aiogram без файлов отправляет x-www-form-urlencoded
+        form = {
+            key: values[0]
+            for key, values in parse_qs((await request.body()).decode()).items()
+        }
+        if method == "getMe":
+            return {"ok": True, "result": user}
+        if method == "getMyName":
+            return {"ok": True, "result": {"name": user["first_name"]}}
+        if method in ("sendMessage", "editMessageText"):
+            chat = int(form.get("chat_id", 0))
+            return {
+                "ok": True,
+                "result": {
+                    "message_id": int(form.get("message_id") or next(messages)),
+                    "date": int(time.time()),
+                    "chat": {"id": chat, "type": "private"},
+                    "from": user,
+                    "text": form.get("text", ""),
+                },
+            }
+        return {"ok": True, "result": True}
+
+    return app
+
+
+class StandIns:
+    """Запущенные заглушки и их адреса"""
+
+    def __init__(self, gemini: Upstream, telegraph: Upstream, telegram: Upstream):
+        self.upstreams = {
+            "gemini": gemini,
+            "telegraph": telegraph,
+            "telegram": telegram,
+        }
+        self.apps = {
+            "gemini": gemini_app(gemini),
+            "telegraph": telegraph_app(telegraph),
+            "telegram": telegram_app(telegram),
+        }
+        self.urls: dict[str, str] = {}
+        self._servers: list[uvicorn.Server] = []
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(
+        self, host: str = "127.0.0.1", ports: dict[str, int] | None = None
+    ) -> None:
+        for name, app in self.apps.items():
+            server, task, url = await serve(app, host, (ports or {}).get(name, 0))
+            self._servers.append(server)
+            self._tasks.append(task)
+            self.urls[name] = url
+
+    async def stop(self) -> None:
+        for server in self._servers:
+            server.should_exit = True
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        return {
+            name: {"requests": upstream.requests, "errors": upstream.failed}
+            for name, upstream in self.upstreams.items()
+        }
+
+
+async def serve(
+    app, host: str = "127.0.0.1", port: int = 0
+) -> tuple[uvicorn.Server, asyncio.Task, str]:
+    """Запустить ASGI приложение в текущем цикле событий
+
+    Returns:
+        tuple[uvicorn.Server, asyncio.Task, str]: Сервер, задача, в которой он работает, и его адрес.
+    """
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off")
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, task, f"http://{host}:{port}"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--gemini-latency",
+        type=Latency.parse,
+        default=Latency.parse("lognormal:800,0.4"),
+    )
+    parser.add_argument("--gemini-errors", type=float, default=0.0)
+    parser.add_argument(
+        "--telegraph-latency",
+        type=Latency.parse,
+        default=Latency.parse("lognormal:150,0.3"),
+    )
+    parser.add_argument("--telegraph-errors", type=float, default=0.0)
+    parser.add_argument(
+        "--telegram-latency", type=Latency.parse, default=Latency.parse("uniform:20,60")
+    )
+    parser.add_argument("--telegram-errors", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def from_arguments(args: argparse.Namespace) -> StandIns:
+    return StandIns(
+        Upstream(args.gemini_latency, args.gemini_errors, args.seed),
+        Upstream(args.telegraph_latency, args.telegraph_errors, args.seed + 1),
+        Upstream(args.telegram_latency, args.telegram_errors, args.seed + 2),
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    add_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8101,
+        help="Порт Gemini, Telegraph и Telegram - следующие",
+    )
+    args = parser.parse_args()
+
+    standins = from_arguments(args)
+    await standins.start(
+        args.host,
+        {"gemini": args.port, "telegraph": args.port + 1, "telegram": args.port + 2},
+    )
+    print(f"GEMINI_BASE_URL={standins.urls['gemini']}")
+    print(f"TELEGRAPH_BASE_URL={standins.urls['telegraph']}")
+    print(f"TELEGRAM_API_URL={standins.urls['telegram']}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await standins.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        ...
@@ -0,0 +1,123 @@
+"""Сравнение однопроходного Telegraph._create_nodes с прежней реализацией,
+которая заново парсила содержимое каждого тега.
+
+    python -m benchmarks.telegraph_nodes
+"""
+
+import argparse
+import random
+import timeit
+
+from bs4 import BeautifulSoup
+from httpx import AsyncClient
+
+from src.core.manager.outbox import MEMORY_TEXT
+from src.core.service import Telegraph
+from src.core.service.telegraph.schemas import Node
+
+
+SECTIONS = [
+    "Ключевые образы и символы",
+    "Эмоциональный фон",
+    "Интерпретация",
+    "Связь с реальностью",
+    "Вывод",
+]
+
+WORDS = (
+    "сон тревога лес дорога дом мать вода страх ночь окно лестница падение "
+    "поезд школа экзамен потеря контроль свет тень голос дверь ключ"
+).split()
+
+
+def legacy_create_nodes(content: str, features: str = "html.parser") -> list:
+    """Прежняя реализация: содержимое каждого тега сериализуется и парсится заново"""
+    soup = BeautifulSoup(content, features=features)
+    nodes: list = []
+
+    for child in soup:
+        if child.name is None:
+            nodes.append(str(child.string))
+            continue
+        tag = Node(
+            tag=child.name,
+            attrs=child.attrs,
+            children=legacy_create_nodes("".join(map(str, child.contents))),
+        )
+        nodes.append(tag)
+    return nodes
+
+
+def sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(8, 20))
+    i = rng.randrange(len(words))
+    words[i] = f"<i>{words[i]}</i>"
+    if rng.random() < 0.5:
+        j = rng.randrange(len(words))
+        words[j] = f"<u>{words[j]}</u>"
+    if rng.random() < 0.3:
+        k = rng.randrange(len(words))
+        words[k] = f"<code>{words[k]}</code>"
+    return " ".join(words).capitalize() + "."
+
+
+def ai_thoughts(rng: random.Random, paragraphs: int, nesting: int) -> str:
+    """Сгенерировать текст, похожий на ответ Gemini по PROMPT_TEMPLATE"""
+    parts = []
+    for number, section in enumerate(SECTIONS, start=1):
+        body = "\n\n".join(
+            " ".join(sentence(rng) for _ in range(3)) for _ in range(paragraphs)
+        )
+        for _ in range(nesting):
+            body = f"<i>{body} <u>{sentence(rng)}</u></i>"
+        parts.append(f"<b>{number}. {section}</b>\n{body}")
+    return "\n\n".join(parts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    telegraph = Telegraph(AsyncClient())
+    rng = random.Random(42)
+    payloads = {
+        "short": (1, 0),
+        "typical": (3, 1),
+        "long": (8, 2),
+        "deep": (3, 12),
+    }
+
+    print(f"{'payload':<10}{'size':>8}{'legacy, ms':>14}{'new, ms':>12}{'speedup':>10}")
+    for name, (paragraphs, nesting) in payloads.items():
+        content = MEMORY_TEXT.format(
+            id=1,
+            title="Сон",
+            content="Текст сна",
+            thoughts=ai_thoughts(rng, paragraphs, nesting),
+        )
+        assert legacy_create_nodes(content) == telegraph._create_nodes(content)
+
+        legacy = min(
+            timeit.repeat(
+                lambda content=content: legacy_create_nodes(content),
+                repeat=args.repeat,
+                number=args.number,
+            )
+        )
+        new = min(
+            timeit.repeat(
+                lambda content=content: telegraph._create_nodes(content),
+                repeat=args.repeat,
+                number=args.number,
+            )
+        )
+        print(
+            f"{name:<10}{len(content):>8}{legacy / args.number * 1000:>14.2f}"
+            f"{new / args.number * 1000:>12.2f}{legacy / new:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import sys
+
+from contextlib import asynccontextmanager, nullcontext
+from datetime import datetime
+from itertools import islice
+from typing import AsyncGenerator
+
+from loguru import logger
+from httpx import AsyncClient
+from src.core.entites.models import upgrade_schema
+from src.core.manager import MemoryManager
+from src.core.manager.ai import ResponseCache, create_ai
+from src.core.manager.backfill import BackfillManager
+from src.core.manager.export import MemoryExporter
+from src.core.manager.importer import MemoryImporter
+from src.core.manager.search import SearchManager
+from src.core.manager.similar import SimilarityIndex
+from src.core.entites.schemas import ExportFormat
+from src.core.storage import Storage, create_storage
+from src.core import config
+
+
+@asynccontextmanager
+async def open_storage() -> AsyncGenerator[Storage, None]:
+    """Создать движки базы данных и таблицы, как это делает main.py"""
+    storage = create_storage()
+    try:
+        async with storage.engine.begin() as conn:
+            await conn.run_sync(upgrade_schema)
+        yield storage
+    finally:
+        await storage.dispose()
+
+
+def memory_manager(storage: Storage) -> MemoryManager:
+    return MemoryManager(storage.engine, reader=storage.reader)
+
+
+async def backfill(args: argparse.Namespace) -> None:
+    async with open_storage() as storage, AsyncClient(proxy=config.proxy) as client:
+        ai = create_ai(client, cache=ResponseCache(storage.engine))
+        runner = BackfillManager(ai, memory_manager(storage))
+
+        report = await runner.run(
+            concurrency=args.concurrency,
+            rpm=args.rpm,
+            batch_size=args.batch_size,
+            resume=not args.restart,
+            publish=args.publish,
+        )
+        logger.info(report.model_dump_json())
+
+
+async def search_rebuild(args: argparse.Namespace) -> None:
+    async with open_storage() as storage:
+        search = SearchManager(memory_manager(storage))
+        await search.setup()
+        if not await search.rebuild():
+            logger.warning("Полнотекстовый поиск недоступен для этой базы данных")
+
+
+async def similar_rebuild(args: argparse.Namespace) -> None:
+    async with open_storage() as storage:
+        await SimilarityIndex(memory_manager(storage)).rebuild()
+
+
+async def export(args: argparse.Namespace) -> None:
+    async with open_storage() as storage:
+        exporter = MemoryExporter(memory_manager(storage))
+        # файл открывается и пишется в отдельном потоке, чтобы не блокировать цикл событий
+        output = (
+            await asyncio.to_thread(open, args.output, "wb")
+            if args.output
+            else nullcontext(sys.stdout.buffer)
+        )
+        with output as file:
+            async for chunk in exporter.export(
+                format=args.format,
+                date_from=args.date_from,
+                date_to=args.date_to,
+                after_id=args.after_id,
+                gzip=args.gzip,
+            ):
+                await asyncio.to_thread(file.write, chunk)
+
+
+READ_BATCH = 1000
+"""Сколько строк импорта читать из файла за один переход в поток."""
+
+
+async def read_lines(path: str) -> AsyncGenerator[bytes, None]:
+    """Построчно прочитать файл или stdin, если путь '-'.
+    Чтение идёт в отдельном потоке пачками по READ_BATCH строк, чтобы не блокировать цикл событий"""
+    source = (
+        nullcontext(sys.stdin.buffer)
+        if path == "-"
+        else await asyncio.to_thread(open, path, "rb")
+    )
+    with source as file:
+        while batch := await asyncio.to_thread(list, islice(file, READ_BATCH)):
+            for line in batch:
+                yield line
+
+
+async def import_(args: argparse.Namespace) -> None:
+    async with open_storage() as storage:
+        memory = memory_manager(storage)
+        report = await MemoryImporter(memory).import_lines(
+            read_lines(args.path), publish=args.publish
+        )
+        logger.info(report.model_dump_json())
+        if not args.analyze or not report.imported:
+            return
+
+        async with AsyncClient(proxy=config.proxy) as client:
+            ai = create_ai(client, cache=ResponseCache(storage.engine))
+            backfill_report = await BackfillManager(ai, memory).run(
+                concurrency=args.concurrency, rpm=args.rpm, publish=args.publish
+            )
+            logger.info(backfill_report.model_dump_json())
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Служебные команды Sleep-Ai")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = commands.add_parser(
+        "backfill", help="Повторно проанализировать воспоминания без ответа AI"
+    )
+    backfill_parser.add_argument(
+        "--concurrency", type=int, help="Сколько запросов к AI выполнять одновременно"
+    )
+    backfill_parser.add_argument(
+        "--rpm", type=int, help="Максимум запросов к AI в минуту"
+    )
+    backfill_parser.add_argument(
+        "--batch-size", type=int, help="Размер пачки для чтения и записи"
+    )
+    backfill_parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Начать сначала, игнорируя контрольную точку",
+    )
+    backfill_parser.add_argument(
+        "--publish",
+        action="store_true",
+        help="Поставить проанализированные воспоминания без страницы в очередь Telegraph",
+    )
+    backfill_parser.set_defaults(handler=backfill)
+
+    search_parser = commands.add_parser(
+        "search-rebuild", help="Перестроить поисковый индекс воспоминаний"
+    )
+    search_parser.set_defaults(handler=search_rebuild)
+
+    similar_parser = commands.add_parser(
+        "similar-rebuild", help="Перестроить индекс похожих снов"
+    )
+    similar_parser.set_defaults(handler=similar_rebuild)
+
+    export_parser = commands.add_parser(
+        "export", help="Выгрузить все воспоминания в NDJSON или CSV"
+    )
+    export_parser.add_argument(
+        "--format",
+        type=ExportFormat,
+        default=ExportFormat.NDJSON,
+        choices=list(ExportFormat),
+    )
+    export_parser.add_argument(
+        "--gzip", action="store_true", help="Сжать выгрузку gzip"
+    )
+    export_parser.add_argument(
+        "--date-from", type=datetime.fromisoformat, help="Не раньше этой даты"
+    )
+    export_parser.add_argument(
+        "--date-to", type=datetime.fromisoformat, help="Раньше этой даты"
+    )
+    export_parser.add_argument(
+        "--after-id", type=int, help="Продолжить после воспоминания с этим id"
+    )
+    export_parser.add_argument(
+        "--output", "-o", help="Файл для выгрузки, по умолчанию stdout"
+    )
+    export_parser.set_defaults(handler=export)
+
+    import_parser = commands.add_parser(
+        "import", help="Импортировать воспоминания из NDJSON без обращения к AI"
+    )
+    import_parser.add_argument("path", help="Файл NDJSON или '-' для stdin")
+    import_parser.add_argument(
+        "--analyze",
+        action="store_true",
+        help="После импорта проанализировать воспоминания без ответа AI",
+    )
+    import_parser.add_argument(
+        "--publish",
+        action="store_true",
+        help="Публиковать в Telegraph воспоминания с ответом AI",
+    )
+    import_parser.add_argument(
+        "--concurrency", type=int, help="Сколько запросов к AI выполнять одновременно"
+    )
+    import_parser.add_argument(
+        "--rpm", type=int, help="Максимум запросов к AI в минуту"
+    )
+    import_parser.set_defaults(handler=import_)
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    try:
+        asyncio.run(args.handler(args))
+    except KeyboardInterrupt:
+        ...
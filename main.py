@@ -2,33 +2,57 @@ import asyncio
 
 
 from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import create_async_engine
 
-from src.core.entites.models import Base
+from src.core.entites.models import upgrade_schema
+from src.core.storage import create_storage
+from src.core.tracing import tracer
 from src.core.service import Telegraph
-from src.core.manager import GeminiManager, MemoryManager
+from src.core.manager import MemoryManager
+from src.core.manager.ai import ResponseCache, create_ai
 from src.core.manager.create_memory import CreateMemoryManager
+from src.core.manager.jobs import JobManager
+from src.core.manager.backfill import BackfillManager
 from src.frontend import start_frontend
-from src.bot import start_bot
+from src.bot import setup_bot, start_bot
 from src.core import config
 
 
 async def main():
-    engine = create_async_engine(config.database_url)
+    storage = create_storage()
+    engine = storage.engine
 
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
 
     async with AsyncClient(proxy=config.proxy) as client:
         telegraph = Telegraph(client)
-        gemini = GeminiManager(client)
-        api = MemoryManager(engine)
-
-        manager = CreateMemoryManager(gemini, telegraph, api)
-
-        await asyncio.gather(start_frontend(manager), start_bot(manager))
-
-    await engine.dispose()
+        ai = create_ai(client, cache=ResponseCache(engine))
+        api = MemoryManager(engine, reader=storage.reader)
+
+        manager = CreateMemoryManager(ai, telegraph, api)
+        jobs = JobManager(manager, engine)
+        backfill = BackfillManager(manager.scheduler, api)
+
+        await manager.search.setup()
+        await manager.similar.setup()
+        await manager.publisher.start()
+        await jobs.start()
+        try:
+            if config.webhook_url:
+                # бот получает обновления через webhook на том же сервере
+                bot = await setup_bot(manager)
+                await start_frontend(manager, jobs, backfill, bot=bot)
+            else:
+                await asyncio.gather(
+                    start_frontend(manager, jobs, backfill), start_bot(manager)
+                )
+        finally:
+            await jobs.stop()
+            await manager.publisher.stop()
+            manager.similar.close()
+
+    await tracer.close()
+    await storage.dispose()
 
 
 if __name__ == "__main__":
@@ -4,7 +4,7 @@ from aiogram.types import BotCommand, Message
 from ..core.manager.create_memory import CreateMemoryManager
 from ._bot import BaseMemoryBot
 
-from .memory import MemoryGetSendRouter, BaseRouter
+from .memory import MemoryGetSendRouter, BaseRouter, SearchRouter
 
 
 __all__ = ["setup_bot", "start_bot"]
@@ -27,6 +27,7 @@ async def init_command(bot: Bot):
         [
             BotCommand(command="create", description="Создать воспоминание"),
             BotCommand(command="memory", description="Увидеть воспоминание"),
+            BotCommand(command="search", description="Найти воспоминание"),
             BotCommand(command="help", description="Помощь"),
         ]
     )
@@ -39,7 +40,7 @@ async def setup_bot(
 ) -> BaseMemoryBot:
     bot = BaseMemoryBot(manager, token=token, proxy=proxy)
 
-    routers = [MemoryGetSendRouter(bot), BaseRouter(bot)]
+    routers = [MemoryGetSendRouter(bot), BaseRouter(bot), SearchRouter(bot)]
 
     for router in routers:
         bot.register_router(router)
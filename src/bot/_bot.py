@@ -1,17 +1,32 @@
+import asyncio
+import hashlib
+
 from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable
 from urllib.parse import urlparse
 
 from loguru import logger
 from aiohttp import BasicAuth
 
-from aiogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    Message,
+    TelegramObject,
+)
 from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
 from aiogram.client.default import DefaultBotProperties
 from aiogram import Bot, Dispatcher, Router
+from aiogram.methods import GetUpdates, TelegramMethod
 
+from ..core.manager.ai import AIScheduler
 from ..core.manager.create_memory import CreateMemoryManager
+from ..core.metrics import stage
+from ..core.tracing import span, trace
+from ..core.entites.schemas import SleepMemoryModel
 from ..core import config
+from ._storage import create_fsm_storage
 
 
 MEMORY_TEXT = (
@@ -51,19 +66,23 @@ class MemoryBotRouter(ABC):
                 content=response.content.content,
                 thoughts=response.content.ai_thoughts,
             ),
-            reply_markup=InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        InlineKeyboardButton(
-                            text="Telegraph", url=response.content.telegraph_url
-                        )
-                    ]
-                ]
-            )
-            if response.content.telegraph_url
-            else None,
+            reply_markup=self.memory_keyboard(response.content),
         )
 
+    @staticmethod
+    def memory_keyboard(memory: SleepMemoryModel) -> InlineKeyboardMarkup:
+        """Кнопки под воспоминанием: ссылка на Telegraph и похожие сны"""
+        buttons = [
+            InlineKeyboardButton(
+                text="Похожие сны", callback_data=f"similar:{memory.id}"
+            )
+        ]
+        if memory.telegraph_url:
+            buttons.insert(
+                0, InlineKeyboardButton(text="Telegraph", url=memory.telegraph_url)
+            )
+        return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
 
 class BaseMemoryBot:
     """Базовый класс Бота Aiogram, который использует MemoryManager для управления памятью и AIInterface для взаимодействия с ИИ."""
@@ -88,15 +107,72 @@ class BaseMemoryBot:
         self._proxy = proxy or config.proxy
         self._bot: Bot | None = None
         self._dp: Dispatcher | None = None
+        self._updates: set[asyncio.Task] = set()
 
     async def run(self):
-        """Запустить бота"""
+        """Запустить бота в режиме long polling"""
         try:
+            # getUpdates не работает, пока установлен webhook
+            await self.bot.delete_webhook()
             logger.success(f"Бот [{await self.bot.get_my_name()}] - Запущен!")
             await self.dispatcher.start_polling(self.bot)
         finally:
             await self.bot.session.close()
 
+    async def start_webhook(self, url: str, secret: str) -> None:
+        """Получать обновления через webhook вместо long polling
+
+        Args:
+            url (str): Публичный адрес webhook.
+            secret (str): Секрет, который Telegram передаёт в заголовке X-Telegram-Bot-Api-Secret-Token.
+        """
+        # как start_polling: хэндлеры startup до первого обновления
+        await self.dispatcher.emit_startup(**self._workflow_data())
+        await self.bot.set_webhook(
+            url,
+            secret_token=secret,
+            allowed_updates=self.dispatcher.resolve_used_update_types(),
+        )
+        logger.success(f"Бот [{await self.bot.get_my_name()}] - Webhook {url}")
+
+    def feed_webhook_update(self, update: dict[str, Any]) -> None:
+        """Обработать обновление из webhook в фоне, не задерживая ответ Telegram
+
+        Args:
+            update (dict[str, Any]): Обновление в том виде, в каком его прислал Telegram.
+        """
+        task = asyncio.create_task(self._process_update(update))
+        self._updates.add(task)
+        task.add_done_callback(self._updates.discard)
+
+    async def stop_webhook(self) -> None:
+        """Дождаться обработки принятых обновлений, выполнить хэндлеры shutdown
+        (в том числе закрытие хранилища состояний) и закрыть сессию.
+        Сам webhook не удаляется: его могут обслуживать другие экземпляры."""
+        try:
+            if self._updates:
+                await asyncio.gather(*self._updates, return_exceptions=True)
+            await self.dispatcher.emit_shutdown(**self._workflow_data())
+        finally:
+            await self.bot.session.close()
+
+    def _workflow_data(self) -> dict[str, Any]:
+        """Аргументы хэндлеров startup и shutdown, как их передаёт start_polling"""
+        return {
+            "dispatcher": self.dispatcher,
+            "bots": [self.bot],
+            "bot": self.bot,
+            **self.dispatcher.workflow_data,
+        }
+
+    async def _process_update(self, update: dict[str, Any]) -> None:
+        try:
+            await self.dispatcher.feed_raw_update(self.bot, update)
+        except Exception as e:
+            logger.error(
+                f"Ошибка при обработке обновления (update_id={update.get('update_id')}): {e}"
+            )
+
     def register_router(self, router: MemoryBotRouter):
         """Регистрирует новый Handler
 
@@ -114,10 +190,17 @@ class BaseMemoryBot:
         Returns:
             Bot: Экземпляр бота.
         """
+        session = AiohttpSession(
+            proxy=self.proxy,
+            api=TelegramAPIServer.from_base(config.telegram_api_url)
+            if config.telegram_api_url
+            else PRODUCTION,
+        )
+        session.middleware(self._request_metrics)
         return Bot(
             token=token or self._token,
             default=DefaultBotProperties(parse_mode="HTML"),
-            session=AiohttpSession(proxy=self.proxy),
+            session=session,
         )
 
     def _create_dispatcher(self) -> Dispatcher:
@@ -126,13 +209,63 @@ class BaseMemoryBot:
         Returns:
             Dispatcher: Экземпляр диспетчера.
         """
-        return Dispatcher(storage=MemoryStorage())
+        dispatcher = Dispatcher(storage=create_fsm_storage(self.manager.memory.engine))
+        dispatcher.update.outer_middleware(self._ai_client)
+        dispatcher.message.middleware(self._handler_metrics)
+        dispatcher.callback_query.middleware(self._handler_metrics)
+        return dispatcher
+
+    @staticmethod
+    async def _handler_metrics(
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Время и ошибки хэндлеров бота, каждый выбранный вызов хэндлера - отдельная трасса"""
+        name = f"bot.{data['handler'].callback.__name__}"
+        user = data.get("event_from_user")
+        with (
+            stage(name).track(),
+            trace(name, user_id=user.id if user is not None else 0) as span,
+        ):
+            if span is not None:
+                span.set(text_chars=len(getattr(event, "text", None) or ""))
+            return await handler(event, data)
+
+    @staticmethod
+    async def _request_metrics(make_request, bot: Bot, method: TelegramMethod) -> Any:
+        """Время и ошибки запросов к Telegram, кроме долгого опроса getUpdates"""
+        if isinstance(method, GetUpdates):
+            return await make_request(bot, method)
+        name = f"telegram.{method.__api_method__}"
+        with stage(name).track(), span(name):
+            return await make_request(bot, method)
+
+    @staticmethod
+    async def _ai_client(
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Запросы к AI из хэндлера считаются от имени пользователя Telegram"""
+        user = data.get("event_from_user")
+        with AIScheduler.client(f"tg:{user.id}" if user else None):
+            return await handler(event, data)
 
     @property
     def token(self) -> str:
         """Получить токен бота"""
         return self._token
 
+    @property
+    def webhook_secret(self) -> str:
+        """Секрет webhook: WEBHOOK_SECRET или производный от токена,
+        чтобы у всех экземпляров за балансировщиком он был одинаковым"""
+        return (
+            config.webhook_secret
+            or hashlib.sha256(f"webhook:{self._token}".encode()).hexdigest()
+        )
+
     @property
     def proxy(self) -> str | tuple[str, BasicAuth] | None:
         """Получить прокси сервера"""
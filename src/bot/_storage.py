@@ -0,0 +1,217 @@
+import json
+
+from datetime import datetime, timedelta
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from loguru import logger
+from sqlalchemy import case, delete, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from ..core import config
+from ..core.entites.models import BotState
+from ..core.utils import LRUCache
+
+
+def _state_name(state: StateType) -> str | None:
+    return state.state if isinstance(state, State) else state
+
+
+class BoundedMemoryStorage(BaseStorage):
+    """Состояния диалогов в памяти процесса, как MemoryStorage,
+    но с TTL и ограничением количества: брошенные диалоги не копятся."""
+
+    def __init__(self, ttl: int | None = None, max_states: int | None = None):
+        """Инцилизация
+
+        Args:
+            ttl (int | None, optional): Сколько секунд хранить диалог без активности, если не указано берётся из config. Обычное состояние None.
+            max_states (int | None, optional): Сколько диалогов хранить максимум, если не указано берётся из config. Обычное состояние None.
+        """
+        self._states: LRUCache[StorageKey, tuple[str | None, dict[str, Any]]] = (
+            LRUCache(max_states or config.fsm_max_states, ttl=ttl or config.fsm_ttl)
+        )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        _, data = self._states.get(key) or (None, {})
+        self._save(key, _state_name(state), data)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = self._states.get(key) or (None, {})
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        state, _ = self._states.get(key) or (None, {})
+        self._save(key, state, dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = self._states.get(key) or (None, {})
+        return dict(data)
+
+    async def close(self) -> None:
+        self._states.clear()
+
+    def _save(self, key: StorageKey, state: str | None, data: dict[str, Any]) -> None:
+        if state is None and not data:
+            self._states.pop(key)
+        else:
+            self._states.set(key, (state, data))
+
+
+class SQLAlchemyStorage(BaseStorage):
+    """Состояния диалогов в таблице bot_state той же базы данных.
+
+    Диалог переживает перезапуск и доступен всем экземплярам бота.
+    Диалоги без активности дольше ttl не читаются и удаляются вместе
+    с самыми старыми сверх max_states раз в PRUNE_EVERY записей.
+    """
+
+    PRUNE_EVERY = 100
+    """Раз во сколько записей чистить устаревшие и лишние диалоги."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        ttl: int | None = None,
+        max_states: int | None = None,
+        key_builder: KeyBuilder | None = None,
+    ):
+        """Инцилизация
+
+        Args:
+            engine (AsyncEngine): асинхроннный движок
+            ttl (int | None, optional): Сколько секунд хранить диалог без активности, если не указано берётся из config. Обычное состояние None.
+            max_states (int | None, optional): Сколько диалогов хранить максимум, если не указано берётся из config. Обычное состояние None.
+            key_builder (KeyBuilder | None, optional): Построение ключа строки. Обычное состояние None.
+        """
+        self.ttl = ttl or config.fsm_ttl
+        self.max_states = max_states or config.fsm_max_states
+        self.key_builder = key_builder or DefaultKeyBuilder(
+            with_bot_id=True, with_destiny=True
+        )
+        self.Session: async_sessionmaker[AsyncSession] = async_sessionmaker(
+            bind=engine, expire_on_commit=False
+        )
+        self._insert = (
+            postgresql_insert if engine.dialect.name == "postgresql" else sqlite_insert
+        )
+        self._writes = 0
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._save(key, state=_state_name(state))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        row = await self._load(key)
+        return row.state if row is not None else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._save(key, data=dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        row = await self._load(key)
+        return json.loads(row.data) if row is not None else {}
+
+    async def close(self) -> None:
+        pass
+
+    async def prune(self) -> None:
+        """Удалить устаревшие диалоги и диалоги сверх лимита"""
+        async with self.Session() as session, session.begin():
+            await session.execute(
+                delete(BotState).where(BotState.updated_at < self._expired_before())
+            )
+            newest = (
+                select(BotState.key)
+                .order_by(BotState.updated_at.desc())
+                .limit(self.max_states)
+            )
+            await session.execute(delete(BotState).where(BotState.key.not_in(newest)))
+        logger.debug("Состояния диалогов бота очищены от устаревших")
+
+    async def _load(self, key: StorageKey) -> BotState | None:
+        async with self.Session() as session:
+            row = await session.get(BotState, self.key_builder.build(key))
+        if row is None or row.updated_at < self._expired_before():
+            return None
+        return row
+
+    async def _save(self, key: StorageKey, **values: Any) -> None:
+        """Обновить состояние или данные, не трогая второе, одним
+        INSERT ... ON CONFLICT DO UPDATE, чтобы экземпляры бота не мешали друг другу.
+        Устаревший диалог при этом начинается заново."""
+        name = self.key_builder.build(key)
+        now = datetime.now()
+        fresh = BotState.updated_at >= self._expired_before()
+        row: dict[str, Any] = {"key": name, "state": None, "data": "{}"}
+        changes: dict[str, Any] = {
+            "state": case((fresh, BotState.state), else_=None),
+            "data": case((fresh, BotState.data), else_="{}"),
+        }
+        if "state" in values:
+            row["state"] = changes["state"] = values["state"]
+        if "data" in values:
+            row["data"] = changes["data"] = json.dumps(
+                values["data"], ensure_ascii=False
+            )
+
+        statement = self._insert(BotState).values(**row, updated_at=now)
+        statement = statement.on_conflict_do_update(
+            index_elements=[BotState.key], set_={**changes, "updated_at": now}
+        )
+        async with self.Session() as session, session.begin():
+            await session.execute(statement)
+            if row["state"] is None or row["data"] == "{}":
+                # пустой диалог не хранится
+                await session.execute(
+                    delete(BotState).where(
+                        BotState.key == name,
+                        BotState.state.is_(None),
+                        BotState.data == "{}",
+                    )
+                )
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            try:
+                await self.prune()
+            except Exception as e:
+                logger.warning(f"Не удалось очистить состояния диалогов бота: {e}")
+
+    def _expired_before(self) -> datetime:
+        return datetime.now() - timedelta(seconds=self.ttl)
+
+
+def create_fsm_storage(engine: AsyncEngine) -> BaseStorage:
+    """Хранилище состояний диалогов по настройке FSM_STORAGE
+
+    Args:
+        engine (AsyncEngine): Движок базы данных для FSM_STORAGE=sql.
+
+    Returns:
+        BaseStorage: Хранилище для Dispatcher.
+    """
+    if config.fsm_storage == "sql":
+        return SQLAlchemyStorage(engine)
+    if config.fsm_storage == "memory":
+        return BoundedMemoryStorage()
+    if config.fsm_storage == "redis":
+        # redis нужен только для этого режима
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        # ограничение памяти задаётся на сервере (maxmemory и политика вытеснения)
+        return RedisStorage.from_url(
+            config.fsm_redis_url,
+            key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+            state_ttl=config.fsm_ttl,
+            data_ttl=config.fsm_ttl,
+        )
+    raise ValueError(f"Неизвестный FSM_STORAGE: {config.fsm_storage}")
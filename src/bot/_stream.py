@@ -0,0 +1,94 @@
+import re
+import time
+
+from loguru import logger
+from aiogram.types import Message
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramRetryAfter,
+)
+
+
+_TAG = re.compile(r"<(/?)([a-zA-Z-]+)[^>]*>")
+
+
+def close_tags(text: str) -> str:
+    """Сделать недописанный HTML валидным для Telegram: отрезать незаконченный
+    тег и закрыть все открытые.
+
+    Args:
+        text (str): Недописанный текст ответа.
+
+    Returns:
+        str: Текст, который Telegram сможет разобрать.
+    """
+    if text.rfind("<") > text.rfind(">"):
+        text = text[: text.rfind("<")]
+
+    stack: list[str] = []
+    for match in _TAG.finditer(text):
+        closing, name = match.group(1), match.group(2).lower()
+        if not closing:
+            stack.append(name)
+        elif name in stack:
+            while stack.pop() != name:
+                pass
+
+    return text + "".join(f"</{name}>" for name in reversed(stack))
+
+
+class MessageStreamer:
+    """Постепенно редактирует одно сообщение по мере поступления текста,
+    объединяя частые обновления, чтобы не упираться в лимиты Telegram."""
+
+    INTERVAL = 1.5
+    """Минимальный интервал между редактированиями сообщения (в секундах)."""
+
+    LIMIT = 4000
+    """Сколько символов ответа показывать, лимит сообщения Telegram - 4096."""
+
+    def __init__(self, message: Message, interval: float | None = None):
+        """Инцилизация
+
+        Args:
+            message (Message): Сообщение, которое будет редактироваться.
+            interval (float | None, optional): Интервал между редактированиями, если не указан используется INTERVAL. Обычное состояние None.
+        """
+        self.message = message
+        self.interval = interval or self.INTERVAL
+        self._text = ""
+        self._shown = ""
+        self._next_edit = 0.0
+
+    async def update(self, text: str) -> None:
+        """Запомнить новый текст и отредактировать сообщение, если прошло достаточно времени
+
+        Args:
+            text (str): Весь накопленный текст ответа.
+        """
+        self._text = text
+        if time.monotonic() >= self._next_edit:
+            await self._edit()
+
+    async def _edit(self) -> None:
+        body = close_tags(self._text[: self.LIMIT])
+        if not body.strip() or body == self._shown:
+            return
+
+        try:
+            await self.message.edit_text(body)
+        except TelegramRetryAfter as e:
+            logger.debug(f"Telegram просит подождать {e.retry_after} сек.")
+            self._next_edit = time.monotonic() + e.retry_after
+            return
+        except TelegramBadRequest as e:
+            logger.debug(f"Не удалось отредактировать сообщение: {e.message}")
+        except TelegramAPIError as e:
+            # промежуточное обновление не стоит ответа AI, попробуем в следующий раз
+            logger.warning(f"Не удалось отредактировать сообщение: {e.message}")
+            self._next_edit = time.monotonic() + self.interval
+            return
+
+        self._shown = body
+        self._next_edit = time.monotonic() + self.interval
@@ -1,4 +1,5 @@
 from ._add_get import MemoryGetSendRouter
 from ._hello import BaseRouter
+from ._search import SearchRouter
 
-__all__ = ["MemoryGetSendRouter", "BaseRouter"]
+__all__ = ["MemoryGetSendRouter", "BaseRouter", "SearchRouter"]
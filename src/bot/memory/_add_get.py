@@ -1,8 +1,5 @@
-import asyncio
-
 from loguru import logger
 from aiogram import F
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.filters import Command
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
@@ -10,6 +7,7 @@ from aiogram.fsm.context import FSMContext
 from .state import MemoryStates
 from .._bot import MEMORY_TEXT
 from .._bot import MemoryBotRouter
+from .._stream import MessageStreamer
 from ...core.entites.schemas import (
     SleepMemoryBaseModel,
     SleepMemoryCreateModel,
@@ -74,31 +72,22 @@ class MemoryGetSendRouter(MemoryBotRouter):
         title: str = data.get("title")
         content: str = message.text.strip()
 
-        response = await self.think(message=message, title=title, content=content)
+        answer = await message.answer("Раздумываю над ответом...")
+        response = await self.think(message=answer, title=title, content=content)
 
         try:
             if not response.success:
-                await message.answer(response.message)
+                await answer.edit_text(response.message)
                 return
 
-            await message.answer(
+            await answer.edit_text(
                 MEMORY_TEXT.format(
                     id=response.content.id,
                     title=response.content.title,
                     content=response.content.content,
                     thoughts=response.content.ai_thoughts,
                 ),
-                reply_markup=InlineKeyboardMarkup(
-                    inline_keyboard=[
-                        [
-                            InlineKeyboardButton(
-                                text="Telegraph", url=response.content.telegraph_url
-                            )
-                        ]
-                    ]
-                )
-                if response.content.telegraph_url
-                else None,
+                reply_markup=self.memory_keyboard(response.content),
             )
         except Exception as e:
             logger.error(f"Ошибка при обработке воспоминания: {e}")
@@ -114,35 +103,18 @@ class MemoryGetSendRouter(MemoryBotRouter):
     ) -> (
         BaseResponseModel[SleepMemoryCreateModel] | BaseResponseModel[SleepMemoryModel]
     ):
-        message = await message.answer("Раздумываю над ответом")
+        """Создать воспоминание, показывая ответ AI в сообщении по мере генерации.
+
+        Args:
+            message (Message): Сообщение бота, которое будет редактироваться.
+            title (str): Название воспоминания.
+            content (str): Содержание воспоминания.
+        """
         await self.memory_bot.bot.send_chat_action(
             chat_id=message.chat.id, action="typing"
         )
-        try:
-            task = asyncio.create_task(self._animation(message))
-            response = await self.memory_bot.manager.create_memory(
-                SleepMemoryBaseModel(title=title, content=content)
-            )
-
-            return response
-        finally:
-            task.cancel()
-            await message.delete()
-            await self.memory_bot.bot.send_chat_action(
-                chat_id=message.chat.id, action="cancel"
-            )
-
-    async def _animation(self, message: Message):
-        """Анимация для бота."""
-        text = ""
-        try:
-            while True:
-                if text == "....":
-                    text = ""
-                else:
-                    text += "."
-
-                await asyncio.sleep(1)
-                await message.edit_text("Раздумываю над ответом" + text)
-        except Exception:
-            pass
+        streamer = MessageStreamer(message)
+        return await self.memory_bot.manager.create_memory(
+            SleepMemoryBaseModel(title=title, content=content),
+            on_chunk=streamer.update,
+        )
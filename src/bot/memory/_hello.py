@@ -27,5 +27,6 @@ class BaseRouter(MemoryBotRouter):
             "Список доступных команд:\n"
             "/create - Создать новое воспоминание\n"
             "/memory - Посмотреть существующие воспоминания\n"
+            "/search - Найти воспоминание по тексту\n"
             "/help - Показать это сообщение"
         )
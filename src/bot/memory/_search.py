@@ -0,0 +1,68 @@
+import html
+
+from loguru import logger
+from aiogram import F
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery, Message
+
+from .._bot import MemoryBotRouter
+
+
+class SearchRouter(MemoryBotRouter):
+    LIMIT = 5
+    """Сколько результатов показывать в одном сообщении."""
+
+    def register_handler(self):
+        self.router.message.register(self.search, Command("search"))
+        self.router.callback_query.register(self.similar, F.data.startswith("similar:"))
+
+    async def search(self, message: Message, command: CommandObject):
+        if not command.args:
+            await message.answer("Пожалуйста, введите текст для поиска после команды.")
+            return
+
+        logger.debug(
+            f"Поиск воспоминаний (user_id={message.from_user.id}, query={command.args})"
+        )
+        response = await self.memory_bot.manager.search.search(
+            command.args, limit=self.LIMIT
+        )
+        if not response.success:
+            await message.answer(response.message)
+            return
+        if not response.content.items:
+            await message.answer("Ничего не найдено.")
+            return
+
+        await message.answer(
+            "\n\n".join(
+                f"<code>{item.id}</code> <b>{html.escape(item.title)}</b>\n{item.snippet}"
+                for item in response.content.items
+            )
+            + "\n\nОткрыть воспоминание: /memory ID"
+        )
+
+    async def similar(self, callback: CallbackQuery):
+        memory_id = int(callback.data.removeprefix("similar:"))
+        logger.debug(
+            f"Похожие воспоминания (user_id={callback.from_user.id}, id={memory_id})"
+        )
+        response = await self.memory_bot.manager.similar.similar(
+            memory_id, limit=self.LIMIT
+        )
+        await callback.answer()
+        if not response.success:
+            await callback.message.answer(response.message)
+            return
+        if not response.content.items:
+            await callback.message.answer("Похожих снов не найдено.")
+            return
+
+        await callback.message.answer(
+            "Похожие сны:\n\n"
+            + "\n".join(
+                f"<code>{item.id}</code> <b>{html.escape(item.title)}</b> ({item.score:.0%})"
+                for item in response.content.items
+            )
+            + "\n\nОткрыть воспоминание: /memory ID"
+        )
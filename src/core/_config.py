@@ -10,24 +10,215 @@ class Config(BaseModel):
     database_url: str = Field(
         default=os.getenv("DATABASE_URL"), json_schema_extra={"env": "DATABASE_URL"}
     )
+    db_pool_size: int = Field(
+        default=int(os.getenv("DB_POOL_SIZE", 5)),
+        json_schema_extra={"env": "DB_POOL_SIZE"},
+    )
+    db_max_overflow: int = Field(
+        default=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        json_schema_extra={"env": "DB_MAX_OVERFLOW"},
+    )
+    db_statement_cache_size: int = Field(
+        default=int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500)),
+        json_schema_extra={"env": "DB_STATEMENT_CACHE_SIZE"},
+    )
+    sqlite_busy_timeout: int = Field(
+        default=int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),
+        json_schema_extra={"env": "SQLITE_BUSY_TIMEOUT"},
+    )
+    sqlite_mmap_size: int = Field(
+        default=int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        json_schema_extra={"env": "SQLITE_MMAP_SIZE"},
+    )
     gemini_api_key: str = Field(
         default=os.getenv("GEMINI_API_KEY"), json_schema_extra={"env": "GEMINI_API_KEY"}
     )
     gemini_model: str = Field(
         default=os.getenv("GEMINI_MODEL"), json_schema_extra={"env": "GEMINI_MODEL"}
     )
+    gemini_base_url: str | None = Field(
+        default=os.getenv("GEMINI_BASE_URL"),
+        json_schema_extra={"env": "GEMINI_BASE_URL"},
+    )
+    ai_backends: str | None = Field(
+        default=os.getenv("AI_BACKENDS"), json_schema_extra={"env": "AI_BACKENDS"}
+    )
+    gemini_timeout: float = Field(
+        default=float(os.getenv("GEMINI_TIMEOUT", 90)),
+        json_schema_extra={"env": "GEMINI_TIMEOUT"},
+    )
+    gemini_attempts: int = Field(
+        default=int(os.getenv("GEMINI_ATTEMPTS", 3)),
+        json_schema_extra={"env": "GEMINI_ATTEMPTS"},
+    )
+    gemini_context_cache: bool = Field(
+        default=os.getenv("GEMINI_CONTEXT_CACHE", "true").lower()
+        in ("1", "true", "yes"),
+        json_schema_extra={"env": "GEMINI_CONTEXT_CACHE"},
+    )
+    gemini_context_cache_ttl: int = Field(
+        default=int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", 3600)),
+        json_schema_extra={"env": "GEMINI_CONTEXT_CACHE_TTL"},
+    )
+    gemini_hedge: bool = Field(
+        default=os.getenv("GEMINI_HEDGE", "false").lower() in ("1", "true", "yes"),
+        json_schema_extra={"env": "GEMINI_HEDGE"},
+    )
     bot_token: str = Field(
         default=os.getenv("BOT_TOKEN"), json_schema_extra={"env": "BOT_TOKEN"}
     )
     proxy: str | None = Field(
         default=os.getenv("PROXY"), json_schema_extra={"env": "PROXY"}
     )
+    telegram_api_url: str | None = Field(
+        default=os.getenv("TELEGRAM_API_URL"),
+        json_schema_extra={"env": "TELEGRAM_API_URL"},
+    )
+    webhook_url: str | None = Field(
+        default=os.getenv("WEBHOOK_URL"), json_schema_extra={"env": "WEBHOOK_URL"}
+    )
+    webhook_path: str = Field(
+        default=os.getenv("WEBHOOK_PATH", "/telegram/webhook"),
+        json_schema_extra={"env": "WEBHOOK_PATH"},
+    )
+    webhook_secret: str | None = Field(
+        default=os.getenv("WEBHOOK_SECRET"),
+        json_schema_extra={"env": "WEBHOOK_SECRET"},
+    )
+    fsm_storage: str = Field(
+        default=os.getenv("FSM_STORAGE", "sql"),
+        json_schema_extra={"env": "FSM_STORAGE"},
+    )
+    fsm_redis_url: str = Field(
+        default=os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0"),
+        json_schema_extra={"env": "FSM_REDIS_URL"},
+    )
+    fsm_ttl: int = Field(
+        default=int(os.getenv("FSM_TTL", 60 * 60 * 24)),
+        json_schema_extra={"env": "FSM_TTL"},
+    )
+    fsm_max_states: int = Field(
+        default=int(os.getenv("FSM_MAX_STATES", 10_000)),
+        json_schema_extra={"env": "FSM_MAX_STATES"},
+    )
     access_token: str | None = Field(
         default=os.getenv("ACCESS_TOKEN"), json_schema_extra={"env": "ACCESS_TOKEN"}
     )
     bot_url: str | None = Field(
         default=os.getenv("BOT_URL"), json_schema_extra={"env": "BOT_URL"}
     )
+    job_workers: int = Field(
+        default=int(os.getenv("JOB_WORKERS", 4)),
+        json_schema_extra={"env": "JOB_WORKERS"},
+    )
+    ai_concurrency: int = Field(
+        default=int(os.getenv("AI_CONCURRENCY", 4)),
+        json_schema_extra={"env": "AI_CONCURRENCY"},
+    )
+    ai_queue_size: int = Field(
+        default=int(os.getenv("AI_QUEUE_SIZE", 32)),
+        json_schema_extra={"env": "AI_QUEUE_SIZE"},
+    )
+    ai_client_rpm: float = Field(
+        default=float(os.getenv("AI_CLIENT_RPM", 3)),
+        json_schema_extra={"env": "AI_CLIENT_RPM"},
+    )
+    ai_client_burst: int = Field(
+        default=int(os.getenv("AI_CLIENT_BURST", 3)),
+        json_schema_extra={"env": "AI_CLIENT_BURST"},
+    )
+    forwarded_allow_ips: str = Field(
+        default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        json_schema_extra={"env": "FORWARDED_ALLOW_IPS"},
+    )
+    ai_cache_ttl: int = Field(
+        default=int(os.getenv("AI_CACHE_TTL", 60 * 60 * 24 * 30)),
+        json_schema_extra={"env": "AI_CACHE_TTL"},
+    )
+    ai_cache_memory_size: int = Field(
+        default=int(os.getenv("AI_CACHE_MEMORY_SIZE", 256)),
+        json_schema_extra={"env": "AI_CACHE_MEMORY_SIZE"},
+    )
+    ai_cache_max_entries: int = Field(
+        default=int(os.getenv("AI_CACHE_MAX_ENTRIES", 10_000)),
+        json_schema_extra={"env": "AI_CACHE_MAX_ENTRIES"},
+    )
+    backfill_concurrency: int = Field(
+        default=int(os.getenv("BACKFILL_CONCURRENCY", 4)),
+        json_schema_extra={"env": "BACKFILL_CONCURRENCY"},
+    )
+    backfill_rpm: int = Field(
+        default=int(os.getenv("BACKFILL_RPM", 10)),
+        json_schema_extra={"env": "BACKFILL_RPM"},
+    )
+    backfill_batch_size: int = Field(
+        default=int(os.getenv("BACKFILL_BATCH_SIZE", 50)),
+        json_schema_extra={"env": "BACKFILL_BATCH_SIZE"},
+    )
+    telegraph_concurrency: int = Field(
+        default=int(os.getenv("TELEGRAPH_CONCURRENCY", 4)),
+        json_schema_extra={"env": "TELEGRAPH_CONCURRENCY"},
+    )
+    telegraph_base_url: str | None = Field(
+        default=os.getenv("TELEGRAPH_BASE_URL"),
+        json_schema_extra={"env": "TELEGRAPH_BASE_URL"},
+    )
+    telegraph_timeout: float = Field(
+        default=float(os.getenv("TELEGRAPH_TIMEOUT", 15)),
+        json_schema_extra={"env": "TELEGRAPH_TIMEOUT"},
+    )
+    telegraph_attempts: int = Field(
+        default=int(os.getenv("TELEGRAPH_ATTEMPTS", 3)),
+        json_schema_extra={"env": "TELEGRAPH_ATTEMPTS"},
+    )
+    circuit_failures: int = Field(
+        default=int(os.getenv("CIRCUIT_FAILURES", 5)),
+        json_schema_extra={"env": "CIRCUIT_FAILURES"},
+    )
+    circuit_reset: float = Field(
+        default=float(os.getenv("CIRCUIT_RESET", 30)),
+        json_schema_extra={"env": "CIRCUIT_RESET"},
+    )
+    memory_cache_size: int = Field(
+        default=int(os.getenv("MEMORY_CACHE_SIZE", 1024)),
+        json_schema_extra={"env": "MEMORY_CACHE_SIZE"},
+    )
+    memory_cache_ttl: int = Field(
+        default=int(os.getenv("MEMORY_CACHE_TTL", 300)),
+        json_schema_extra={"env": "MEMORY_CACHE_TTL"},
+    )
+    memory_page_cache_size: int = Field(
+        default=int(os.getenv("MEMORY_PAGE_CACHE_SIZE", 512)),
+        json_schema_extra={"env": "MEMORY_PAGE_CACHE_SIZE"},
+    )
+    vector_index_path: str = Field(
+        default=os.getenv("VECTOR_INDEX_PATH", "var/vectors"),
+        json_schema_extra={"env": "VECTOR_INDEX_PATH"},
+    )
+    frontend_dev: bool = Field(
+        default=os.getenv("FRONTEND_DEV", "false").lower() in ("1", "true", "yes"),
+        json_schema_extra={"env": "FRONTEND_DEV"},
+    )
+    admin_token: str | None = Field(
+        default=os.getenv("ADMIN_TOKEN"), json_schema_extra={"env": "ADMIN_TOKEN"}
+    )
+
+    trace_sample_rate: float = Field(
+        default=float(os.getenv("TRACE_SAMPLE_RATE", 0)),
+        json_schema_extra={"env": "TRACE_SAMPLE_RATE"},
+    )
+    trace_exporter: str = Field(
+        default=os.getenv("TRACE_EXPORTER", "json"),
+        json_schema_extra={"env": "TRACE_EXPORTER"},
+    )
+    trace_file: str = Field(
+        default=os.getenv("TRACE_FILE", "var/traces.jsonl"),
+        json_schema_extra={"env": "TRACE_FILE"},
+    )
+    trace_otlp_endpoint: str = Field(
+        default=os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"),
+        json_schema_extra={"env": "TRACE_OTLP_ENDPOINT"},
+    )
 
 
 config = Config()
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
 
 from ..entites.schemas import (
     SleepMemoryBaseModel,
@@ -8,12 +9,11 @@ from ..entites.schemas import (
 
 
 class AIInterface(ABC):
-    PROMPT_TEMPLATE = (
+    SYSTEM_INSTRUCTION = (
         "Ты — аналитик сновидений. Твоя задача — дать объективный, беспристрастный анализ сна или воспоминания. "
         "Ты не должен смягчать выводы или поддерживать человека; говори только правду, какой бы горькой или неприятной она ни была. "
         "Строго соблюдай правила форматирования: используй ТОЛЬКО HTML-теги, поддерживаемые Telegram, для структурирования ответа.\n\n"
-        "Данные для анализа (в формате JSON):\n"
-        "{memory_data}\n\n"
+        "Данные для анализа придут отдельным сообщением в формате JSON.\n\n"
         "Проведи анализ по перечисленным ниже пунктам. Отвечай прямо, без экивоков, избегая вводных фрод вроде «возможно» или «может быть». "
         "Твои утверждения должны быть уверенными, основанными на предоставленных данных. Не давай советов и не предлагай действий — только констатация фактов и интерпретация.\n\n"
         "Пункты для анализа (используй жирный текст для заголовков, остальной текст оформляй курсивом или обычным текстом по смыслу):\n\n"
@@ -34,14 +34,32 @@ class AIInterface(ABC):
         "- Не используй теги <h1>, <h2>, <p> или <br> — Telegram их не поддерживает. Для разделения абзацев используй двойной перенос строки.\n"
         "- Весь ответ должен быть одним сообщением, отформатированным с помощью перечисленных тегов."
     )
-    """Промпт для модели, которое задает четкие инструкции по анализу сна или воспоминания, требуя объективности и использования HTML для оформления ответа."""
+    """Постоянные инструкции для модели: объективный анализ сна или воспоминания и оформление ответа HTML-тегами Telegram.
+    Передаются как system instruction и не меняются от запроса к запросу, поэтому их можно кэшировать на стороне модели."""
+
+    MEMORY_TEMPLATE = "Данные для анализа (в формате JSON):\n{memory_data}"
+    """Сообщение с воспоминанием, единственная часть промпта, которая отправляется в каждом запросе."""
+
+    PROMPT_TEMPLATE = SYSTEM_INSTRUCTION + "\n\n" + MEMORY_TEMPLATE
+    """Полный промпт одним сообщением. Используется в ключе кэша ответов, поэтому смена инструкций сбрасывает кэш."""
+
+    def memory_prompt(self, memory: SleepMemoryBaseModel) -> str:
+        """Сообщение с данными воспоминания
+
+        Args:
+            memory (SleepMemoryBaseModel): воспоминание
+
+        Returns:
+            str: MEMORY_TEMPLATE с подставленным JSON воспоминания.
+        """
+        return self.MEMORY_TEMPLATE.format(memory_data=memory.model_dump_json())
 
     @abstractmethod
     async def generate_response(
         self, memory: SleepMemoryBaseModel
     ) -> BaseResponseModel[SleepMemoryCreateModel]:
         """Сгенерировать ответ от AI.
-        Промпт будт использоваться из переменной PROMPT_TEMPLATE.
+        Инструкции берутся из SYSTEM_INSTRUCTION, воспоминание из memory_prompt.
 
         Args:
             memory (SleepMemoryBaseModel): Данные сна или воспоминания, которые нужно проанализировать. Ожидается, что это будет экземпляр модели Pydantic, содержащий все необходимые поля для анализа.
@@ -49,3 +67,24 @@ class AIInterface(ABC):
         Returns:
             BaseResponseModel[SleepMemoryCreateModel]: Модель с результатами анализа, включая оригинальные данные и сгенерированный текст.
         """
+
+    async def stream_response(self, memory: SleepMemoryBaseModel) -> AsyncIterator[str]:
+        """Сгенерировать ответ от AI по частям.
+        По умолчанию ждёт полный ответ из generate_response и отдаёт его одним куском,
+        реализации с поддержкой стриминга должны переопределить этот метод.
+
+        Args:
+            memory (SleepMemoryBaseModel): Данные сна или воспоминания, которые нужно проанализировать.
+
+        Raises:
+            RuntimeError: Если не удалось сгенерировать ответ.
+
+        Yields:
+            str: Очередной фрагмент текста ответа.
+        """
+        response = await self.generate_response(memory)
+        if not response.success:
+            raise RuntimeError(response.message)
+
+        if response.content.ai_thoughts:
+            yield response.content.ai_thoughts
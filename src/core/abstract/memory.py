@@ -0,0 +1,32 @@
+from abc import ABC, abstractmethod
+
+from ..entites.schemas import SleepMemoryModel
+
+
+class MemoryListener(ABC):
+    """Подписчик на изменения воспоминаний в MemoryManager.
+    Методы вызываются после фиксации транзакции, ошибки подписчика не влияют на результат операции."""
+
+    @abstractmethod
+    async def memory_saved(self, memory: SleepMemoryModel) -> None:
+        """Воспоминание создано или обновлено
+
+        Args:
+            memory (SleepMemoryModel): Воспоминание после сохранения.
+        """
+
+    @abstractmethod
+    async def memory_deleted(self, memory: SleepMemoryModel) -> None:
+        """Воспоминание удалено
+
+        Args:
+            memory (SleepMemoryModel): Воспоминание до удаления.
+        """
+
+    def memories_invalidated(self, *memory_ids: int) -> None:
+        """Воспоминания изменены в обход MemoryManager, например повторным анализом.
+        По умолчанию ничего не делает.
+
+        Args:
+            *memory_ids (int): идентификаторы воспоминаний
+        """
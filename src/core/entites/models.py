@@ -1,19 +1,57 @@
 from datetime import datetime
 
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Text, DateTime
+from sqlalchemy import Connection, String, Text, DateTime, Integer, Index
+from sqlalchemy import inspect, text
 
 
-__all__ = ["SleepMemory", "Base"]
+__all__ = [
+    "SleepMemory",
+    "MemoryJob",
+    "AIResponseCache",
+    "ServiceState",
+    "TelegraphOutbox",
+    "BotState",
+    "Base",
+    "upgrade_schema",
+]
 
 
 class Base(DeclarativeBase): ...
 
 
+def upgrade_schema(connection: Connection) -> None:
+    """Догнать схему существующей базы данных до текущих моделей.
+    create_all создаёт только отсутствующие таблицы, поэтому колонки и индексы,
+    добавленные позже, создаются здесь. Новые колонки должны быть nullable.
+
+    Args:
+        connection (Connection): Синхронное соединение (через run_sync).
+    """
+    Base.metadata.create_all(connection)
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {preparer.format_column(column)} "
+                        f"{column.type.compile(dialect=connection.dialect)}"
+                    )
+                )
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
 class SleepMemory(Base):
     """Модель данных для хранения воспоминаний о сне."""
 
     __tablename__ = "sleep_memory"
+    __table_args__ = (Index("ix_sleep_memory_created_at_id", "created_at", "id"),)
     id: Mapped[int] = mapped_column(primary_key=True)
 
     title: Mapped[str] = mapped_column(String(255))
@@ -23,6 +61,9 @@ class SleepMemory(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.now, nullable=False
     )
+    updated_at: Mapped[datetime | None] = mapped_column(
+        DateTime, default=datetime.now, onupdate=datetime.now, nullable=True
+    )
 
     def __repr__(self):
         content_preview = (
@@ -49,5 +90,101 @@ class SleepMemory(Base):
             "content": self.content,
             "ai_thoughts": self.ai_thoughts,
             "created_at": self.created_at,
+            "updated_at": self.updated_at,
             "telegraph_url": self.telegraph_url,
         }
+
+
+class MemoryJob(Base):
+    """Модель данных для фоновой задачи создания воспоминания."""
+
+    __tablename__ = "memory_job"
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+
+    status: Mapped[str] = mapped_column(String(16), index=True, nullable=False)
+    payload: Mapped[str] = mapped_column(Text(), nullable=False)
+    memory_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    error: Mapped[str | None] = mapped_column(Text(), nullable=True)
+    lease_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    """До какого момента задача закреплена за воркером, который её выполняет."""
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, onupdate=datetime.now, nullable=False
+    )
+
+    def __repr__(self):
+        return (
+            f"<MemoryJob(id='{self.id}', status='{self.status}', "
+            f"memory_id={self.memory_id}, created_at='{self.created_at}')>"
+        )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "memory_id": self.memory_id,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class AIResponseCache(Base):
+    """Модель данных для постоянного кэша ответов AI."""
+
+    __tablename__ = "ai_response_cache"
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    model: Mapped[str] = mapped_column(String(255), nullable=False)
+    response: Mapped[str] = mapped_column(Text(), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, index=True, nullable=False
+    )
+
+
+class ServiceState(Base):
+    """Модель данных для служебных значений, которые должны переживать перезапуск."""
+
+    __tablename__ = "service_state"
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    value: Mapped[str] = mapped_column(Text(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, onupdate=datetime.now, nullable=False
+    )
+
+
+class TelegraphOutbox(Base):
+    """Модель данных для очереди публикации воспоминаний в Telegraph.
+
+    Строка удаляется после успешной публикации, `next_attempt_at = None` -
+    попытки закончились.
+    """
+
+    __tablename__ = "telegraph_outbox"
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    memory_id: Mapped[int] = mapped_column(Integer, index=True, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(
+        DateTime, default=datetime.now, index=True, nullable=True
+    )
+    last_error: Mapped[str | None] = mapped_column(Text(), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, nullable=False
+    )
+
+
+class BotState(Base):
+    """Модель данных для состояний диалогов бота (FSM), общих для всех экземпляров бота."""
+
+    __tablename__ = "bot_state"
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+    state: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    data: Mapped[str] = mapped_column(Text(), default="{}", nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, index=True, nullable=False
+    )
@@ -1,4 +1,5 @@
-from typing import TypeVar, Generic
+from enum import StrEnum
+from typing import Any, TypeVar, Generic
 from datetime import datetime
 
 from pydantic import BaseModel, Field
@@ -9,6 +10,22 @@ __all__ = [
     "SleepMemoryCreateModel",
     "SleepMemoryModel",
     "BaseResponseModel",
+    "JobStatus",
+    "MemoryJobModel",
+    "BackfillReportModel",
+    "SleepMemoryPageModel",
+    "SearchResultModel",
+    "SearchPageModel",
+    "SimilarMemoryModel",
+    "SimilarPageModel",
+    "BulkOperation",
+    "MemoryBulkOperationModel",
+    "MemoryBulkRequestModel",
+    "MemoryBulkItemModel",
+    "MemoryBulkResultModel",
+    "ExportFormat",
+    "ImportErrorModel",
+    "ImportReportModel",
 ]
 
 _T = TypeVar("_T", bound=BaseModel)
@@ -33,6 +50,7 @@ class SleepMemoryModel(SleepMemoryCreateModel):
     """Модель данных для представления воспоминаний о сне с ID."""
 
     id: int
+    updated_at: datetime | None = Field(default=None)
 
 
 class BaseResponseModel(BaseModel, Generic[_T]):
@@ -50,3 +68,147 @@ class SleepMemoryUpdateModel(BaseModel):
     content: str | None = Field(default=None)
     ai_thoughts: str | None = Field(default=None)
     telegraph_url: str | None = Field(default=None)
+
+
+class JobStatus(StrEnum):
+    """Статусы фоновой задачи создания воспоминания."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class MemoryJobModel(BaseModel):
+    """Модель данных для представления фоновой задачи создания воспоминания."""
+
+    id: str
+    status: JobStatus
+    memory_id: int | None = Field(default=None)
+    error: str | None = Field(default=None)
+    created_at: datetime
+    updated_at: datetime
+    result: SleepMemoryModel | None = Field(default=None)
+
+
+class BackfillReportModel(BaseModel):
+    """Модель данных для отчёта о повторном анализе воспоминаний без ответа AI."""
+
+    running: bool = Field(default=False)
+    processed: int = Field(default=0)
+    updated: int = Field(default=0)
+    failed: int = Field(default=0)
+    last_id: int = Field(default=0)
+    elapsed: float = Field(default=0.0)
+    rows_per_second: float = Field(default=0.0)
+    tokens_per_second: float = Field(default=0.0)
+
+
+class SleepMemoryPageModel(BaseModel):
+    """Модель данных для страницы списка воспоминаний."""
+
+    items: list[dict[str, Any]]
+    next_cursor: str | None = Field(default=None)
+
+
+class SearchResultModel(BaseModel):
+    """Модель данных для найденного воспоминания."""
+
+    id: int
+    title: str
+    created_at: datetime
+    telegraph_url: str | None = Field(default=None)
+    snippet: str = Field(default="")
+    rank: float | None = Field(default=None)
+
+
+class SearchPageModel(BaseModel):
+    """Модель данных для страницы результатов поиска."""
+
+    items: list[SearchResultModel]
+    next_offset: int | None = Field(default=None)
+
+
+class SimilarMemoryModel(BaseModel):
+    """Модель данных для похожего воспоминания."""
+
+    id: int
+    title: str
+    created_at: datetime
+    telegraph_url: str | None = Field(default=None)
+    score: float
+
+
+class SimilarPageModel(BaseModel):
+    """Модель данных для списка похожих воспоминаний."""
+
+    items: list[SimilarMemoryModel]
+
+
+class BulkOperation(StrEnum):
+    """Операции пакетного изменения воспоминаний."""
+
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class MemoryBulkOperationModel(BaseModel):
+    """Модель данных для одной операции пакетного изменения.
+
+    Для create нужен memory, для update - id и patch, для delete - id.
+    """
+
+    op: BulkOperation
+    id: int | None = Field(default=None)
+    memory: SleepMemoryCreateModel | None = Field(default=None)
+    patch: SleepMemoryUpdateModel | None = Field(default=None)
+
+
+class MemoryBulkRequestModel(BaseModel):
+    """Модель данных для запроса пакетного изменения воспоминаний."""
+
+    operations: list[MemoryBulkOperationModel] = Field(min_length=1, max_length=1000)
+
+
+class MemoryBulkItemModel(BaseModel):
+    """Модель данных для результата одной операции пакетного изменения."""
+
+    index: int
+    op: BulkOperation
+    success: bool
+    id: int | None = Field(default=None)
+    message: str | None = Field(default=None)
+    content: SleepMemoryModel | None = Field(default=None)
+
+
+class MemoryBulkResultModel(BaseModel):
+    """Модель данных для результата пакетного изменения, в порядке операций запроса."""
+
+    items: list[MemoryBulkItemModel]
+
+
+class ExportFormat(StrEnum):
+    """Форматы выгрузки воспоминаний."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class ImportErrorModel(BaseModel):
+    """Модель данных для ошибки в строке импорта."""
+
+    line: int
+    error: str
+
+
+class ImportReportModel(BaseModel):
+    """Модель данных для отчёта об импорте воспоминаний."""
+
+    lines: int = Field(default=0)
+    imported: int = Field(default=0)
+    failed: int = Field(default=0)
+    elapsed: float = Field(default=0.0)
+    rows_per_second: float = Field(default=0.0)
+    analysis_queued: bool = Field(default=False)
+    errors: list[ImportErrorModel] = Field(default_factory=list)
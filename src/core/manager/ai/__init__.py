@@ -1,5 +1,17 @@
 from .gemini import GeminiManager
+from .cache import ResponseCache
+from .openai_compatible import OpenAICompatibleManager
+from .router import AIBackend, AIBackendConfig, AIRouter, create_ai
+from .scheduler import AIRejectedError, AIScheduler
 
 __all__ = [
     "GeminiManager",
+    "ResponseCache",
+    "OpenAICompatibleManager",
+    "AIBackend",
+    "AIBackendConfig",
+    "AIRouter",
+    "create_ai",
+    "AIRejectedError",
+    "AIScheduler",
 ]
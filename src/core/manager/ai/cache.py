@@ -0,0 +1,164 @@
+import hashlib
+import json
+
+from datetime import datetime, timedelta
+
+from loguru import logger
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from ...entites.models import AIResponseCache
+from ...entites.schemas import SleepMemoryBaseModel
+from ...metrics import AI_CACHE_REQUESTS
+from ...utils import LRUCache
+from ..._config import config
+
+
+class ResponseCache:
+    """Двухуровневый кэш ответов AI: LRU в памяти процесса и таблица в базе данных.
+
+    Ключ - хэш нормализованного воспоминания, названия модели и текста промпта,
+    поэтому смена модели или промпта автоматически сбрасывает кэш.
+    """
+
+    PRUNE_EVERY = 100
+    """Раз во сколько записей чистить устаревшие и лишние строки в базе данных."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        ttl: int | None = None,
+        memory_size: int | None = None,
+        max_entries: int | None = None,
+    ):
+        """Инцилизация кэша
+
+        Args:
+            engine (AsyncEngine): асинхроннный движок
+            ttl (int | None, optional): Время жизни записи в секундах, если не указано берётся из config. Обычное состояние None.
+            memory_size (int | None, optional): Размер LRU в памяти, если не указан берётся из config. Обычное состояние None.
+            max_entries (int | None, optional): Максимум записей в базе данных, если не указан берётся из config. Обычное состояние None.
+        """
+        self.ttl = ttl or config.ai_cache_ttl
+        self.max_entries = max_entries or config.ai_cache_max_entries
+        self.Session: async_sessionmaker[AsyncSession] = async_sessionmaker(
+            bind=engine, expire_on_commit=False
+        )
+        self._memory: LRUCache[str, str] = LRUCache(
+            memory_size or config.ai_cache_memory_size, ttl=self.ttl
+        )
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def make_key(memory: SleepMemoryBaseModel, model: str, prompt: str) -> str:
+        """Построить ключ кэша
+
+        Args:
+            memory (SleepMemoryBaseModel): воспоминание
+            model (str): название модели
+            prompt (str): шаблон промпта
+
+        Returns:
+            str: sha256 ключ
+        """
+        payload = {
+            "title": " ".join(memory.title.split()).casefold(),
+            "content": " ".join(memory.content.split()).casefold(),
+            "date": memory.created_at.date().isoformat(),
+            "model": model,
+            "prompt": hashlib.sha256(prompt.encode()).hexdigest(),
+        }
+        return hashlib.sha256(
+            json.dumps(payload, ensure_ascii=False, sort_keys=True).encode()
+        ).hexdigest()
+
+    async def get(self, key: str) -> str | None:
+        """Получить ответ из кэша
+
+        Args:
+            key (str): ключ кэша
+
+        Returns:
+            str | None: закэшированный ответ или None
+        """
+        response = self._memory.get(key)
+        if response is not None:
+            AI_CACHE_REQUESTS.labels("memory", "hit").inc()
+            self._hits += 1
+            return response
+        AI_CACHE_REQUESTS.labels("memory", "miss").inc()
+
+        try:
+            async with self.Session() as session:
+                row = await session.get(AIResponseCache, key)
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать кэш ответов AI: {e}")
+            row = None
+
+        if row is None or row.created_at < self._expired_before():
+            AI_CACHE_REQUESTS.labels("db", "miss").inc()
+            self._misses += 1
+            return None
+
+        AI_CACHE_REQUESTS.labels("db", "hit").inc()
+        self._hits += 1
+        self._memory.set(key, row.response)
+        return row.response
+
+    async def set(self, key: str, model: str, response: str) -> None:
+        """Сохранить ответ в кэш
+
+        Args:
+            key (str): ключ кэша
+            model (str): название модели
+            response (str): ответ модели
+        """
+        self._memory.set(key, response)
+        try:
+            async with self.Session() as session, session.begin():
+                await session.merge(
+                    AIResponseCache(
+                        key=key,
+                        model=model,
+                        response=response,
+                        created_at=datetime.now(),
+                    )
+                )
+
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                await self.prune()
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить ответ AI в кэш: {e}")
+
+    async def prune(self) -> None:
+        """Удалить устаревшие записи и записи сверх лимита"""
+        async with self.Session() as session, session.begin():
+            await session.execute(
+                delete(AIResponseCache).where(
+                    AIResponseCache.created_at < self._expired_before()
+                )
+            )
+            newest = (
+                select(AIResponseCache.key)
+                .order_by(AIResponseCache.created_at.desc())
+                .limit(self.max_entries)
+            )
+            await session.execute(
+                delete(AIResponseCache).where(AIResponseCache.key.not_in(newest))
+            )
+        logger.debug("Кэш ответов AI очищен от устаревших записей")
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Получить статистику попаданий в кэш"""
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "memory_size": len(self._memory),
+        }
+
+    def _expired_before(self) -> datetime:
+        return datetime.now() - timedelta(seconds=self.ttl)
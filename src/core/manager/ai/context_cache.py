@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from google import genai
+from google.genai import types
+from loguru import logger
+
+
+class ContextCache:
+    """Системная инструкция, зарегистрированная в Gemini как cached content.
+
+    Инструкция загружается один раз, дальше запросы ссылаются на неё по имени
+    и не оплачивают её токены по полной цене. Перед истечением TTL кэш продлевается,
+    а если создать его не удалось (например, инструкция короче минимального
+    размера кэша для модели), запросы идут с обычной system instruction
+    и повторная попытка делается через RETRY_AFTER секунд.
+    """
+
+    REFRESH_BEFORE = 300
+    """За сколько секунд до истечения продлевать кэш."""
+
+    RETRY_AFTER = 3600
+    """Через сколько секунд повторить создание кэша после ошибки."""
+
+    def __init__(
+        self, client: genai.Client, model: str, system_instruction: str, ttl: int
+    ):
+        """Инцилизация
+
+        Args:
+            client (genai.Client): Клиент Gemini.
+            model (str): Модель, кэш привязан к ней.
+            system_instruction (str): Системная инструкция.
+            ttl (int): Время жизни кэша в секундах.
+        """
+        self.client = client
+        self.model = model
+        self.system_instruction = system_instruction
+        self.ttl = ttl
+        self._name: str | None = None
+        self._expires_at = 0.0
+        self._retry_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> str | None:
+        """Имя кэша, при необходимости кэш создаётся или продлевается
+
+        Returns:
+            str | None: Имя cached content или None, если кэш недоступен.
+        """
+        if self._fresh():
+            return self._name
+
+        async with self._lock:
+            if self._fresh():
+                return self._name
+            now = time.monotonic()
+            if self._name is None and now < self._retry_at:
+                return None
+
+            try:
+                if self._name is not None and now < self._expires_at:
+                    await self.client.aio.caches.update(
+                        name=self._name,
+                        config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"),
+                    )
+                    logger.debug(f"Кэш инструкций Gemini продлён ({self._name})")
+                else:
+                    cached = await self.client.aio.caches.create(
+                        model=self.model,
+                        config=types.CreateCachedContentConfig(
+                            system_instruction=self.system_instruction,
+                            ttl=f"{self.ttl}s",
+                            display_name="sleep-ai-instructions",
+                        ),
+                    )
+                    self._name = cached.name
+                    logger.success(f"Кэш инструкций Gemini создан ({self._name})")
+                self._expires_at = now + self.ttl
+            except Exception as e:
+                logger.warning(
+                    f"Не удалось закэшировать инструкции Gemini, повтор через {self.RETRY_AFTER} сек.: {e}"
+                )
+                self._name = None
+                self._retry_at = now + self.RETRY_AFTER
+            return self._name
+
+    def invalidate(self) -> None:
+        """Забыть кэш, например если Gemini его уже удалил"""
+        self._name = None
+
+    def _fresh(self) -> bool:
+        return (
+            self._name is not None
+            and time.monotonic() < self._expires_at - self.REFRESH_BEFORE
+        )
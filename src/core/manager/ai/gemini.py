@@ -1,6 +1,11 @@
+import asyncio
+
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
 from loguru import logger
 from google import genai
-from httpx import AsyncClient
+from google.genai import errors, types
+from httpx import AsyncClient, TransportError
 
 from ...entites.schemas import (
     SleepMemoryBaseModel,
@@ -8,17 +13,33 @@ from ...entites.schemas import (
     BaseResponseModel,
 )
 from ...abstract.ai import AIInterface
+from ...metrics import record_tokens
+from ...tracing import current_span, span
+from ...utils import Resilience
 from ..._config import config
+from .cache import ResponseCache
+from .context_cache import ContextCache
+
+
+_T = TypeVar("_T")
 
 
 class GeminiManager(AIInterface):
-    """Класс для взаимодействия с моделью Gemini от Google для анализа снов и воспоминаний."""
+    """Класс для взаимодействия с моделью Gemini от Google для анализа снов и воспоминаний.
+    Запросы идут через Resilience: дедлайн, повторы при 429/5xx и предохранитель.
+    SYSTEM_INSTRUCTION передаётся как system instruction и кэшируется в Gemini
+    (ContextCache), в каждом запросе отправляется только воспоминание."""
+
+    RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+    """Коды ответа Gemini, после которых запрос можно повторить."""
 
     def __init__(
         self,
         httpx_client: AsyncClient,
         api_key: str | None = None,
         model: str | None = None,
+        cache: ResponseCache | None = None,
+        name: str | None = None,
     ):
         """Класс для взаимодействия с моделью Gemini от Google для анализа снов и воспоминаний.
 
@@ -26,18 +47,41 @@ class GeminiManager(AIInterface):
             httpx_client (AsyncClient): Асинхронный HTTP-клиент для выполнения запросов к API Gemini.
             api_key (str | None, optional): API-ключ для доступа к модели Gemini. Если не предоставлен, будет использован ключ из конфигурации. Обычное состояние None
             model (str | None, optional): Название модели Gemini для генерации контента. Если не предоставлено, будет использовано значение из конфигурации. Обычное состояние None
+            cache (ResponseCache | None, optional): Кэш ответов, при попадании запрос к модели не выполняется. Обычное состояние None
+            name (str | None, optional): Название для логов и метрик, если несколько моделей или ключей работают через AIRouter. Обычное состояние None
         """
         self.api_key = api_key or config.gemini_api_key
         self.model = model or config.gemini_model
-        self._client = genai.Client(
-            api_key=api_key, http_options={"httpx_async_client": httpx_client}
+        self.cache = cache
+        http_options = {"httpx_async_client": httpx_client}
+        if config.gemini_base_url:
+            http_options["base_url"] = config.gemini_base_url
+        self._client = genai.Client(api_key=self.api_key, http_options=http_options)
+        self.resilience = Resilience(
+            name or "gemini",
+            timeout=config.gemini_timeout,
+            attempts=config.gemini_attempts,
+            retryable=self._retryable,
+            hedge=config.gemini_hedge,
+            failure_threshold=config.circuit_failures,
+            reset_timeout=config.circuit_reset,
+        )
+        self.context = (
+            ContextCache(
+                self._client,
+                self.model,
+                self.SYSTEM_INSTRUCTION,
+                config.gemini_context_cache_ttl,
+            )
+            if config.gemini_context_cache
+            else None
         )
 
     async def generate_response(
         self, memory: SleepMemoryBaseModel
     ) -> BaseResponseModel[SleepMemoryCreateModel]:
         """Сгенерировать ответ от AI.
-        Промпт будт использоваться из переменной PROMPT_TEMPLATE.
+        Инструкции берутся из SYSTEM_INSTRUCTION, воспоминание из memory_prompt.
 
         Args:
             memory (SleepMemoryBaseModel): Данные сна или воспоминания, которые нужно проанализировать. Ожидается, что это будет экземпляр модели Pydantic, содержащий все необходимые поля для анализа.
@@ -46,13 +90,36 @@ class GeminiManager(AIInterface):
             SleepMemoryCreateModel: Модель с результатами анализа, включая оригинальные данные и сгенерированный текст.
         """
         logger.info(f"Генерация ответа для воспоминания: '{memory.title}'")
-        memory_data = memory.model_dump_json()
-        prompt = self.PROMPT_TEMPLATE.format(memory_data=memory_data)
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(memory, self.model, self.PROMPT_TEMPLATE)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Ответ взят из кэша (key={cache_key[:12]})")
+                return BaseResponseModel(
+                    success=True,
+                    message="Успешно удалось сгенерировать мнение Ai",
+                    content=SleepMemoryCreateModel(
+                        **memory.model_dump(), ai_thoughts=cached
+                    ),
+                )
+
+        prompt = self.memory_prompt(memory)
 
         try:
-            response = await self.client.aio.models.generate_content(
-                model=self.model, contents=prompt
-            )
+            with span(
+                "gemini.generate", model=self.model, prompt_chars=len(prompt)
+            ) as current:
+                response = await self.resilience.call(
+                    lambda: self._with_context(
+                        lambda generate_config: self.client.aio.models.generate_content(
+                            model=self.model, contents=prompt, config=generate_config
+                        )
+                    )
+                )
+                self._record_usage(response.usage_metadata)
+                if current is not None:
+                    current.set(response_chars=len(response.text or ""))
 
             if response.text is None:
                 logger.warning("Ответ от модели Gemini не содержит текста.")
@@ -60,6 +127,8 @@ class GeminiManager(AIInterface):
                 logger.debug(
                     f"Ответ от модели Gemini успешно получен. (len={len(response.text)})"
                 )
+                if cache_key is not None:
+                    await self.cache.set(cache_key, self.model, response.text)
 
             output_memory = SleepMemoryCreateModel(
                 **memory.model_dump(),
@@ -81,6 +150,103 @@ class GeminiManager(AIInterface):
                 content=SleepMemoryCreateModel(**memory.model_dump()),
             )
 
+    async def stream_response(self, memory: SleepMemoryBaseModel) -> AsyncIterator[str]:
+        """Сгенерировать ответ от AI по частям через стриминг Gemini.
+        Инструкции берутся из SYSTEM_INSTRUCTION, воспоминание из memory_prompt.
+
+        Args:
+            memory (SleepMemoryBaseModel): Данные сна или воспоминания, которые нужно проанализировать.
+
+        Yields:
+            str: Очередной фрагмент текста ответа.
+        """
+        logger.info(f"Стриминг ответа для воспоминания: '{memory.title}'")
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(memory, self.model, self.PROMPT_TEMPLATE)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Ответ взят из кэша (key={cache_key[:12]})")
+                yield cached
+                return
+
+        prompt = self.memory_prompt(memory)
+
+        async def open_stream(generate_config: types.GenerateContentConfig):
+            stream = await self.client.aio.models.generate_content_stream(
+                model=self.model, contents=prompt, config=generate_config
+            )
+            return stream, await anext(stream, None)
+
+        with span(
+            "gemini.stream", model=self.model, prompt_chars=len(prompt)
+        ) as current:
+            # повторяется только начало стрима, дальше каждый фрагмент ждём не дольше дедлайна
+            stream, chunk = await self.resilience.call(
+                lambda: self._with_context(open_stream),
+                discard=lambda opened: opened[0].aclose(),
+            )
+            parts: list[str] = []
+            usage = None
+            while chunk is not None:
+                usage = chunk.usage_metadata or usage
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+                async with asyncio.timeout(self.resilience.timeout):
+                    chunk = await anext(stream, None)
+
+            logger.debug(f"Стриминг от модели Gemini завершён. (chunks={len(parts)})")
+            self._record_usage(usage)
+            if current is not None:
+                current.set(chunks=len(parts), response_chars=sum(map(len, parts)))
+        if cache_key is not None and parts:
+            await self.cache.set(cache_key, self.model, "".join(parts))
+
+    async def _with_context(
+        self, request: Callable[[types.GenerateContentConfig], Awaitable[_T]]
+    ) -> _T:
+        """Выполнить запрос с закэшированной инструкцией, а если кэша нет
+        или Gemini его уже удалил - с обычной system instruction"""
+        name = await self.context.get() if self.context is not None else None
+        if name is not None:
+            try:
+                return await request(types.GenerateContentConfig(cached_content=name))
+            except errors.APIError as e:
+                if e.code not in (403, 404):
+                    raise
+                logger.warning(f"Кэш инструкций Gemini недоступен ({name}): {e}")
+                self.context.invalidate()
+
+        return await request(
+            types.GenerateContentConfig(system_instruction=self.SYSTEM_INSTRUCTION)
+        )
+
+    def _record_usage(self, usage: types.GenerateContentResponseUsageMetadata | None):
+        """Записать расход токенов запроса в лог и метрики"""
+        if usage is None:
+            return
+
+        tokens = {
+            "prompt": usage.prompt_token_count or 0,
+            "cached": usage.cached_content_token_count or 0,
+            "output": usage.candidates_token_count or 0,
+        }
+        record_tokens(self.resilience.name, tokens)
+        current = current_span()
+        if current is not None:
+            current.set(**{f"tokens.{kind}": count for kind, count in tokens.items()})
+        logger.debug(
+            f"Токены Gemini ({self.model}): "
+            + ", ".join(f"{kind}={count}" for kind, count in tokens.items())
+        )
+
+    @classmethod
+    def _retryable(cls, error: BaseException) -> bool:
+        if isinstance(error, errors.APIError):
+            return error.code in cls.RETRYABLE_CODES
+        return isinstance(error, TransportError)
+
     @property
     def client(self) -> genai.Client:
         """Геттер для доступа к экземпляру клиента Gemini."""
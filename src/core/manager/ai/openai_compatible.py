@@ -0,0 +1,204 @@
+import asyncio
+import json
+
+from typing import AsyncIterator
+
+from loguru import logger
+from httpx import AsyncClient, HTTPStatusError, Response, TransportError
+
+from ...entites.schemas import (
+    SleepMemoryBaseModel,
+    SleepMemoryCreateModel,
+    BaseResponseModel,
+)
+from ...abstract.ai import AIInterface
+from ...metrics import record_tokens
+from ...tracing import current_span
+from ...utils import Resilience
+from ..._config import config
+from .cache import ResponseCache
+
+
+class OpenAICompatibleManager(AIInterface):
+    """Модель за OpenAI-совместимым HTTP API (POST /chat/completions):
+    OpenAI, vLLM, llama.cpp server, Ollama или локальная заглушка.
+    Запросы идут через Resilience, как у GeminiManager. Инструкции отправляются
+    отдельным system сообщением в начале, чтобы серверы с кэшем префикса
+    (vLLM, llama.cpp) не считали их заново."""
+
+    def __init__(
+        self,
+        httpx_client: AsyncClient,
+        base_url: str,
+        model: str,
+        api_key: str | None = None,
+        cache: ResponseCache | None = None,
+        name: str | None = None,
+    ):
+        """Инцилизация
+
+        Args:
+            httpx_client (AsyncClient): Асинхронный HTTP-клиент.
+            base_url (str): Адрес API, например http://localhost:8080/v1.
+            model (str): Название модели.
+            api_key (str | None, optional): Ключ, передаётся в заголовке Authorization. Обычное состояние None.
+            cache (ResponseCache | None, optional): Кэш ответов, при попадании запрос к модели не выполняется. Обычное состояние None.
+            name (str | None, optional): Название для логов и метрик. Обычное состояние None.
+        """
+        self.client = httpx_client
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key
+        self.cache = cache
+        self.resilience = Resilience(
+            name or "openai",
+            timeout=config.gemini_timeout,
+            attempts=config.gemini_attempts,
+            retryable=self._retryable,
+            failure_threshold=config.circuit_failures,
+            reset_timeout=config.circuit_reset,
+        )
+
+    async def generate_response(
+        self, memory: SleepMemoryBaseModel
+    ) -> BaseResponseModel[SleepMemoryCreateModel]:
+        logger.info(
+            f"Генерация ответа для воспоминания: '{memory.title}' ({self.model})"
+        )
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(memory, self.model, self.PROMPT_TEMPLATE)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return self._success(memory, cached)
+
+        async def fetch() -> Response:
+            response = await self.client.post(
+                self.url, json=self._payload(memory), headers=self._headers()
+            )
+            response.raise_for_status()
+            return response
+
+        try:
+            response = await self.resilience.call(fetch)
+            data = response.json()
+            text = data["choices"][0]["message"]["content"]
+            self._record_usage(data.get("usage"))
+        except Exception as e:
+            logger.error(f"Ошибка при генерации ответа от модели {self.model}: {e}")
+            return BaseResponseModel(
+                success=False,
+                message=f"Ошибка при обработке ответа от модели {self.model}: {str(e)}",
+                content=SleepMemoryCreateModel(**memory.model_dump()),
+            )
+
+        if text and cache_key is not None:
+            await self.cache.set(cache_key, self.model, text)
+        return self._success(memory, text)
+
+    async def stream_response(self, memory: SleepMemoryBaseModel) -> AsyncIterator[str]:
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(memory, self.model, self.PROMPT_TEMPLATE)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        async def open_stream() -> Response:
+            request = self.client.build_request(
+                "POST",
+                self.url,
+                json=self._payload(memory, stream=True),
+                headers=self._headers(),
+            )
+            response = await self.client.send(request, stream=True)
+            if response.is_error:
+                await response.aread()
+                await response.aclose()
+                response.raise_for_status()
+            return response
+
+        response = await self.resilience.call(
+            open_stream, discard=lambda response: response.aclose()
+        )
+        parts: list[str] = []
+        try:
+            lines = response.aiter_lines()
+            while True:
+                async with asyncio.timeout(self.resilience.timeout):
+                    line = await anext(lines, None)
+                if line is None:
+                    break
+                data = line.removeprefix("data:").strip()
+                if not line.startswith("data:") or not data:
+                    continue
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                self._record_usage(event.get("usage"))
+                if not event.get("choices"):
+                    continue
+                delta = event["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    parts.append(delta["content"])
+                    yield delta["content"]
+        finally:
+            await response.aclose()
+
+        if cache_key is not None and parts:
+            await self.cache.set(cache_key, self.model, "".join(parts))
+
+    def _payload(self, memory: SleepMemoryBaseModel, stream: bool = False) -> dict:
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.SYSTEM_INSTRUCTION},
+                {"role": "user", "content": self.memory_prompt(memory)},
+            ],
+            "stream": stream,
+        }
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    def _record_usage(self, usage: dict | None) -> None:
+        """Записать расход токенов запроса в лог и метрики"""
+        if not usage:
+            return
+
+        tokens = {
+            "prompt": usage.get("prompt_tokens") or 0,
+            "cached": (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+            or 0,
+            "output": usage.get("completion_tokens") or 0,
+        }
+        record_tokens(self.resilience.name, tokens)
+        current = current_span()
+        if current is not None:
+            current.set(**{f"tokens.{kind}": count for kind, count in tokens.items()})
+        logger.debug(
+            f"Токены {self.model}: "
+            + ", ".join(f"{kind}={count}" for kind, count in tokens.items())
+        )
+
+    def _headers(self) -> dict[str, str]:
+        if not self.api_key:
+            return {}
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    @staticmethod
+    def _success(
+        memory: SleepMemoryBaseModel, text: str | None
+    ) -> BaseResponseModel[SleepMemoryCreateModel]:
+        return BaseResponseModel(
+            success=True,
+            message="Успешно удалось сгенерировать мнение Ai",
+            content=SleepMemoryCreateModel(**memory.model_dump(), ai_thoughts=text),
+        )
+
+    @staticmethod
+    def _retryable(error: BaseException) -> bool:
+        if isinstance(error, HTTPStatusError):
+            return error.response.status_code == 429 or error.response.is_server_error
+        return isinstance(error, TransportError)
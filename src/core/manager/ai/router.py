@@ -0,0 +1,292 @@
+import time
+
+from collections import deque
+from typing import AsyncIterator, Literal
+
+from httpx import AsyncClient
+from loguru import logger
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
+
+from ...abstract.ai import AIInterface
+from ...entites.schemas import (
+    BaseResponseModel,
+    SleepMemoryBaseModel,
+    SleepMemoryCreateModel,
+)
+from ...metrics import AI_BACKEND_LATENCY, AI_BACKEND_REQUESTS
+from ...tracing import span
+from ...utils import CircuitState
+from ..._config import config
+from .cache import ResponseCache
+from .gemini import GeminiManager
+from .openai_compatible import OpenAICompatibleManager
+
+
+class AIBackendConfig(BaseModel):
+    """Описание бэкенда в AI_BACKENDS"""
+
+    type: Literal["gemini", "openai"] = Field(default="gemini")
+    """gemini - Google Gemini, openai - OpenAI-совместимый API."""
+    name: str | None = Field(default=None)
+    """Название для логов и метрик, по умолчанию тип и модель."""
+    model: str | None = Field(default=None)
+    """Модель, для gemini по умолчанию GEMINI_MODEL."""
+    api_key: str | None = Field(default=None)
+    """Ключ, для gemini по умолчанию GEMINI_API_KEY."""
+    base_url: str | None = Field(default=None)
+    """Адрес OpenAI-совместимого API, например http://localhost:8080/v1."""
+    rpm: int | None = Field(default=None)
+    """Квота запросов в минуту, None - без ограничения."""
+    concurrency: int = Field(default=4)
+    """Сколько запросов бэкенд выдерживает одновременно, дальше он считается загруженным."""
+    max_input_chars: int | None = Field(default=None)
+    """Самое длинное воспоминание (название и содержание) в символах, которое можно отправить."""
+
+    @model_validator(mode="after")
+    def check_openai(self) -> "AIBackendConfig":
+        if self.type == "openai" and not (self.base_url and self.model):
+            raise ValueError("Для бэкенда openai нужны base_url и model")
+        return self
+
+
+class AIBackend:
+    """Бэкенд роутера со скользящей статистикой задержки, ошибок и квоты"""
+
+    ALPHA = 0.2
+    """Вес нового значения в скользящих средних задержки и доли ошибок."""
+
+    QUOTA_COOLDOWN = 60.0
+    """Сколько секунд не отправлять запросы после ответа о превышении квоты."""
+
+    DEFAULT_LATENCY = 2.0
+    """Задержка для оценки бэкенда, который ещё ни разу не ответил успешно (в секундах)."""
+
+    def __init__(
+        self,
+        name: str,
+        ai: AIInterface,
+        rpm: int | None = None,
+        concurrency: int = 4,
+        max_input_chars: int | None = None,
+    ):
+        """Инцилизация
+
+        Args:
+            name (str): Название для логов и метрик.
+            ai (AIInterface): Реализация AI.
+            rpm (int | None, optional): Квота запросов в минуту. Обычное состояние None.
+            concurrency (int, optional): Сколько запросов одновременно до того, как бэкенд считается загруженным. Обычное состояние 4.
+            max_input_chars (int | None, optional): Ограничение длины воспоминания в символах. Обычное состояние None.
+        """
+        self.name = name
+        self.ai = ai
+        self.rpm = rpm
+        self.concurrency = concurrency
+        self.max_input_chars = max_input_chars
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self._sent: deque[float] = deque()
+        self._cooldown_until = 0.0
+
+    def fits(self, length: int) -> bool:
+        """Помещается ли воспоминание такой длины"""
+        return self.max_input_chars is None or length <= self.max_input_chars
+
+    def remaining(self, now: float) -> float:
+        """Доля оставшейся квоты на текущую минуту, от 0 до 1"""
+        if now < self._cooldown_until:
+            return 0.0
+        if self.rpm is None:
+            return 1.0
+        while self._sent and self._sent[0] <= now - 60:
+            self._sent.popleft()
+        return max(0.0, 1 - len(self._sent) / self.rpm)
+
+    def ready(self, now: float) -> bool:
+        """Есть квота и предохранитель не разомкнут"""
+        resilience = getattr(self.ai, "resilience", None)
+        if resilience is not None and resilience.breaker.state == CircuitState.OPEN:
+            return False
+        return self.remaining(now) > 0
+
+    def saturated(self) -> bool:
+        return self.in_flight >= self.concurrency
+
+    def score(self, now: float) -> float:
+        """Ожидаемая стоимость запроса, меньше - лучше.
+        Учитывает задержку, загрузку, долю ошибок и расход квоты."""
+        # без априорной задержки бэкенд, который только ошибается, оценивался бы в 0
+        latency = self.DEFAULT_LATENCY if self.latency is None else self.latency
+        load = 1 + self.in_flight / self.concurrency
+        errors = 1 / (1 - min(self.error_rate, 0.9))
+        quota = 2 - self.remaining(now)
+        return latency * load * errors * quota
+
+    def started(self) -> float:
+        now = time.monotonic()
+        self.in_flight += 1
+        self._sent.append(now)
+        return now
+
+    def finished(self, started: float, error: str | None) -> None:
+        duration = time.monotonic() - started
+        self.in_flight -= 1
+        self.error_rate += self.ALPHA * ((error is not None) - self.error_rate)
+        AI_BACKEND_REQUESTS.labels(self.name, "error" if error else "success").inc()
+        if error is None:
+            self.latency = (
+                duration
+                if self.latency is None
+                else self.latency + self.ALPHA * (duration - self.latency)
+            )
+            AI_BACKEND_LATENCY.labels(self.name).observe(duration)
+        elif "429" in error or "RESOURCE_EXHAUSTED" in error:
+            logger.warning(
+                f"Квота {self.name} исчерпана, пауза {self.QUOTA_COOLDOWN:.0f} сек."
+            )
+            self._cooldown_until = time.monotonic() + self.QUOTA_COOLDOWN
+
+    def release(self) -> None:
+        """Запрос прерван без ответа: освободить место, не учитывая его в задержке и ошибках"""
+        self.in_flight -= 1
+
+
+class AIRouter(AIInterface):
+    """Маршрутизация запросов между несколькими бэкендами AI.
+
+    Для каждого запроса бэкенды упорядочиваются по скользящей задержке,
+    доле ошибок, оставшейся квоте и загрузке, бэкенды, которым воспоминание
+    не подходит по длине, пропускаются. Сначала пробуются незагруженные,
+    затем загруженные (перелив). Если бэкенд вернул ошибку, запрос уходит
+    следующему, но не больше MAX_ATTEMPTS раз.
+    """
+
+    MAX_ATTEMPTS = 3
+    """На сколько бэкендов максимум отправлять один запрос."""
+
+    def __init__(self, backends: list[AIBackend]):
+        """Инцилизация
+
+        Args:
+            backends (list[AIBackend]): Бэкенды.
+        """
+        self.backends = backends
+
+    def candidates(self, memory: SleepMemoryBaseModel) -> list[AIBackend]:
+        """Бэкенды в порядке, в котором их стоит пробовать
+
+        Args:
+            memory (SleepMemoryBaseModel): воспоминание
+
+        Returns:
+            list[AIBackend]: Бэкенды, лучший первый.
+        """
+        now = time.monotonic()
+        length = len(memory.title) + len(memory.content)
+        backends = [backend for backend in self.backends if backend.fits(length)]
+        ready = [backend for backend in backends if backend.ready(now)] or backends
+        return sorted(
+            ready, key=lambda backend: (backend.saturated(), backend.score(now))
+        )[: self.MAX_ATTEMPTS]
+
+    async def generate_response(
+        self, memory: SleepMemoryBaseModel
+    ) -> BaseResponseModel[SleepMemoryCreateModel]:
+        response = BaseResponseModel(
+            success=False,
+            message="Нет бэкенда AI, которому подходит это воспоминание",
+            content=SleepMemoryCreateModel(**memory.model_dump()),
+        )
+        backends = self.candidates(memory)
+        for number, backend in enumerate(backends, 1):
+            started = backend.started()
+            try:
+                with span("ai.backend", backend=backend.name):
+                    response = await backend.ai.generate_response(memory)
+            except Exception as e:
+                backend.finished(started, str(e) or type(e).__name__)
+                if number == len(backends):
+                    raise
+                logger.warning(f"Бэкенд {backend.name} не ответил: {e}")
+                continue
+            except BaseException:
+                backend.release()
+                raise
+            backend.finished(started, None if response.success else response.message)
+            if response.success:
+                return response
+            logger.warning(f"Бэкенд {backend.name} не ответил: {response.message}")
+        return response
+
+    async def stream_response(self, memory: SleepMemoryBaseModel) -> AsyncIterator[str]:
+        backends = self.candidates(memory)
+        if not backends:
+            raise RuntimeError("Нет бэкенда AI, которому подходит это воспоминание")
+
+        for number, backend in enumerate(backends, 1):
+            started = backend.started()
+            sent = False
+            try:
+                with span("ai.backend", backend=backend.name):
+                    async for chunk in backend.ai.stream_response(memory):
+                        sent = True
+                        yield chunk
+            except Exception as e:
+                backend.finished(started, str(e) or type(e).__name__)
+                # после первого фрагмента переключаться уже поздно
+                if sent or number == len(backends):
+                    raise
+                logger.warning(f"Бэкенд {backend.name} не ответил: {e}")
+                continue
+            except BaseException:
+                # отмена или потребитель бросил поток (GeneratorExit)
+                backend.release()
+                raise
+            backend.finished(started, None)
+            return
+
+
+def create_ai(
+    httpx_client: AsyncClient, cache: ResponseCache | None = None
+) -> AIInterface:
+    """Создать AI по настройкам: AIRouter, если задан AI_BACKENDS, иначе GeminiManager
+
+    Args:
+        httpx_client (AsyncClient): Асинхронный HTTP-клиент.
+        cache (ResponseCache | None, optional): Кэш ответов для всех бэкендов. Обычное состояние None.
+
+    Returns:
+        AIInterface: Реализация AI.
+    """
+    if not config.ai_backends:
+        return GeminiManager(httpx_client, cache=cache)
+
+    backends = []
+    for item in TypeAdapter(list[AIBackendConfig]).validate_json(config.ai_backends):
+        if item.type == "gemini":
+            model = item.model or config.gemini_model
+            name = item.name or f"gemini:{model}:{len(backends)}"
+            ai = GeminiManager(
+                httpx_client,
+                api_key=item.api_key or config.gemini_api_key,
+                model=model,
+                cache=cache,
+                name=name,
+            )
+        else:
+            name = item.name or f"openai:{item.model}:{len(backends)}"
+            ai = OpenAICompatibleManager(
+                httpx_client,
+                base_url=item.base_url,
+                model=item.model,
+                api_key=item.api_key,
+                cache=cache,
+                name=name,
+            )
+        backends.append(
+            AIBackend(name, ai, item.rpm, item.concurrency, item.max_input_chars)
+        )
+
+    logger.info(f"AI роутер: {', '.join(backend.name for backend in backends)}")
+    return AIRouter(backends)
@@ -0,0 +1,224 @@
+import asyncio
+import time
+
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator
+
+from ...abstract.ai import AIInterface
+from ...entites.schemas import (
+    BaseResponseModel,
+    SleepMemoryBaseModel,
+    SleepMemoryCreateModel,
+)
+from ...metrics import (
+    AI_SCHEDULER_ACTIVE,
+    AI_SCHEDULER_QUEUE,
+    AI_SCHEDULER_REJECTED,
+    AI_SCHEDULER_WAIT,
+)
+from ...tracing import span
+from ..._config import config
+
+
+_client: ContextVar[str | None] = ContextVar("ai_client", default=None)
+
+
+class AIRejectedError(RuntimeError):
+    """Запрос к AI отклонён: исчерпан лимит клиента или очередь переполнена"""
+
+    def __init__(self, retry_after: float):
+        """Инцилизация
+
+        Args:
+            retry_after (float): Через сколько секунд можно повторить запрос.
+        """
+        self.retry_after = retry_after
+        super().__init__(
+            f"Слишком много запросов, попробуйте через {max(1, round(retry_after))} сек."
+        )
+
+
+class AIScheduler(AIInterface):
+    """Планировщик запросов к AI, стоит перед любой реализацией AIInterface.
+
+    Одновременно выполняется не больше concurrency запросов, остальные ждут
+    в очереди. Очередь справедливая: клиенты обслуживаются по кругу, поэтому
+    один клиент с пачкой запросов не задерживает остальных. У каждого клиента
+    есть token bucket на rate запросов в минуту с запасом burst. Если лимит
+    исчерпан или очередь заполнена, запрос сразу отклоняется.
+
+    Клиент берётся из контекста (AIScheduler.client), например
+    "tg:<id пользователя>" в боте. Внутренние запросы без клиента
+    (фоновые задачи) не ограничиваются по частоте и не отклоняются,
+    но стоят в общей очереди. Запросы клиента BACKGROUND тоже не ограничиваются,
+    но получают место, только когда в очереди нет других запросов.
+    """
+
+    MAX_BUCKETS = 10_000
+    """После скольких клиентов удалять полные (давно неактивные) bucket'ы."""
+
+    BACKGROUND = "background"
+    """Клиент с низким приоритетом для фоновой обработки, например повторного анализа."""
+
+    def __init__(
+        self,
+        ai: AIInterface,
+        concurrency: int | None = None,
+        queue_size: int | None = None,
+        rate: float | None = None,
+        burst: int | None = None,
+    ):
+        """Инцилизация
+
+        Args:
+            ai (AIInterface): Менеджер ИИ, к которому идут запросы.
+            concurrency (int | None, optional): Сколько запросов выполнять одновременно, если не указано берётся из config. Обычное состояние None.
+            queue_size (int | None, optional): Сколько запросов может ждать в очереди, если не указано берётся из config. Обычное состояние None.
+            rate (float | None, optional): Запросов в минуту на клиента, если не указано берётся из config. Обычное состояние None.
+            burst (int | None, optional): Сколько запросов клиент может сделать подряд, если не указано берётся из config. Обычное состояние None.
+        """
+        self.ai = ai
+        self.concurrency = concurrency or config.ai_concurrency
+        self.queue_size = queue_size or config.ai_queue_size
+        self.rate = (rate or config.ai_client_rpm) / 60
+        self.burst = burst or config.ai_client_burst
+
+        self._active = 0
+        self._waiting = 0
+        self._queues: OrderedDict[str | None, deque[asyncio.Future]] = OrderedDict()
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._duration = 10.0
+
+    @staticmethod
+    @contextmanager
+    def client(key: str | None) -> Iterator[None]:
+        """Выполнять запросы к AI от имени клиента
+
+        Args:
+            key (str | None): ключ клиента, например "tg:123" или "ip:127.0.0.1"
+        """
+        token = _client.set(key)
+        try:
+            yield
+        finally:
+            _client.reset(token)
+
+    def admit(self, key: str) -> float | None:
+        """Проверить, можно ли принять запрос клиента, и списать токен
+
+        Args:
+            key (str): ключ клиента
+
+        Returns:
+            float | None: None, если запрос принят, иначе через сколько секунд повторить.
+        """
+        if self._waiting >= self.queue_size:
+            AI_SCHEDULER_REJECTED.labels("queue").inc()
+            return self._duration * (self._waiting + 1) / self.concurrency
+
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            AI_SCHEDULER_REJECTED.labels("rate").inc()
+            return (1 - tokens) / self.rate
+
+        self._buckets[key] = (tokens - 1, now)
+        if len(self._buckets) > self.MAX_BUCKETS:
+            self._prune(now)
+        return None
+
+    async def generate_response(
+        self, memory: SleepMemoryBaseModel
+    ) -> BaseResponseModel[SleepMemoryCreateModel]:
+        try:
+            async with self._slot():
+                return await self.ai.generate_response(memory)
+        except AIRejectedError as e:
+            return BaseResponseModel(
+                success=False,
+                message=str(e),
+                content=SleepMemoryCreateModel(**memory.model_dump()),
+            )
+
+    async def stream_response(self, memory: SleepMemoryBaseModel) -> AsyncIterator[str]:
+        async with self._slot():
+            async for chunk in self.ai.stream_response(memory):
+                yield chunk
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Дождаться своей очереди и занять место среди выполняющихся запросов"""
+        key = _client.get()
+        if key is not None and key != self.BACKGROUND:
+            retry_after = self.admit(key)
+            if retry_after is not None:
+                raise AIRejectedError(retry_after)
+
+        started = time.monotonic()
+        if self._active < self.concurrency and not self._waiting:
+            self._active += 1
+        else:
+            with span("ai.queue", waiting=self._waiting):
+                await self._wait(key)
+        AI_SCHEDULER_WAIT.observe(time.monotonic() - started)
+        AI_SCHEDULER_ACTIVE.set(self._active)
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._duration = 0.8 * self._duration + 0.2 * (time.monotonic() - started)
+            self._release()
+
+    async def _wait(self, key: str | None) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(future)
+        self._waiting += 1
+        AI_SCHEDULER_QUEUE.set(self._waiting)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # место уже передано этому запросу, отдаём его следующему
+                self._release()
+            else:
+                queue = self._queues.get(key)
+                if queue is not None and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self._queues[key]
+            raise
+        finally:
+            self._waiting -= 1
+            AI_SCHEDULER_QUEUE.set(self._waiting)
+
+    def _release(self) -> None:
+        """Передать место первому запросу следующего по кругу клиента"""
+        while self._queues:
+            key = next(
+                (key for key in self._queues if key != self.BACKGROUND),
+                self.BACKGROUND,
+            )
+            queue = self._queues[key]
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            if not future.done():
+                future.set_result(None)
+                return
+
+        self._active -= 1
+        AI_SCHEDULER_ACTIVE.set(self._active)
+
+    def _prune(self, now: float) -> None:
+        self._buckets = {
+            key: (tokens, updated)
+            for key, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * self.rate < self.burst
+        }
@@ -0,0 +1,242 @@
+import asyncio
+import time
+
+from loguru import logger
+from sqlalchemy import insert, select, update
+
+from ..entites.models import ServiceState, SleepMemory, TelegraphOutbox
+from ..entites.schemas import BackfillReportModel, SleepMemoryBaseModel
+from ..abstract.ai import AIInterface
+from .._config import config
+from ..metrics import count_tokens
+from .ai.scheduler import AIScheduler
+from .memory import MemoryManager
+
+
+class BackfillManager:
+    """Повторный анализ воспоминаний, для которых AI не вернул ответ.
+
+    Строки читаются пачками по первичному ключу (keyset), анализируются
+    с ограничением параллельности и частоты запросов от имени клиента
+    AIScheduler.BACKGROUND, поэтому, если ai - планировщик, повторный анализ
+    уступает запросам пользователей и не превышает общий лимит. Результаты
+    записываются одним UPDATE на пачку. После каждой пачки сохраняется
+    контрольная точка, поэтому прерванный запуск продолжается с того же места.
+    Контрольная точка не продвигается дальше первой строки, которую не удалось
+    проанализировать, поэтому следующий запуск повторит строки с ошибками.
+    """
+
+    CHECKPOINT_KEY = "backfill:last_id"
+    """Ключ контрольной точки в таблице service_state."""
+
+    QUOTA_COOLDOWN = 60.0
+    """Пауза для всех воркеров после ответа о превышении квоты (в секундах)."""
+
+    def __init__(self, ai: AIInterface, memory: MemoryManager):
+        """Инцилизация
+
+        Args:
+            ai (AIInterface): Менеджер ИИ.
+            memory (MemoryManager): Менеджер воспоминаний.
+        """
+        self.ai = ai
+        self.memory = memory
+        self.report = BackfillReportModel()
+        self._lock = asyncio.Lock()
+        self._pace_lock = asyncio.Lock()
+        self._next_slot = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def run(
+        self,
+        concurrency: int | None = None,
+        rpm: int | None = None,
+        batch_size: int | None = None,
+        resume: bool = True,
+        publish: bool = False,
+    ) -> BackfillReportModel:
+        """Запустить повторный анализ
+
+        Args:
+            concurrency (int | None, optional): Сколько запросов к AI выполнять одновременно. Обычное состояние None.
+            rpm (int | None, optional): Максимум запросов к AI в минуту. Обычное состояние None.
+            batch_size (int | None, optional): Размер пачки для чтения и записи. Обычное состояние None.
+            resume (bool, optional): Продолжить с контрольной точки, иначе начать сначала. Обычное состояние True.
+            publish (bool, optional): Поставить проанализированные и ещё не опубликованные воспоминания в очередь Telegraph. Обычное состояние False.
+
+        Raises:
+            RuntimeError: Если повторный анализ уже запущен.
+
+        Returns:
+            BackfillReportModel: Итоговый отчёт.
+        """
+        if self._lock.locked():
+            raise RuntimeError("Повторный анализ уже запущен")
+
+        async with self._lock:
+            concurrency = concurrency or config.backfill_concurrency
+            rpm = rpm or config.backfill_rpm
+            batch_size = batch_size or config.backfill_batch_size
+
+            last_id = await self._load_checkpoint() if resume else 0
+            first_failed: int | None = None
+            self.report = BackfillReportModel(running=True, last_id=last_id)
+            semaphore = asyncio.Semaphore(concurrency)
+            started = time.monotonic()
+            tokens = 0
+            logger.info(
+                f"Повторный анализ запущен (last_id={last_id}, concurrency={concurrency}, rpm={rpm})"
+            )
+
+            try:
+                while True:
+                    rows = await self._fetch_page(last_id, batch_size)
+                    if not rows:
+                        break
+
+                    results = await asyncio.gather(
+                        *(self._analyze(row, semaphore, rpm) for row in rows)
+                    )
+                    updates = [
+                        {"id": row.id, "ai_thoughts": thoughts}
+                        for row, (thoughts, _) in zip(rows, results)
+                        if thoughts
+                    ]
+                    if first_failed is None:
+                        first_failed = next(
+                            (
+                                row.id
+                                for row, (thoughts, _) in zip(rows, results)
+                                if not thoughts
+                            ),
+                            None,
+                        )
+                    last_id = rows[-1].id
+                    await self._write(
+                        updates,
+                        last_id if first_failed is None else first_failed - 1,
+                        publish=[
+                            row.id
+                            for row, (thoughts, _) in zip(rows, results)
+                            if thoughts and publish and row.telegraph_url is None
+                        ],
+                    )
+
+                    tokens += sum(used for _, used in results)
+                    self._update_report(
+                        len(rows), len(updates), last_id, started, tokens
+                    )
+                    logger.info(
+                        f"Пачка обработана (last_id={last_id}, rows/s={self.report.rows_per_second:.2f}, "
+                        f"tokens/s={self.report.tokens_per_second:.1f})"
+                    )
+            finally:
+                self.report.running = False
+
+            logger.success(
+                f"Повторный анализ завершён (updated={self.report.updated}, failed={self.report.failed})"
+            )
+            return self.report
+
+    def start(self, **kwargs) -> asyncio.Task:
+        """Запустить повторный анализ в фоне, аргументы такие же как у run
+
+        Raises:
+            RuntimeError: Если повторный анализ уже запущен.
+
+        Returns:
+            asyncio.Task: Фоновая задача.
+        """
+        if self.running:
+            raise RuntimeError("Повторный анализ уже запущен")
+
+        self._task = asyncio.create_task(self.run(**kwargs))
+        return self._task
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли повторный анализ"""
+        return self._lock.locked() or (self._task is not None and not self._task.done())
+
+    async def _fetch_page(self, last_id: int, batch_size: int):
+        async with self.memory.session() as session:
+            result = await session.execute(
+                select(
+                    SleepMemory.id,
+                    SleepMemory.title,
+                    SleepMemory.content,
+                    SleepMemory.created_at,
+                    SleepMemory.telegraph_url,
+                )
+                .where(SleepMemory.ai_thoughts.is_(None), SleepMemory.id > last_id)
+                .order_by(SleepMemory.id)
+                .limit(batch_size)
+            )
+            return result.all()
+
+    async def _analyze(
+        self, row, semaphore: asyncio.Semaphore, rpm: int
+    ) -> tuple[str | None, int]:
+        """Ответ AI для строки и сколько токенов на него потрачено"""
+        async with semaphore:
+            await self._pace(rpm)
+            with AIScheduler.client(AIScheduler.BACKGROUND), count_tokens() as usage:
+                response = await self.ai.generate_response(
+                    SleepMemoryBaseModel(
+                        title=row.title, content=row.content, created_at=row.created_at
+                    )
+                )
+        tokens = usage.get("prompt", 0) + usage.get("output", 0)
+
+        if response.success and response.content.ai_thoughts:
+            return response.content.ai_thoughts, tokens
+
+        logger.warning(f"Не удалось проанализировать (id={row.id}): {response.message}")
+        if response.message and (
+            "429" in response.message or "RESOURCE_EXHAUSTED" in response.message
+        ):
+            self._next_slot = max(
+                self._next_slot, time.monotonic() + self.QUOTA_COOLDOWN
+            )
+        return None, tokens
+
+    async def _pace(self, rpm: int) -> None:
+        """Равномерно распределить запросы, не превышая rpm в минуту"""
+        async with self._pace_lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + 60 / rpm
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _write(
+        self, updates: list[dict], checkpoint: int, publish: list[int]
+    ) -> None:
+        async with self.memory.session() as session:
+            if updates:
+                await session.execute(update(SleepMemory), updates)
+            if publish:
+                await session.execute(
+                    insert(TelegraphOutbox),
+                    [{"memory_id": memory_id} for memory_id in publish],
+                )
+            await session.merge(
+                ServiceState(key=self.CHECKPOINT_KEY, value=str(checkpoint))
+            )
+        self.memory.invalidate(*(row["id"] for row in updates))
+
+    async def _load_checkpoint(self) -> int:
+        async with self.memory.session() as session:
+            state = await session.get(ServiceState, self.CHECKPOINT_KEY)
+        return int(state.value) if state is not None else 0
+
+    def _update_report(
+        self, processed: int, updated: int, last_id: int, started: float, tokens: int
+    ) -> None:
+        self.report.processed += processed
+        self.report.updated += updated
+        self.report.failed += processed - updated
+        self.report.last_id = last_id
+        self.report.elapsed = time.monotonic() - started
+        self.report.rows_per_second = self.report.processed / self.report.elapsed
+        self.report.tokens_per_second = tokens / self.report.elapsed
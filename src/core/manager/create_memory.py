@@ -1,57 +1,90 @@
+from typing import Awaitable, Callable
+
 from loguru import logger
 
-from ..entites.schemas import SleepMemoryBaseModel, SleepMemoryUpdateModel
+from ..entites.schemas import (
+    BaseResponseModel,
+    SleepMemoryBaseModel,
+    SleepMemoryCreateModel,
+)
 from ..abstract.ai import AIInterface
+from .ai.scheduler import AIRejectedError, AIScheduler
+from ..metrics import instrument, stage
+from ..tracing import span
 from ..service import Telegraph
 from .memory import MemoryManager
-
-
-MEMORY_TEXT = (
-    "ID сна: <code>{id}</code>\n"
-    "Название сна: <b>{title}</b>\n"
-    "Содержание сна: <i>{content}</i>\n"
-    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-    "{thoughts}"
-)
+from .outbox import TelegraphPublisher
+from .search import SearchManager
+from .similar import SimilarityIndex
 
 
 class CreateMemoryManager:
     def __init__(self, ai: AIInterface, telegraph: Telegraph, memory: MemoryManager):
         self.ai = ai
+        self.scheduler = AIScheduler(ai)
         self.memory = memory
         self.telegraph = telegraph
+        self.publisher = TelegraphPublisher(telegraph, memory)
+        self.search = SearchManager(memory)
+        self.similar = SimilarityIndex(memory)
 
-    async def create_memory(self, memory: SleepMemoryBaseModel):
-        response = await self.ai.generate_response(memory)
-        if not response.success:
-            return response
+    @instrument("create")
+    async def create_memory(
+        self,
+        memory: SleepMemoryBaseModel,
+        on_chunk: Callable[[str], Awaitable[None]] | None = None,
+    ):
+        """Проанализировать и сохранить воспоминание.
+        Публикация в Telegraph ставится в очередь в той же транзакции и выполняется в фоне.
+        Запрос к AI проходит через AIScheduler от имени клиента из AIScheduler.client.
 
-        response = await self.memory.add_memory(response.content)
+        Args:
+            memory (SleepMemoryBaseModel): воспоминание
+            on_chunk (Callable[[str], Awaitable[None]] | None, optional): Если указан, ответ AI стримится и после каждого фрагмента вызывается с уже накопленным текстом. Обычное состояние None.
+        """
+        with stage("create.ai").track(), span("create.ai"):
+            if on_chunk is None:
+                response = await self.scheduler.generate_response(memory)
+            else:
+                response = await self._stream_response(memory, on_chunk)
         if not response.success:
             return response
 
-        try:
-            page = await self.telegraph.create_page(
-                title=response.content.title,
-                content=MEMORY_TEXT.format(
-                    id=response.content.id,
-                    title=response.content.title,
-                    content=response.content.content,
-                    thoughts=response.content.ai_thoughts,
-                ),
-            )
-            if not page.ok:
-                logger.warning(
-                    f"Не удалось создать ссылку на Telegraph (id={response.content.id})"
-                )
-                return response
+        with stage("create.save").track(), span("create.save"):
+            response = await self.memory.add_memory(response.content, publish=True)
+        if response.success:
+            self.publisher.notify()
 
-            else:
-                return await self.memory.update_memory(
-                    response.content.id,
-                    SleepMemoryUpdateModel(telegraph_url=str(page.result.url)),
-                )
+        return response
 
+    async def _stream_response(
+        self,
+        memory: SleepMemoryBaseModel,
+        on_chunk: Callable[[str], Awaitable[None]],
+    ) -> BaseResponseModel[SleepMemoryCreateModel]:
+        text = ""
+        try:
+            async for chunk in self.scheduler.stream_response(memory):
+                text += chunk
+                await on_chunk(text)
+        except AIRejectedError as e:
+            return BaseResponseModel(
+                success=False,
+                message=str(e),
+                content=SleepMemoryCreateModel(**memory.model_dump()),
+            )
         except Exception as e:
-            logger.error(e)
-            return response
+            logger.error(f"Ошибка при стриминге ответа AI: {e}")
+            return BaseResponseModel(
+                success=False,
+                message=f"Ошибка при генерации ответа AI: {str(e)}",
+                content=SleepMemoryCreateModel(**memory.model_dump()),
+            )
+
+        return BaseResponseModel(
+            success=True,
+            message="Успешно удалось сгенерировать мнение Ai",
+            content=SleepMemoryCreateModel(
+                **memory.model_dump(), ai_thoughts=text or None
+            ),
+        )
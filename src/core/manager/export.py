@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+import zlib
+
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import select
+
+from ..entites.models import SleepMemory
+from ..entites.schemas import ExportFormat
+from .memory import MemoryManager
+
+
+class MemoryExporter:
+    """Потоковая выгрузка всех воспоминаний в NDJSON или CSV.
+
+    Строки читаются курсором пачками по BATCH_SIZE и сразу отдаются клиенту,
+    поэтому расход памяти не зависит от размера таблицы. Воспоминания
+    выгружаются по возрастанию id, выгрузку можно продолжить с after_id.
+    """
+
+    BATCH_SIZE = 500
+    """Сколько строк читать из базы данных и отдавать за раз."""
+
+    FIELDS = (
+        "id",
+        "title",
+        "content",
+        "ai_thoughts",
+        "telegraph_url",
+        "created_at",
+        "updated_at",
+    )
+    """Поля воспоминания в выгрузке, в этом порядке идут колонки CSV."""
+
+    def __init__(self, memory: MemoryManager):
+        """Инцилизация
+
+        Args:
+            memory (MemoryManager): Менеджер воспоминаний.
+        """
+        self.memory = memory
+
+    async def export(
+        self,
+        format: ExportFormat = ExportFormat.NDJSON,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        after_id: int | None = None,
+        gzip: bool = False,
+    ) -> AsyncIterator[bytes]:
+        """Выгрузить воспоминания по частям
+
+        Args:
+            format (ExportFormat, optional): формат выгрузки. Обычное состояние ExportFormat.NDJSON.
+            date_from (datetime | None, optional): не раньше этой даты. Обычное состояние None.
+            date_to (datetime | None, optional): раньше этой даты. Обычное состояние None.
+            after_id (int | None, optional): продолжить после воспоминания с этим id. Обычное состояние None.
+            gzip (bool, optional): сжимать выгрузку gzip на лету. Обычное состояние False.
+
+        Yields:
+            bytes: Очередная часть файла выгрузки.
+        """
+        query = (
+            select(SleepMemory)
+            .order_by(SleepMemory.id)
+            .execution_options(yield_per=self.BATCH_SIZE)
+        )
+        if date_from is not None:
+            query = query.where(SleepMemory.created_at >= date_from)
+        if date_to is not None:
+            query = query.where(SleepMemory.created_at < date_to)
+        if after_id is not None:
+            query = query.where(SleepMemory.id > after_id)
+
+        compressor = zlib.compressobj(wbits=31) if gzip else None
+        encode = self._ndjson if format == ExportFormat.NDJSON else self._csv
+
+        def output(data: bytes) -> bytes:
+            return compressor.compress(data) if compressor is not None else data
+
+        if format == ExportFormat.CSV:
+            header = output(self._csv_rows([self.FIELDS]))
+            if header:
+                yield header
+
+        async with self.memory.read_session() as session:
+            result = await session.stream_scalars(query)
+            async for rows in result.partitions():
+                chunk = output(encode(rows))
+                if chunk:
+                    yield chunk
+
+        if compressor is not None:
+            yield compressor.flush()
+
+    def _ndjson(self, rows: list[SleepMemory]) -> bytes:
+        return "".join(
+            json.dumps(self._values(row), ensure_ascii=False) + "\n" for row in rows
+        ).encode()
+
+    def _csv(self, rows: list[SleepMemory]) -> bytes:
+        return self._csv_rows(self._values(row).values() for row in rows)
+
+    @staticmethod
+    def _csv_rows(rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    def _values(self, row: SleepMemory) -> dict:
+        data = row.to_dict()
+        return {
+            name: data[name].isoformat()
+            if isinstance(data[name], datetime)
+            else data[name]
+            for name in self.FIELDS
+        }
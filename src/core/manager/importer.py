@@ -0,0 +1,133 @@
+import time
+
+from typing import AsyncIterable, AsyncIterator
+
+from loguru import logger
+from pydantic import ValidationError
+
+from ..entites.schemas import (
+    ImportErrorModel,
+    ImportReportModel,
+    SleepMemoryCreateModel,
+)
+from .memory import MemoryManager
+
+
+class MemoryImporter:
+    """Массовый импорт воспоминаний из NDJSON без обращения к AI.
+
+    Строки проверяются пачками по CHUNK_SIZE и сохраняются одним многострочным
+    INSERT на пачку. Каждая строка - SleepMemoryBaseModel, поля ai_thoughts и
+    telegraph_url необязательны, поэтому выгрузку из /api/export можно загрузить обратно.
+    Воспоминания без ответа AI потом анализирует BackfillManager.
+    """
+
+    CHUNK_SIZE = 1000
+    """Сколько строк проверять и сохранять за раз."""
+
+    MAX_ERRORS = 100
+    """Сколько ошибок строк сохранять в отчёте, остальные только считаются."""
+
+    def __init__(self, memory: MemoryManager):
+        """Инцилизация
+
+        Args:
+            memory (MemoryManager): Менеджер воспоминаний.
+        """
+        self.memory = memory
+
+    async def import_lines(
+        self, lines: AsyncIterable[bytes | str], publish: bool = False
+    ) -> ImportReportModel:
+        """Импортировать воспоминания построчно
+
+        Args:
+            lines (AsyncIterable[bytes | str]): строки NDJSON, пустые строки пропускаются
+            publish (bool, optional): Поставить в очередь Telegraph воспоминания, у которых уже есть ответ AI. Обычное состояние False.
+
+        Returns:
+            ImportReportModel: Отчёт с количеством строк, скоростью и ошибками по номерам строк.
+        """
+        report = ImportReportModel()
+        started = time.monotonic()
+        chunk: list[tuple[int, SleepMemoryCreateModel]] = []
+
+        async for line in lines:
+            report.lines += 1
+            if not line.strip():
+                continue
+
+            try:
+                chunk.append(
+                    (report.lines, SleepMemoryCreateModel.model_validate_json(line))
+                )
+            except ValidationError as e:
+                self._error(
+                    report,
+                    report.lines,
+                    "; ".join(
+                        f"{'.'.join(map(str, error['loc'])) or 'line'}: {error['msg']}"
+                        for error in e.errors()
+                    ),
+                )
+                continue
+
+            if len(chunk) >= self.CHUNK_SIZE:
+                await self._save(report, chunk, publish)
+                chunk = []
+                self._update_rate(report, started)
+
+        if chunk:
+            await self._save(report, chunk, publish)
+        self._update_rate(report, started)
+
+        logger.success(
+            f"Импорт завершён (imported={report.imported}, failed={report.failed}, "
+            f"rows/s={report.rows_per_second:.0f})"
+        )
+        return report
+
+    @staticmethod
+    async def split_lines(stream: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """Разбить поток байтов, например тело запроса, на строки
+
+        Args:
+            stream (AsyncIterable[bytes]): поток байтов
+
+        Yields:
+            bytes: Очередная строка без перевода строки.
+        """
+        tail = b""
+        async for data in stream:
+            *lines, tail = (tail + data).split(b"\n")
+            for line in lines:
+                yield line
+        if tail:
+            yield tail
+
+    async def _save(
+        self,
+        report: ImportReportModel,
+        chunk: list[tuple[int, SleepMemoryCreateModel]],
+        publish: bool,
+    ) -> None:
+        response = await self.memory.add_memories(
+            [memory for _, memory in chunk], publish=publish
+        )
+        if response.success:
+            report.imported += len(chunk)
+            return
+
+        for line, _ in chunk:
+            self._error(report, line, response.message)
+
+    def _error(self, report: ImportReportModel, line: int, error: str) -> None:
+        report.failed += 1
+        if len(report.errors) < self.MAX_ERRORS:
+            report.errors.append(ImportErrorModel(line=line, error=error))
+
+    @staticmethod
+    def _update_rate(report: ImportReportModel, started: float) -> None:
+        report.elapsed = time.monotonic() - started
+        if report.elapsed:
+            report.rows_per_second = report.imported / report.elapsed
@@ -0,0 +1,358 @@
+import asyncio
+
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+from uuid import uuid4
+
+from loguru import logger
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from ..entites.models import MemoryJob
+from ..entites.schemas import (
+    BaseResponseModel,
+    JobStatus,
+    MemoryJobModel,
+    SleepMemoryBaseModel,
+)
+from ..tracing import trace
+from .._config import config
+from .create_memory import CreateMemoryManager
+
+
+class JobStream:
+    """Накопленный текст ответа AI для задачи, которую сейчас обрабатывает воркер."""
+
+    def __init__(self):
+        self.text = ""
+        self.running = False
+        self.finished = False
+        self._changed = asyncio.Condition()
+
+    async def push(self, text: str) -> None:
+        """Обновить накопленный текст и разбудить подписчиков"""
+        async with self._changed:
+            self.text = text
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        """Отметить, что ответ больше не изменится"""
+        async with self._changed:
+            self.finished = True
+            self._changed.notify_all()
+
+    async def follow(self, timeout: float) -> AsyncIterator[str]:
+        """Отдавать новые фрагменты текста, пока ответ не будет готов
+
+        Args:
+            timeout (float): Сколько ждать изменений, прежде чем вернуть управление.
+
+        Yields:
+            str: Новый фрагмент текста, пустая строка - изменений не было за timeout.
+        """
+        sent = 0
+        while True:
+            async with self._changed:
+                if len(self.text) == sent and not self.finished:
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+                    except TimeoutError:
+                        pass
+                text, finished = self.text, self.finished
+
+            yield text[sent:]
+            sent = len(text)
+            if finished:
+                return
+
+
+class JobManager:
+    """Менеджер фоновых задач создания воспоминаний.
+
+    Задачи хранятся в таблице `memory_job`, поэтому очередь переживает перезапуск.
+    Обработкой занимается ограниченный пул воркеров. Взятая задача закрепляется
+    за воркером на LEASE секунд, аренда продлевается, пока задача выполняется,
+    поэтому задачи других живых экземпляров не перезапускаются, а задачи
+    упавшего экземпляра забираются заново, когда аренда истечёт.
+    """
+
+    POLL_INTERVAL = 5.0
+    """Как часто воркер проверяет таблицу, если его никто не разбудил (в секундах)."""
+
+    LEASE = 120.0
+    """На сколько задача закрепляется за воркером, продлевается каждую треть срока (в секундах)."""
+
+    def __init__(
+        self,
+        manager: CreateMemoryManager,
+        engine: AsyncEngine,
+        workers: int | None = None,
+    ):
+        """Инцилизация менеджера задач
+
+        Args:
+            manager (CreateMemoryManager): Менеджер создания воспоминаний.
+            engine (AsyncEngine): асинхроннный движок
+            workers (int | None, optional): Размер пула воркеров, если не указан берётся из config. Обычное состояние None.
+        """
+        self.manager = manager
+        self.workers = workers or config.job_workers
+        self.Session: async_sessionmaker[AsyncSession] = async_sessionmaker(
+            bind=engine, expire_on_commit=False
+        )
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._streams: dict[str, JobStream] = {}
+        self._leased: set[str] = set()
+
+    async def start(self) -> None:
+        """Запустить воркеры, прерванные задачи с истёкшей арендой они заберут сами"""
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        logger.success(f"Запущено воркеров: {self.workers}")
+
+    async def stop(self) -> None:
+        """Остановить воркеры и вернуть их незавершённые задачи в очередь"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        if self._leased:
+            async with self.Session() as session, session.begin():
+                await session.execute(
+                    update(MemoryJob)
+                    .where(
+                        MemoryJob.id.in_(self._leased),
+                        MemoryJob.status == JobStatus.RUNNING,
+                    )
+                    .values(status=JobStatus.PENDING, lease_until=None)
+                )
+            logger.warning(
+                f"Возвращено в очередь прерванных задач: {len(self._leased)}"
+            )
+            self._leased.clear()
+
+    async def submit(
+        self, memory: SleepMemoryBaseModel
+    ) -> BaseResponseModel[MemoryJobModel]:
+        """Поставить воспоминание в очередь на создание
+
+        Args:
+            memory (SleepMemoryBaseModel): воспоминание
+
+        Returns:
+            BaseResponseModel[MemoryJobModel]: ответ с созданной задачей
+        """
+        try:
+            job = MemoryJob(
+                id=uuid4().hex,
+                status=JobStatus.PENDING,
+                payload=memory.model_dump_json(),
+            )
+            async with self.Session() as session, session.begin():
+                session.add(job)
+
+            self._wakeup.set()
+            logger.info(f"Задача поставлена в очередь (id={job.id})")
+            return BaseResponseModel(
+                success=True,
+                message="Воспоминание поставлено в очередь",
+                content=MemoryJobModel.model_validate(job.to_dict()),
+            )
+        except Exception as e:
+            return BaseResponseModel(
+                success=False,
+                message=f"Ошибка при постановке в очередь: {str(e)}",
+                content=None,
+            )
+
+    async def get_job(self, job_id: str) -> BaseResponseModel[MemoryJobModel]:
+        """Получить задачу и, если она завершена, созданное воспоминание
+
+        Args:
+            job_id (str): идентификатор задачи
+
+        Returns:
+            BaseResponseModel[MemoryJobModel]: ответ с результатом операции
+        """
+        async with self.Session() as session:
+            job = await session.get(MemoryJob, job_id)
+
+        if job is None:
+            return BaseResponseModel(
+                success=False, message="Задача не найдена", content=None
+            )
+
+        model = MemoryJobModel.model_validate(job.to_dict())
+        if job.memory_id is not None:
+            memory = await self.manager.memory.get_memory(job.memory_id)
+            model.result = memory.content
+
+        return BaseResponseModel(
+            success=True, message="Задача успешно получена", content=model
+        )
+
+    async def follow(self, job_id: str) -> AsyncIterator[str]:
+        """Получать ответ AI для задачи по мере его генерации
+
+        Args:
+            job_id (str): идентификатор задачи
+
+        Yields:
+            str: Очередной фрагмент ответа, заканчивается когда задача завершена.
+        """
+        stream = self._streams.get(job_id)
+        if stream is None:
+            if await self._is_finished(job_id):
+                return
+            stream = self._streams.setdefault(job_id, JobStream())
+
+        try:
+            async for delta in stream.follow(timeout=self.POLL_INTERVAL):
+                if delta:
+                    yield delta
+                elif not stream.finished and await self._is_finished(job_id):
+                    return
+        finally:
+            # Поток ещё не взят воркером, воркер создаст его заново
+            if not stream.running and self._streams.get(job_id) is stream:
+                del self._streams[job_id]
+
+    async def _is_finished(self, job_id: str) -> bool:
+        async with self.Session() as session:
+            status = await session.scalar(
+                select(MemoryJob.status).where(MemoryJob.id == job_id)
+            )
+        return status is None or status in (JobStatus.DONE, JobStatus.FAILED)
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"Воркер {number} не смог получить задачу: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=self.POLL_INTERVAL
+                    )
+                except TimeoutError:
+                    pass
+                continue
+
+            logger.debug(f"Воркер {number} взял задачу (id={job.id})")
+            try:
+                await self._process(job)
+            except Exception as e:
+                # без этого ошибка базы данных в _finish завершила бы воркер
+                logger.error(
+                    f"Воркер {number} не смог сохранить результат задачи (id={job.id}): {e}"
+                )
+
+    async def _claim(self) -> MemoryJob | None:
+        """Атомарно забрать самую старую задачу из очереди
+        или задачу, аренда которой истекла (её экземпляр упал)"""
+        now = datetime.now()
+        claimable = or_(
+            MemoryJob.status == JobStatus.PENDING,
+            and_(
+                MemoryJob.status == JobStatus.RUNNING,
+                or_(MemoryJob.lease_until.is_(None), MemoryJob.lease_until < now),
+            ),
+        )
+        async with self.Session() as session, session.begin():
+            job = (
+                await session.execute(
+                    select(MemoryJob.id, MemoryJob.status)
+                    .where(claimable)
+                    .order_by(MemoryJob.created_at)
+                    .limit(1)
+                )
+            ).first()
+            if job is None:
+                return None
+
+            result = await session.execute(
+                update(MemoryJob)
+                .where(MemoryJob.id == job.id, claimable)
+                .values(
+                    status=JobStatus.RUNNING,
+                    lease_until=now + timedelta(seconds=self.LEASE),
+                )
+            )
+            if not result.rowcount:
+                return None
+
+            if job.status == JobStatus.RUNNING:
+                logger.warning(
+                    f"Аренда задачи истекла, задача взята заново (id={job.id})"
+                )
+            self._leased.add(job.id)
+            return await session.get(MemoryJob, job.id)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Продлевать аренду задачи, пока она выполняется"""
+        while True:
+            await asyncio.sleep(self.LEASE / 3)
+            try:
+                async with self.Session() as session, session.begin():
+                    await session.execute(
+                        update(MemoryJob)
+                        .where(
+                            MemoryJob.id == job_id,
+                            MemoryJob.status == JobStatus.RUNNING,
+                        )
+                        .values(
+                            lease_until=datetime.now() + timedelta(seconds=self.LEASE)
+                        )
+                    )
+            except Exception as e:
+                logger.error(f"Не удалось продлить аренду задачи (id={job_id}): {e}")
+
+    async def _process(self, job: MemoryJob) -> None:
+        stream = self._streams.setdefault(job.id, JobStream())
+        stream.running = True
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            memory = SleepMemoryBaseModel.model_validate_json(job.payload)
+            with trace("job.create_memory", job_id=job.id):
+                response = await self.manager.create_memory(
+                    memory, on_chunk=stream.push
+                )
+
+            if not response.success:
+                await self._finish(job.id, JobStatus.FAILED, error=response.message)
+            else:
+                await self._finish(
+                    job.id, JobStatus.DONE, memory_id=response.content.id
+                )
+        except Exception as e:
+            logger.error(f"Ошибка при обработке задачи (id={job.id}): {e}")
+            await self._finish(job.id, JobStatus.FAILED, error=str(e))
+        finally:
+            heartbeat.cancel()
+            await stream.finish()
+            self._streams.pop(job.id, None)
+
+    async def _finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        memory_id: int | None = None,
+        error: str | None = None,
+    ) -> None:
+        async with self.Session() as session, session.begin():
+            await session.execute(
+                update(MemoryJob)
+                .where(MemoryJob.id == job_id)
+                .values(
+                    status=status, memory_id=memory_id, error=error, lease_until=None
+                )
+            )
+        self._leased.discard(job_id)
+        logger.info(f"Задача завершена (id={job_id}, status={status})")
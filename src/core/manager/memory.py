@@ -1,38 +1,89 @@
+import base64
+
+from datetime import datetime
 from typing import AsyncGenerator, overload
 from contextlib import asynccontextmanager
 
+from loguru import logger
+from sqlalchemy import and_, delete, insert, or_, select, update
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, AsyncEngine
 
 from ..entites.schemas import (
     SleepMemoryCreateModel,
     SleepMemoryModel,
     SleepMemoryUpdateModel,
+    SleepMemoryPageModel,
     BaseResponseModel,
+    BulkOperation,
+    MemoryBulkOperationModel,
+    MemoryBulkItemModel,
+    MemoryBulkResultModel,
 )
-from ..entites.models import SleepMemory
+from ..entites.models import SleepMemory, TelegraphOutbox
+from ..abstract.memory import MemoryListener
+from ..metrics import instrumented
+from ..tracing import span
+from ..utils import LRUCache
+from .._config import config
 
 
+@instrumented("memory")
 class MemoryManager:
     """Менеджер для работы с воспоминаниями"""
 
-    def __init__(self, engine: AsyncEngine):
+    LIST_FIELDS = (
+        "id",
+        "title",
+        "content",
+        "ai_thoughts",
+        "telegraph_url",
+        "created_at",
+    )
+    """Поля, которые можно запросить в списке воспоминаний."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        cache_size: int | None = None,
+        reader: AsyncEngine | None = None,
+    ):
         """Инцилизация менеджера
 
         Args:
             engine (AsyncEngine): асинхроннный движок
+            cache_size (int | None, optional): Сколько воспоминаний держать в кэше, если не указано берётся из config. Обычное состояние None.
+            reader (AsyncEngine | None, optional): Движок только для чтения, если не указан используется engine. Обычное состояние None.
         """
         self._engine = engine
         self.Session: async_sessionmaker[AsyncSession] = async_sessionmaker(
             bind=self._engine, expire_on_commit=False
         )
+        self._reader = reader or engine
+        self.ReadSession: async_sessionmaker[AsyncSession] = async_sessionmaker(
+            bind=self._reader, expire_on_commit=False
+        )
+        self._listeners: list[MemoryListener] = []
+        self._cache: LRUCache[int, SleepMemoryModel] = LRUCache(
+            config.memory_cache_size if cache_size is None else cache_size,
+            ttl=config.memory_cache_ttl,
+        )
+
+    def add_listener(self, listener: MemoryListener) -> None:
+        """Подписать на изменения воспоминаний
+
+        Args:
+            listener (MemoryListener): подписчик, который вызывается после фиксации транзакции
+        """
+        self._listeners.append(listener)
 
     async def add_memory(
-        self, memory: SleepMemoryCreateModel
+        self, memory: SleepMemoryCreateModel, publish: bool = False
     ) -> BaseResponseModel[SleepMemoryModel]:
         """Создать воспоминание
 
         Args:
             memory (SleepMemoryCreateModel): воспоминание
+            publish (bool, optional): В той же транзакции поставить воспоминание в очередь публикации в Telegraph. Обычное состояние False.
 
         Returns:
             BaseResponseModel[SleepMemoryModel]: ответ с результатом операции
@@ -42,21 +93,71 @@ class MemoryManager:
                 save_memory = self.build_memory(memory)
                 session.add(save_memory)
                 await session.flush()
+                if publish:
+                    session.add(TelegraphOutbox(memory_id=save_memory.id))
+                    await session.flush()
 
+                saved = self.build_memory(save_memory)
+            except Exception as e:
+                # иначе session.begin() зафиксирует то, что успело выполниться
+                await session.rollback()
                 return BaseResponseModel(
-                    success=True,
-                    message="Воспоминание успешно сохранено",
-                    content=self.build_memory(save_memory),
+                    success=False,
+                    message=f"Ошибка при сохранении воспоминания: {str(e)}",
+                    content=None,
+                )
+
+        await self._notify("memory_saved", saved)
+        return BaseResponseModel(
+            success=True,
+            message="Воспоминание успешно сохранено",
+            content=saved,
+        )
+
+    async def add_memories(
+        self, memories: list[SleepMemoryCreateModel], publish: bool = False
+    ) -> BaseResponseModel[None]:
+        """Создать много воспоминаний одним многострочным INSERT ... RETURNING
+
+        Args:
+            memories (list[SleepMemoryCreateModel]): воспоминания
+            publish (bool, optional): В той же транзакции поставить в очередь публикации в Telegraph воспоминания, у которых уже есть ответ AI и нет страницы. Обычное состояние False.
+
+        Returns:
+            BaseResponseModel[None]: ответ с результатом операции
+        """
+        async with self.session() as session:
+            try:
+                rows = await session.scalars(
+                    insert(SleepMemory).returning(SleepMemory),
+                    [memory.model_dump() for memory in memories],
                 )
+                saved = [self.build_memory(row) for row in rows.all()]
+                ready = [
+                    {"memory_id": memory.id}
+                    for memory in saved
+                    if memory.ai_thoughts and memory.telegraph_url is None
+                ]
+                if publish and ready:
+                    await session.execute(insert(TelegraphOutbox), ready)
             except Exception as e:
+                # иначе session.begin() зафиксирует то, что успело выполниться
+                await session.rollback()
                 return BaseResponseModel(
                     success=False,
-                    message=f"Ошибка при сохранении воспоминания: {str(e)}",
+                    message=f"Ошибка при сохранении воспоминаний: {str(e)}",
                     content=None,
                 )
 
+        for memory in saved:
+            await self._notify("memory_saved", memory)
+        return BaseResponseModel(
+            success=True, message=f"Сохранено воспоминаний: {len(saved)}", content=None
+        )
+
     async def get_memory(self, memory_id: int) -> BaseResponseModel[SleepMemoryModel]:
         """Получить воспоминание.
+        Сначала ищется в кэше, который обновляется при изменении и удалении воспоминания.
 
         Args:
             memory_id (int): идентификатор воспоминания
@@ -64,17 +165,25 @@ class MemoryManager:
         Returns:
             BaseResponseModel[SleepMemoryModel]: ответ с результатом операции
         """
-        async with self.session() as session:
+        cached = self._cache.get(memory_id)
+        if cached is not None:
+            return BaseResponseModel(
+                success=True, message="Воспоминание успешно получено", content=cached
+            )
+
+        async with self.read_session() as session:
             try:
                 result = await session.get(SleepMemory, memory_id)
                 if result is None:
                     return BaseResponseModel(
                         success=False, message="Воспоминание не найдено", content=None
                     )
+                memory = self.build_memory(result)
+                self._cache.set(memory_id, memory)
                 return BaseResponseModel(
                     success=True,
                     message="Воспоминание успешно получено",
-                    content=self.build_memory(result),
+                    content=memory,
                 )
             except Exception as e:
                 return BaseResponseModel(
@@ -84,7 +193,7 @@ class MemoryManager:
                 )
 
     async def delete_memory(self, memory_id: int) -> BaseResponseModel[None]:
-        """Удалить воспоминание.
+        """Удалить воспоминание одним запросом DELETE ... RETURNING.
 
         Args:
             memory_id (int): идентификатор воспоминания
@@ -94,15 +203,16 @@ class MemoryManager:
         """
         async with self.session() as session:
             try:
-                result = await session.get(SleepMemory, memory_id)
+                result = await session.scalar(
+                    delete(SleepMemory)
+                    .where(SleepMemory.id == memory_id)
+                    .returning(SleepMemory)
+                )
                 if result is None:
                     return BaseResponseModel(
                         success=False, message="Воспоминание не найдено", content=None
                     )
-                await session.delete(result)
-                return BaseResponseModel(
-                    success=True, message="Воспоминание успешно удалено", content=None
-                )
+                deleted = self.build_memory(result)
             except Exception as e:
                 return BaseResponseModel(
                     success=False,
@@ -110,10 +220,17 @@ class MemoryManager:
                     content=None,
                 )
 
+        self._cache.pop(memory_id)
+        await self._notify("memory_deleted", deleted)
+        return BaseResponseModel(
+            success=True, message="Воспоминание успешно удалено", content=None
+        )
+
     async def update_memory(
         self, memory_id: int, memory: SleepMemoryUpdateModel
     ) -> BaseResponseModel[SleepMemoryModel]:
-        """Обновить воспоминание.
+        """Обновить воспоминание одним запросом UPDATE ... RETURNING.
+        Поля со значением None не меняются.
 
         Args:
             memory_id (int): идентификатор воспоминания
@@ -122,48 +239,322 @@ class MemoryManager:
         Returns:
             BaseResponseModel[SleepMemoryModel]: ответ с результатом операции
         """
+        values = memory.model_dump(exclude_none=True)
+        if not values:
+            return await self.get_memory(memory_id)
+
         async with self.session() as session:
             try:
-                result = await session.get(SleepMemory, memory_id)
+                result = await session.scalar(
+                    update(SleepMemory)
+                    .where(SleepMemory.id == memory_id)
+                    .values(**values)
+                    .returning(SleepMemory)
+                )
                 if result is None:
                     return BaseResponseModel(
                         success=False, message="Воспоминание не найдено", content=None
                     )
-                result.title = (
-                    memory.title if memory.title is not None else result.title
-                )
-                result.content = (
-                    memory.content if memory.content is not None else result.content
+                updated = self.build_memory(result)
+            except Exception as e:
+                return BaseResponseModel(
+                    success=False,
+                    message=f"Ошибка при обновлении воспоминания: {str(e)}",
+                    content=None,
                 )
-                result.ai_thoughts = (
-                    memory.ai_thoughts
-                    if memory.ai_thoughts is not None
-                    else result.ai_thoughts
+
+        self._cache.set(memory_id, updated)
+        await self._notify("memory_saved", updated)
+        return BaseResponseModel(
+            success=True,
+            message="Воспоминание успешно обновлено",
+            content=updated,
+        )
+
+    async def bulk(
+        self, operations: list[MemoryBulkOperationModel]
+    ) -> BaseResponseModel[MemoryBulkResultModel]:
+        """Выполнить пакет операций в одной транзакции.
+        Все создания выполняются одним INSERT ... RETURNING, изменения с одинаковым набором
+        значений - одним UPDATE ... WHERE id IN (...) RETURNING, все удаления - одним
+        DELETE ... RETURNING. Сначала выполняются создания, затем изменения, затем удаления.
+
+        Args:
+            operations (list[MemoryBulkOperationModel]): операции
+
+        Returns:
+            BaseResponseModel[MemoryBulkResultModel]: ответ с результатом каждой операции в порядке запроса
+        """
+        items: dict[int, MemoryBulkItemModel] = {}
+        creates: list[int] = []
+        updates: dict[tuple, list[int]] = {}
+        deletes: list[int] = []
+
+        for index, operation in enumerate(operations):
+            error = self._check_operation(operation)
+            if error is not None:
+                items[index] = MemoryBulkItemModel(
+                    index=index,
+                    op=operation.op,
+                    success=False,
+                    id=operation.id,
+                    message=error,
                 )
-                result.telegraph_url = (
-                    memory.telegraph_url
-                    if memory.telegraph_url is not None
-                    else result.telegraph_url
+            elif operation.op == BulkOperation.CREATE:
+                creates.append(index)
+            elif operation.op == BulkOperation.UPDATE:
+                values = operation.patch.model_dump(exclude_none=True)
+                updates.setdefault(tuple(sorted(values.items())), []).append(index)
+            else:
+                deletes.append(index)
+
+        saved: dict[int, SleepMemoryModel] = {}
+        deleted: dict[int, SleepMemoryModel] = {}
+        async with self.session() as session:
+            try:
+                if creates:
+                    rows = await session.scalars(
+                        insert(SleepMemory).returning(
+                            SleepMemory, sort_by_parameter_order=True
+                        ),
+                        [operations[index].memory.model_dump() for index in creates],
+                    )
+                    for index, row in zip(creates, rows.all()):
+                        saved[row.id] = self.build_memory(row)
+                        items[index] = self._bulk_item(
+                            index, operations[index], saved[row.id]
+                        )
+
+                for values, indexes in updates.items():
+                    rows = await session.scalars(
+                        update(SleepMemory)
+                        .where(SleepMemory.id.in_({operations[i].id for i in indexes}))
+                        .values(**dict(values))
+                        .returning(SleepMemory)
+                    )
+                    found = {row.id: self.build_memory(row) for row in rows.all()}
+                    saved.update(found)
+                    for index in indexes:
+                        items[index] = self._bulk_item(
+                            index, operations[index], found.get(operations[index].id)
+                        )
+
+                if deletes:
+                    rows = await session.scalars(
+                        delete(SleepMemory)
+                        .where(SleepMemory.id.in_({operations[i].id for i in deletes}))
+                        .returning(SleepMemory)
+                    )
+                    deleted = {row.id: self.build_memory(row) for row in rows.all()}
+                    for index in deletes:
+                        items[index] = self._bulk_item(
+                            index,
+                            operations[index],
+                            deleted.get(operations[index].id),
+                            with_content=False,
+                        )
+            except Exception as e:
+                # иначе session.begin() зафиксирует то, что успело выполниться
+                await session.rollback()
+                return BaseResponseModel(
+                    success=False,
+                    message=f"Ошибка при пакетном изменении воспоминаний: {str(e)}",
+                    content=None,
                 )
-                await session.flush()
 
+        for memory_id, memory in saved.items():
+            if memory_id in deleted:
+                continue
+            self._cache.set(memory_id, memory)
+            await self._notify("memory_saved", memory)
+        for memory_id, memory in deleted.items():
+            self._cache.pop(memory_id)
+            await self._notify("memory_deleted", memory)
+
+        return BaseResponseModel(
+            success=True,
+            message="Пакет операций выполнен",
+            content=MemoryBulkResultModel(
+                items=[items[index] for index in range(len(operations))]
+            ),
+        )
+
+    @staticmethod
+    def _check_operation(operation: MemoryBulkOperationModel) -> str | None:
+        """Проверить, что у операции есть нужные поля, вернуть текст ошибки"""
+        if operation.op == BulkOperation.CREATE:
+            return (
+                "Для создания нужно поле memory" if operation.memory is None else None
+            )
+        if operation.id is None:
+            return "Не указан id воспоминания"
+        if operation.op == BulkOperation.UPDATE and (
+            operation.patch is None or not operation.patch.model_dump(exclude_none=True)
+        ):
+            return "Для изменения нужно непустое поле patch"
+        return None
+
+    @staticmethod
+    def _bulk_item(
+        index: int,
+        operation: MemoryBulkOperationModel,
+        memory: SleepMemoryModel | None,
+        with_content: bool = True,
+    ) -> MemoryBulkItemModel:
+        if memory is None:
+            return MemoryBulkItemModel(
+                index=index,
+                op=operation.op,
+                success=False,
+                id=operation.id,
+                message="Воспоминание не найдено",
+            )
+        return MemoryBulkItemModel(
+            index=index,
+            op=operation.op,
+            success=True,
+            id=memory.id,
+            content=memory if with_content else None,
+        )
+
+    async def list_memories(
+        self,
+        limit: int = 20,
+        cursor: str | None = None,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        fields: list[str] | None = None,
+    ) -> BaseResponseModel[SleepMemoryPageModel]:
+        """Получить страницу воспоминаний, от новых к старым.
+        Пагинация по ключу (created_at, id), поэтому скорость не зависит от номера страницы.
+
+        Args:
+            limit (int, optional): размер страницы. Обычное состояние 20.
+            cursor (str | None, optional): курсор из next_cursor предыдущей страницы. Обычное состояние None.
+            date_from (datetime | None, optional): не раньше этой даты. Обычное состояние None.
+            date_to (datetime | None, optional): раньше этой даты. Обычное состояние None.
+            fields (list[str] | None, optional): какие поля вернуть, по умолчанию всё кроме больших текстов. Обычное состояние None.
+
+        Returns:
+            BaseResponseModel[SleepMemoryPageModel]: ответ с результатом операции
+        """
+        fields = fields or ["id", "title", "telegraph_url", "created_at"]
+        unknown = set(fields) - set(self.LIST_FIELDS)
+        if unknown:
+            return BaseResponseModel(
+                success=False,
+                message=f"Неизвестные поля: {', '.join(sorted(unknown))}",
+                content=None,
+            )
+
+        columns = {name: getattr(SleepMemory, name) for name in fields}
+        columns.setdefault("id", SleepMemory.id)
+        columns.setdefault("created_at", SleepMemory.created_at)
+        query = (
+            select(*(column.label(name) for name, column in columns.items()))
+            .order_by(SleepMemory.created_at.desc(), SleepMemory.id.desc())
+            .limit(limit + 1)
+        )
+
+        if date_from is not None:
+            query = query.where(SleepMemory.created_at >= date_from)
+        if date_to is not None:
+            query = query.where(SleepMemory.created_at < date_to)
+        if cursor is not None:
+            try:
+                created_at, memory_id = self.decode_cursor(cursor)
+            except ValueError:
                 return BaseResponseModel(
-                    success=True,
-                    message="Воспоминание успешно обновлено",
-                    content=self.build_memory(result),
+                    success=False, message="Неверный курсор", content=None
+                )
+            query = query.where(
+                or_(
+                    SleepMemory.created_at < created_at,
+                    and_(
+                        SleepMemory.created_at == created_at,
+                        SleepMemory.id < memory_id,
+                    ),
                 )
+            )
+
+        async with self.read_session() as session:
+            try:
+                rows = (await session.execute(query)).mappings().all()
             except Exception as e:
                 return BaseResponseModel(
                     success=False,
-                    message=f"Ошибка при обновлении воспоминания: {str(e)}",
+                    message=f"Ошибка при получении воспоминаний: {str(e)}",
                     content=None,
                 )
 
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+        return BaseResponseModel(
+            success=True,
+            message="Воспоминания успешно получены",
+            content=SleepMemoryPageModel(
+                items=[{name: row[name] for name in fields} for row in rows],
+                next_cursor=next_cursor,
+            ),
+        )
+
+    @staticmethod
+    def encode_cursor(created_at: datetime, memory_id: int) -> str:
+        """Закодировать позицию в списке в непрозрачный курсор"""
+        raw = f"{created_at.isoformat()}|{memory_id}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, int]:
+        """Раскодировать курсор
+
+        Raises:
+            ValueError: Если курсор повреждён.
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            created_at, memory_id = raw.split("|")
+            return datetime.fromisoformat(created_at), int(memory_id)
+        except Exception as e:
+            raise ValueError("Неверный курсор") from e
+
+    def invalidate(self, *memory_ids: int) -> None:
+        """Убрать воспоминания из кэша, если они изменены в обход update_memory
+
+        Args:
+            *memory_ids (int): идентификаторы воспоминаний
+        """
+        for memory_id in memory_ids:
+            self._cache.pop(memory_id)
+        for listener in self._listeners:
+            listener.memories_invalidated(*memory_ids)
+
+    async def _notify(self, event: str, memory: SleepMemoryModel) -> None:
+        """Оповестить подписчиков, ошибки подписчиков только логируются"""
+        for listener in self._listeners:
+            try:
+                await getattr(listener, event)(memory)
+            except Exception as e:
+                logger.error(
+                    f"Ошибка в подписчике {type(listener).__name__}.{event} (id={memory.id}): {e}"
+                )
+
     @asynccontextmanager
     async def session(self) -> AsyncGenerator[AsyncSession, None]:
         """Асинхронный контекстный менеджер для работы с сессией базы данных"""
-        async with self.Session() as session:
-            async with session.begin():
+        with span("db.transaction"):
+            async with self.Session() as session:
+                async with session.begin():
+                    yield session
+
+    @asynccontextmanager
+    async def read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """Сессия только для чтения, на SQLite не ждёт писателя"""
+        with span("db.read"):
+            async with self.ReadSession() as session:
                 yield session
 
     @overload
@@ -217,3 +608,8 @@ class MemoryManager:
     def engine(self) -> AsyncEngine:
         """Получить движок базы данных"""
         return self._engine
+
+    @property
+    def reader(self) -> AsyncEngine:
+        """Получить движок базы данных для чтения"""
+        return self._reader
@@ -0,0 +1,213 @@
+import asyncio
+import random
+
+from datetime import datetime, timedelta
+
+from loguru import logger
+from sqlalchemy import delete, select, update
+
+from ..entites.models import ServiceState, TelegraphOutbox
+from ..entites.schemas import SleepMemoryUpdateModel
+from ..service import Telegraph
+from ..tracing import trace
+from .._config import config
+from .memory import MemoryManager
+
+
+MEMORY_TEXT = (
+    "ID сна: <code>{id}</code>\n"
+    "Название сна: <b>{title}</b>\n"
+    "Содержание сна: <i>{content}</i>\n"
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+    "{thoughts}"
+)
+
+
+class TelegraphPublisher:
+    """Фоновая публикация воспоминаний из таблицы `telegraph_outbox` в Telegraph.
+
+    Страницы публикуются параллельно с ограничением, неудачные попытки
+    повторяются с экспоненциальной задержкой.
+    """
+
+    TOKEN_KEY = "telegraph:access_token"
+    """Ключ токена аккаунта Telegraph в таблице service_state."""
+
+    MAX_ATTEMPTS = 8
+    """После скольких неудачных попыток перестать публиковать."""
+
+    BASE_DELAY = 5.0
+    """Задержка перед первой повторной попыткой (в секундах)."""
+
+    MAX_DELAY = 3600.0
+    """Максимальная задержка между попытками (в секундах)."""
+
+    LEASE = 300.0
+    """На сколько строка скрывается от других публикаторов, пока её публикуют (в секундах)."""
+
+    POLL_INTERVAL = 10.0
+    """Как часто проверять очередь, если публикатор никто не разбудил (в секундах)."""
+
+    def __init__(
+        self,
+        telegraph: Telegraph,
+        memory: MemoryManager,
+        concurrency: int | None = None,
+    ):
+        """Инцилизация
+
+        Args:
+            telegraph (Telegraph): Клиент Telegraph.
+            memory (MemoryManager): Менеджер воспоминаний.
+            concurrency (int | None, optional): Сколько страниц публиковать одновременно, если не указано берётся из config. Обычное состояние None.
+        """
+        self.telegraph = telegraph
+        self.memory = memory
+        self.concurrency = concurrency or config.telegraph_concurrency
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Запустить фоновую публикацию"""
+        self._task = asyncio.create_task(self._loop())
+        logger.success("Публикатор Telegraph запущен")
+
+    async def stop(self) -> None:
+        """Остановить фоновую публикацию, очередь сохранится в базе данных"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def notify(self) -> None:
+        """Разбудить публикатор после добавления строки в очередь"""
+        self._wakeup.set()
+
+    async def _loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                rows = await self._claim()
+                if rows:
+                    await self._ensure_token()
+                    await asyncio.gather(*(self._publish(row) for row in rows))
+                    continue
+            except Exception as e:
+                logger.error(f"Ошибка в публикаторе Telegraph: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.POLL_INTERVAL)
+            except TimeoutError:
+                pass
+
+    async def _claim(self) -> list[TelegraphOutbox]:
+        """Забрать готовые к публикации строки и скрыть их на время LEASE.
+        UPDATE повторяет условие готовности, поэтому строку, которую уже забрал
+        другой публикатор, он не вернёт."""
+        now = datetime.now()
+        async with self.memory.session() as session:
+            ids = (
+                await session.scalars(
+                    select(TelegraphOutbox.id)
+                    .where(TelegraphOutbox.next_attempt_at <= now)
+                    .order_by(TelegraphOutbox.next_attempt_at)
+                    .limit(self.concurrency)
+                )
+            ).all()
+            if not ids:
+                return []
+            rows = await session.scalars(
+                update(TelegraphOutbox)
+                .where(
+                    TelegraphOutbox.id.in_(ids),
+                    TelegraphOutbox.next_attempt_at <= now,
+                )
+                .values(next_attempt_at=now + timedelta(seconds=self.LEASE))
+                .returning(TelegraphOutbox)
+            )
+            return list(rows.all())
+
+    async def _ensure_token(self) -> None:
+        """Один раз создать аккаунт Telegraph и сохранить токен в базе данных"""
+        if self.telegraph.access_token:
+            return
+
+        async with self.memory.session() as session:
+            state = await session.get(ServiceState, self.TOKEN_KEY)
+        if state is not None:
+            self.telegraph.access_token = state.value
+            return
+
+        token = await self.telegraph.ensure_account()
+        if token:
+            async with self.memory.session() as session:
+                await session.merge(ServiceState(key=self.TOKEN_KEY, value=token))
+            logger.info("Токен Telegraph сохранён в базе данных")
+
+    async def _publish(self, row: TelegraphOutbox) -> None:
+        response = await self.memory.get_memory(row.memory_id)
+        if not response.success:
+            logger.warning(
+                f"Воспоминание для публикации не найдено (id={row.memory_id})"
+            )
+            await self._done(row)
+            return
+
+        memory = response.content
+        try:
+            with trace("telegraph.publish", memory_id=memory.id):
+                page = await self.telegraph.create_page(
+                    title=memory.title,
+                    content=MEMORY_TEXT.format(
+                        id=memory.id,
+                        title=memory.title,
+                        content=memory.content,
+                        thoughts=memory.ai_thoughts,
+                    ),
+                )
+                if not page.ok:
+                    raise RuntimeError(page.error)
+
+                updated = await self.memory.update_memory(
+                    memory.id,
+                    SleepMemoryUpdateModel(telegraph_url=str(page.result.url)),
+                )
+                if not updated.success:
+                    raise RuntimeError(updated.message)
+        except Exception as e:
+            await self._retry(row, str(e))
+            return
+
+        await self._done(row)
+
+    async def _done(self, row: TelegraphOutbox) -> None:
+        async with self.memory.session() as session:
+            await session.execute(
+                delete(TelegraphOutbox).where(TelegraphOutbox.id == row.id)
+            )
+
+    async def _retry(self, row: TelegraphOutbox, error: str) -> None:
+        attempts = row.attempts + 1
+        if attempts >= self.MAX_ATTEMPTS:
+            next_attempt_at = None
+            logger.error(
+                f"Не удалось опубликовать в Telegraph (id={row.memory_id}), попытки закончились: {error}"
+            )
+        else:
+            delay = min(self.MAX_DELAY, self.BASE_DELAY * 2**row.attempts)
+            delay *= random.uniform(0.5, 1.5)
+            next_attempt_at = datetime.now() + timedelta(seconds=delay)
+            logger.warning(
+                f"Не удалось опубликовать в Telegraph (id={row.memory_id}), повтор через {delay:.0f} сек.: {error}"
+            )
+
+        async with self.memory.session() as session:
+            await session.execute(
+                update(TelegraphOutbox)
+                .where(TelegraphOutbox.id == row.id)
+                .values(
+                    attempts=attempts,
+                    next_attempt_at=next_attempt_at,
+                    last_error=error,
+                )
+            )
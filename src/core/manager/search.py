@@ -0,0 +1,233 @@
+import html
+import re
+
+from loguru import logger
+from sqlalchemy import or_, select, text
+from sqlalchemy.exc import OperationalError
+
+from ..entites.models import SleepMemory
+from ..entites.schemas import BaseResponseModel, SearchPageModel, SearchResultModel
+from .memory import MemoryManager
+
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_HIGHLIGHT_START = "\x02"
+_HIGHLIGHT_END = "\x03"
+
+FTS_SCHEMA = (
+    """
+    CREATE VIRTUAL TABLE sleep_memory_fts USING fts5(
+        title, content, ai_thoughts,
+        content='sleep_memory', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sleep_memory_fts_insert AFTER INSERT ON sleep_memory BEGIN
+        INSERT INTO sleep_memory_fts(rowid, title, content, ai_thoughts)
+        VALUES (new.id, new.title, new.content, new.ai_thoughts);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sleep_memory_fts_delete AFTER DELETE ON sleep_memory BEGIN
+        INSERT INTO sleep_memory_fts(sleep_memory_fts, rowid, title, content, ai_thoughts)
+        VALUES ('delete', old.id, old.title, old.content, old.ai_thoughts);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sleep_memory_fts_update AFTER UPDATE ON sleep_memory BEGIN
+        INSERT INTO sleep_memory_fts(sleep_memory_fts, rowid, title, content, ai_thoughts)
+        VALUES ('delete', old.id, old.title, old.content, old.ai_thoughts);
+        INSERT INTO sleep_memory_fts(rowid, title, content, ai_thoughts)
+        VALUES (new.id, new.title, new.content, new.ai_thoughts);
+    END
+    """,
+)
+"""Внешняя FTS5 таблица над sleep_memory и триггеры, которые держат её в актуальном состоянии."""
+
+FTS_QUERY = text(
+    f"""
+    SELECT m.id, m.title, m.created_at, m.telegraph_url,
+        snippet(sleep_memory_fts, -1, '{_HIGHLIGHT_START}', '{_HIGHLIGHT_END}', '…', 16) AS snippet,
+        bm25(sleep_memory_fts, 10.0, 4.0, 1.0) AS rank
+    FROM sleep_memory_fts
+    JOIN sleep_memory AS m ON m.id = sleep_memory_fts.rowid
+    WHERE sleep_memory_fts MATCH :query
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+    """
+)
+
+
+class SearchManager:
+    """Полнотекстовый поиск по воспоминаниям.
+
+    На SQLite используется FTS5 с ранжированием bm25 и подсветкой,
+    на остальных базах данных - поиск через LIKE без ранжирования.
+    """
+
+    def __init__(self, memory: MemoryManager):
+        """Инцилизация
+
+        Args:
+            memory (MemoryManager): Менеджер воспоминаний.
+        """
+        self.memory = memory
+        self.fts = False
+
+    async def setup(self) -> None:
+        """Создать FTS5 таблицу и триггеры, если база данных это поддерживает.
+        Если таблица создаётся впервые, она сразу заполняется существующими воспоминаниями."""
+        if self.memory.engine.dialect.name != "sqlite":
+            logger.info("Полнотекстовый поиск недоступен, используется LIKE")
+            return
+
+        try:
+            async with self.memory.engine.begin() as conn:
+                exists = await conn.scalar(
+                    text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sleep_memory_fts'"
+                    )
+                )
+                for statement in FTS_SCHEMA[0 if not exists else 1 :]:
+                    await conn.execute(text(statement))
+        except OperationalError as e:
+            logger.warning(f"FTS5 недоступен, используется LIKE: {e}")
+            return
+
+        self.fts = True
+        if not exists:
+            await self.rebuild()
+
+    async def rebuild(self) -> bool:
+        """Перестроить поисковый индекс по содержимому sleep_memory
+
+        Returns:
+            bool: False, если полнотекстовый поиск недоступен.
+        """
+        if not self.fts:
+            return False
+
+        async with self.memory.engine.begin() as conn:
+            await conn.execute(
+                text(
+                    "INSERT INTO sleep_memory_fts(sleep_memory_fts) VALUES ('rebuild')"
+                )
+            )
+        logger.success("Поисковый индекс перестроен")
+        return True
+
+    async def search(
+        self, query: str, limit: int = 10, offset: int = 0
+    ) -> BaseResponseModel[SearchPageModel]:
+        """Найти воспоминания по тексту
+
+        Args:
+            query (str): поисковый запрос, слова ищутся по префиксу и должны встречаться все
+            limit (int, optional): размер страницы. Обычное состояние 10.
+            offset (int, optional): сколько результатов пропустить. Обычное состояние 0.
+
+        Returns:
+            BaseResponseModel[SearchPageModel]: ответ с результатом операции
+        """
+        words = _WORD.findall(query)
+        if not words:
+            return BaseResponseModel(
+                success=False, message="Пустой поисковый запрос", content=None
+            )
+
+        try:
+            if self.fts:
+                items = await self._search_fts(words, limit + 1, offset)
+            else:
+                items = await self._search_like(words, limit + 1, offset)
+        except Exception as e:
+            return BaseResponseModel(
+                success=False,
+                message=f"Ошибка при поиске воспоминаний: {str(e)}",
+                content=None,
+            )
+
+        next_offset = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_offset = offset + limit
+
+        return BaseResponseModel(
+            success=True,
+            message="Поиск выполнен",
+            content=SearchPageModel(items=items, next_offset=next_offset),
+        )
+
+    async def _search_fts(
+        self, words: list[str], limit: int, offset: int
+    ) -> list[SearchResultModel]:
+        match = " ".join(f'"{word}"*' for word in words)
+        async with self.memory.read_session() as session:
+            rows = (
+                await session.execute(
+                    FTS_QUERY, {"query": match, "limit": limit, "offset": offset}
+                )
+            ).mappings()
+            return [
+                SearchResultModel(
+                    **{**row, "snippet": self._highlight(row["snippet"] or "")}
+                )
+                for row in rows
+            ]
+
+    async def _search_like(
+        self, words: list[str], limit: int, offset: int
+    ) -> list[SearchResultModel]:
+        columns = (SleepMemory.title, SleepMemory.content, SleepMemory.ai_thoughts)
+        query = (
+            select(SleepMemory)
+            .where(
+                *(
+                    or_(*(column.ilike(f"%{word}%") for column in columns))
+                    for word in words
+                )
+            )
+            .order_by(SleepMemory.created_at.desc(), SleepMemory.id.desc())
+            .limit(limit)
+            .offset(offset)
+        )
+        async with self.memory.read_session() as session:
+            rows = (await session.scalars(query)).all()
+            return [
+                SearchResultModel(
+                    id=row.id,
+                    title=row.title,
+                    created_at=row.created_at,
+                    telegraph_url=row.telegraph_url,
+                    snippet=self._excerpt(row.content, words[0]),
+                )
+                for row in rows
+            ]
+
+    @staticmethod
+    def _highlight(snippet: str) -> str:
+        """Экранировать фрагмент и заменить маркеры FTS5 на <b>"""
+        return (
+            html.escape(snippet, quote=False)
+            .replace(_HIGHLIGHT_START, "<b>")
+            .replace(_HIGHLIGHT_END, "</b>")
+        )
+
+    @staticmethod
+    def _excerpt(content: str, word: str, width: int = 60) -> str:
+        """Фрагмент текста вокруг первого вхождения слова для поиска через LIKE"""
+        position = content.casefold().find(word.casefold())
+        if position < 0:
+            return html.escape(content[: width * 2], quote=False)
+
+        start = max(0, position - width)
+        end = position + len(word)
+        return (
+            ("…" if start else "")
+            + html.escape(content[start:position], quote=False)
+            + f"<b>{html.escape(content[position:end], quote=False)}</b>"
+            + html.escape(content[end : end + width], quote=False)
+            + ("…" if end + width < len(content) else "")
+        )
@@ -0,0 +1,340 @@
+import asyncio
+import json
+import math
+import os
+import re
+import zlib
+
+from collections import Counter
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from loguru import logger
+from sqlalchemy import Row, func, select
+
+from ..abstract.memory import MemoryListener
+from ..entites.models import SleepMemory
+from ..entites.schemas import (
+    BaseResponseModel,
+    SimilarMemoryModel,
+    SimilarPageModel,
+    SleepMemoryModel,
+)
+from .._config import config
+from .memory import MemoryManager
+
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class SimilarityIndex(MemoryListener):
+    """Локальный индекс похожих воспоминаний без внешних сервисов.
+
+    Название и содержание воспоминания превращаются в хэшированный TF-IDF вектор
+    фиксированной размерности. Векторы лежат в файле, отображённом в память (numpy.memmap),
+    и обновляются по событиям MemoryManager. Похожие воспоминания ищутся
+    косинусной близостью одним умножением матрицы на вектор.
+    """
+
+    DIM = 512
+    """Размерность векторов, слова раскладываются по корзинам хэшем."""
+
+    STEM = 5
+    """До скольких букв обрезаются слова, чтобы разные формы слова совпадали."""
+
+    TITLE_WEIGHT = 2
+    """Во сколько раз слово из названия весит больше слова из содержания."""
+
+    BATCH_SIZE = 1000
+    """Размер пачки при перестроении индекса."""
+
+    MIN_CAPACITY = 1024
+    """Минимальная вместимость файлов индекса (в воспоминаниях)."""
+
+    FLUSH_DELAY = 5.0
+    """Через сколько секунд после изменения сбрасывать индекс на диск, изменения за это время
+    сбрасываются разом. Если процесс упадёт раньше, setup заметит расхождение и перестроит индекс."""
+
+    def __init__(self, memory: MemoryManager, path: str | None = None):
+        """Инцилизация, индекс сразу подписывается на изменения воспоминаний
+
+        Args:
+            memory (MemoryManager): Менеджер воспоминаний.
+            path (str | None, optional): Папка с файлами индекса, если не указана берётся из config. Обычное состояние None.
+        """
+        self.memory = memory
+        self.path = Path(path or config.vector_index_path)
+        self._lock = asyncio.Lock()
+        self._vectors: np.memmap | None = None
+        self._ids: np.memmap | None = None
+        self._df: np.memmap | None = None
+        self._capacity = 0
+        self._count = 0
+        self._rows: dict[int, int] = {}
+        self._dirty = False
+        self._flush_task: asyncio.Task | None = None
+        memory.add_listener(self)
+
+    async def setup(self) -> None:
+        """Открыть индекс с диска.
+        Если файлов нет или они не совпадают с базой данных, индекс перестраивается."""
+        async with self._lock:
+            if self._load() and await self._in_sync():
+                logger.success(f"Индекс похожих снов загружен ({self._count} шт.)")
+                return
+            await self._rebuild()
+
+    async def rebuild(self) -> int:
+        """Перестроить индекс по содержимому базы данных
+
+        Returns:
+            int: Сколько воспоминаний проиндексировано.
+        """
+        async with self._lock:
+            return await self._rebuild()
+
+    def close(self) -> None:
+        """Сбросить изменения индекса на диск"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._dirty:
+            self._write_meta()
+        for array in (self._vectors, self._ids, self._df):
+            if array is not None:
+                array.flush()
+
+    async def similar(
+        self, memory_id: int, limit: int = 5
+    ) -> BaseResponseModel[SimilarPageModel]:
+        """Найти воспоминания, похожие на данное
+
+        Args:
+            memory_id (int): идентификатор воспоминания
+            limit (int, optional): сколько похожих вернуть. Обычное состояние 5.
+
+        Returns:
+            BaseResponseModel[SimilarPageModel]: ответ с похожими воспоминаниями, от самых похожих
+        """
+        async with self._lock:
+            row = self._rows.get(memory_id)
+            if row is None:
+                return BaseResponseModel(
+                    success=False, message="Воспоминание не найдено", content=None
+                )
+
+            scores = await asyncio.to_thread(
+                np.matmul, self._vectors[: self._count], self._vectors[row]
+            )
+            scores[row] = -np.inf
+            k = min(limit, self._count - 1)
+            top = np.argpartition(scores, -k)[-k:] if k > 0 else np.empty(0, int)
+            top = top[np.argsort(scores[top])[::-1]]
+            top = top[scores[top] > 0]
+            found = {int(self._ids[i]): float(scores[i]) for i in top}
+
+        try:
+            async with self.memory.read_session() as session:
+                rows = (
+                    await session.execute(
+                        select(
+                            SleepMemory.id,
+                            SleepMemory.title,
+                            SleepMemory.created_at,
+                            SleepMemory.telegraph_url,
+                        ).where(SleepMemory.id.in_(found))
+                    )
+                ).mappings()
+                items = {row["id"]: row for row in rows}
+        except Exception as e:
+            return BaseResponseModel(
+                success=False,
+                message=f"Ошибка при поиске похожих воспоминаний: {str(e)}",
+                content=None,
+            )
+
+        return BaseResponseModel(
+            success=True,
+            message="Похожие воспоминания найдены",
+            content=SimilarPageModel(
+                items=[
+                    SimilarMemoryModel(**items[id], score=score)
+                    for id, score in found.items()
+                    if id in items
+                ]
+            ),
+        )
+
+    async def memory_saved(self, memory: SleepMemoryModel) -> None:
+        async with self._lock:
+            if self._vectors is None:
+                return
+
+            tf = self._term_frequencies(memory.title, memory.content)
+            row = self._rows.get(memory.id)
+            if row is None:
+                if self._count == self._capacity:
+                    self._open(self._capacity * 2)
+                row = self._count
+                self._count += 1
+                self._ids[row] = memory.id
+                self._rows[memory.id] = row
+            else:
+                self._df -= self._vectors[row] != 0
+
+            self._df += tf != 0
+            self._vectors[row] = self._normalize(tf * self._idf())
+            self._changed()
+
+    async def memory_deleted(self, memory: SleepMemoryModel) -> None:
+        async with self._lock:
+            row = self._rows.pop(memory.id, None)
+            if row is None:
+                return
+
+            self._df -= self._vectors[row] != 0
+            last = self._count - 1
+            if row != last:
+                moved = int(self._ids[last])
+                self._vectors[row] = self._vectors[last]
+                self._ids[row] = moved
+                self._rows[moved] = row
+            self._count = last
+            self._changed()
+
+    async def _rebuild(self) -> int:
+        async with self.memory.reader.connect() as conn:
+            total = await conn.scalar(select(func.count(SleepMemory.id)))
+            self._open(self._capacity_for(total))
+            self._df[:] = 0
+
+            count = 0
+            result = await conn.stream(
+                select(SleepMemory.id, SleepMemory.title, SleepMemory.content)
+            )
+            async for rows in result.partitions(self.BATCH_SIZE):
+                if count + len(rows) > self._capacity:
+                    self._open(self._capacity_for(count + len(rows)))
+                batch = await asyncio.to_thread(self._batch, rows)
+                self._vectors[count : count + len(rows)] = batch
+                self._ids[count : count + len(rows)] = [row.id for row in rows]
+                count += len(rows)
+
+        self._count = count
+        self._rows = {int(id): row for row, id in enumerate(self._ids[:count])}
+        self._df[:] = np.count_nonzero(self._vectors[:count], axis=0)
+        idf = self._idf()
+        for start in range(0, count, self.BATCH_SIZE * 10):
+            block = self._vectors[start : start + self.BATCH_SIZE * 10] * idf
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._vectors[start : start + len(block)] = block / norms
+
+        self._write_meta()
+        self.close()
+        logger.success(f"Индекс похожих снов перестроен ({count} шт.)")
+        return count
+
+    def _load(self) -> bool:
+        """Открыть файлы индекса, если они есть и подходят по размерности"""
+        try:
+            meta = json.loads((self.path / "meta.json").read_text())
+            if meta["dim"] != self.DIM:
+                return False
+            self._open(meta["capacity"])
+            self._count = meta["count"]
+        except (OSError, ValueError, KeyError):
+            return False
+
+        self._rows = {int(id): row for row, id in enumerate(self._ids[: self._count])}
+        return True
+
+    async def _in_sync(self) -> bool:
+        """Сверить количество и сумму идентификаторов с базой данных"""
+        async with self.memory.read_session() as session:
+            count, total = (
+                await session.execute(
+                    select(
+                        func.count(SleepMemory.id),
+                        func.coalesce(func.sum(SleepMemory.id), 0),
+                    )
+                )
+            ).one()
+        return count == self._count and total == int(self._ids[: self._count].sum())
+
+    def _open(self, capacity: int) -> None:
+        """Отобразить файлы индекса в память, при необходимости увеличив их"""
+        self.close()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._vectors = self._map("vectors.f32", np.float32, (capacity, self.DIM))
+        self._ids = self._map("ids.i64", np.int64, (capacity,))
+        self._df = self._map("df.f64", np.float64, (self.DIM,))
+        self._capacity = capacity
+
+    def _map(self, name: str, dtype: type, shape: tuple[int, ...]) -> np.memmap:
+        path = self.path / name
+        size = math.prod(shape) * np.dtype(dtype).itemsize
+        path.touch(exist_ok=True)
+        if path.stat().st_size < size:
+            os.truncate(path, size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _changed(self) -> None:
+        """Отметить изменение и запланировать сброс на диск, если он ещё не запланирован"""
+        self._dirty = True
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.FLUSH_DELAY)
+        async with self._lock:
+            self._flush_task = None
+            self.close()
+
+    def _write_meta(self) -> None:
+        self._dirty = False
+        meta = self.path / "meta.json"
+        temp = meta.with_suffix(".tmp")
+        temp.write_text(
+            json.dumps(
+                {"dim": self.DIM, "capacity": self._capacity, "count": self._count}
+            )
+        )
+        os.replace(temp, meta)
+
+    def _capacity_for(self, count: int) -> int:
+        capacity = max(self.MIN_CAPACITY, self._capacity)
+        while capacity < count:
+            capacity *= 2
+        return capacity
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1.0 + self._count) / (1.0 + self._df)) + 1.0
+
+    def _batch(self, rows: Sequence[Row]) -> np.ndarray:
+        return np.stack(
+            [self._term_frequencies(row.title, row.content) for row in rows]
+        )
+
+    def _term_frequencies(self, title: str, content: str) -> np.ndarray:
+        """Хэшированный вектор частот слов, знак корзины тоже берётся из хэша,
+        чтобы коллизии в среднем гасили друг друга"""
+        counts = Counter()
+        for weight, text in ((self.TITLE_WEIGHT, title), (1, content)):
+            for word in _WORD.findall(text.casefold()):
+                if len(word) > 1 and not word.isdigit():
+                    counts[word[: self.STEM]] += weight
+
+        vector = np.zeros(self.DIM, dtype=np.float32)
+        for term, count in counts.items():
+            digest = zlib.crc32(term.encode())
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.DIM] += sign * (1.0 + math.log(count))
+        return vector
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
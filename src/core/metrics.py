@@ -0,0 +1,264 @@
+"""Метрики Prometheus, которые собираются в процессе работы приложения."""
+
+import functools
+import inspect
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+
+AI_CACHE_REQUESTS = Counter(
+    "sleep_ai_cache_requests_total",
+    "Обращения к кэшу ответов AI",
+    ["tier", "result"],
+)
+"""Обращения к кэшу ответов AI по уровням (memory, db) и результату (hit, miss)."""
+
+AI_SCHEDULER_QUEUE = Gauge(
+    "sleep_ai_scheduler_queue_depth",
+    "Запросы к AI, ожидающие в очереди планировщика",
+)
+"""Сколько запросов к AI сейчас ждут своей очереди."""
+
+AI_SCHEDULER_ACTIVE = Gauge(
+    "sleep_ai_scheduler_active",
+    "Запросы к AI, выполняющиеся сейчас",
+)
+"""Сколько запросов к AI выполняется одновременно."""
+
+AI_SCHEDULER_WAIT = Histogram(
+    "sleep_ai_scheduler_wait_seconds",
+    "Время ожидания запроса к AI в очереди планировщика",
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+"""Сколько секунд запрос к AI ждал в очереди."""
+
+AI_SCHEDULER_REJECTED = Counter(
+    "sleep_ai_scheduler_rejected_total",
+    "Отклонённые запросы к AI",
+    ["reason"],
+)
+"""Отклонённые запросы к AI по причине (rate - лимит клиента, queue - очередь заполнена)."""
+
+UPSTREAM_CALLS = Counter(
+    "sleep_ai_upstream_calls_total",
+    "Попытки запросов к внешним сервисам",
+    ["upstream", "result"],
+)
+"""Попытки запросов к внешним сервисам (gemini, telegraph) по результату
+(success, error, timeout, short_circuit - отклонено предохранителем)."""
+
+UPSTREAM_CIRCUIT = Gauge(
+    "sleep_ai_upstream_circuit_state",
+    "Состояние предохранителя внешнего сервиса: 0 - замкнут, 1 - пробный запрос, 2 - разомкнут",
+    ["upstream"],
+)
+"""Состояние предохранителя внешнего сервиса."""
+
+UPSTREAM_HEDGES = Counter(
+    "sleep_ai_upstream_hedged_total",
+    "Hedged запросы к внешним сервисам",
+    ["upstream"],
+)
+"""Сколько раз отправлен дубликат медленного запроса."""
+
+AI_BACKEND_REQUESTS = Counter(
+    "sleep_ai_backend_requests_total",
+    "Запросы к бэкендам AI через роутер",
+    ["backend", "result"],
+)
+"""Запросы к бэкендам AI через роутер по результату (success, error)."""
+
+AI_BACKEND_LATENCY = Histogram(
+    "sleep_ai_backend_latency_seconds",
+    "Время успешного ответа бэкенда AI",
+    ["backend"],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+"""Время успешного ответа бэкенда AI."""
+
+AI_TOKENS = Counter(
+    "sleep_ai_tokens_total",
+    "Токены запросов к AI",
+    ["backend", "kind"],
+)
+"""Токены запросов к AI: prompt - весь вход, cached - часть входа из кэша контекста, output - ответ."""
+
+STAGE_LATENCY = Histogram(
+    "sleep_ai_stage_seconds",
+    "Время выполнения этапа",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+"""Время выполнения этапов: создание воспоминания, методы MemoryManager,
+запросы к Telegraph, хэндлеры и запросы бота."""
+
+STAGE_ERRORS = Counter(
+    "sleep_ai_stage_errors_total",
+    "Этапы, завершившиеся исключением или ответом success=False",
+    ["stage"],
+)
+"""Ошибки этапов."""
+
+STAGE_IN_FLIGHT = Gauge(
+    "sleep_ai_stage_in_flight",
+    "Этапы, выполняющиеся сейчас",
+    ["stage"],
+)
+"""Сколько раз этап выполняется прямо сейчас."""
+
+HTTP_REQUESTS = Counter(
+    "sleep_ai_http_requests_total",
+    "HTTP запросы к FastAPI",
+    ["method", "route", "status"],
+)
+"""HTTP запросы по шаблону маршрута и коду ответа."""
+
+HTTP_LATENCY = Histogram(
+    "sleep_ai_http_request_seconds",
+    "Время обработки HTTP запроса до конца ответа",
+    ["method", "route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+"""Время обработки HTTP запроса."""
+
+HTTP_IN_FLIGHT = Gauge(
+    "sleep_ai_http_in_flight",
+    "HTTP запросы, которые обрабатываются сейчас",
+)
+"""Сколько HTTP запросов обрабатывается сейчас."""
+
+
+class _Timer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: "Stage"):
+        self.stage = stage
+
+    def __enter__(self) -> "_Timer":
+        self.stage.in_flight.inc()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stage.latency.observe(time.perf_counter() - self.started)
+        self.stage.in_flight.dec()
+        if exc_type is not None:
+            self.stage.errors.inc()
+
+
+class Stage:
+    """Метрики одного этапа с заранее выбранными метками,
+    поэтому замер стоит пару вызовов и его можно не отключать."""
+
+    __slots__ = ("name", "latency", "errors", "in_flight")
+
+    def __init__(self, name: str):
+        """Инцилизация
+
+        Args:
+            name (str): Название этапа, например memory.add_memory.
+        """
+        self.name = name
+        self.latency = STAGE_LATENCY.labels(name)
+        self.errors = STAGE_ERRORS.labels(name)
+        self.in_flight = STAGE_IN_FLIGHT.labels(name)
+
+    def track(self) -> _Timer:
+        """Замерить блок кода: with stage.track(): ..."""
+        return _Timer(self)
+
+
+_stages: dict[str, Stage] = {}
+
+
+def stage(name: str) -> Stage:
+    """Этап по названию, создаётся при первом обращении
+
+    Args:
+        name (str): название этапа
+
+    Returns:
+        Stage: Метрики этапа.
+    """
+    found = _stages.get(name)
+    if found is None:
+        found = _stages[name] = Stage(name)
+    return found
+
+
+def instrument(name: str):
+    """Декоратор асинхронной функции: время, ошибки и количество выполняющихся вызовов.
+    Ответ BaseResponseModel с success=False тоже считается ошибкой.
+
+    Args:
+        name (str): название этапа
+    """
+    metrics = stage(name)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with metrics.track():
+                result = await func(*args, **kwargs)
+            if getattr(result, "success", True) is False:
+                metrics.errors.inc()
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def instrumented(prefix: str):
+    """Декоратор класса: instrument для всех публичных асинхронных методов
+
+    Args:
+        prefix (str): префикс названий этапов, например memory
+    """
+
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if not attr.startswith("_") and inspect.iscoroutinefunction(value):
+                setattr(cls, attr, instrument(f"{prefix}.{attr}")(value))
+        return cls
+
+    return decorator
+
+
+_token_usage: ContextVar[dict[str, int] | None] = ContextVar(
+    "token_usage", default=None
+)
+
+
+def record_tokens(backend: str, tokens: dict[str, int]) -> None:
+    """Учесть токены запроса к AI в AI_TOKENS и в count_tokens текущего контекста
+
+    Args:
+        backend (str): название бэкенда
+        tokens (dict[str, int]): токены по видам: prompt, cached, output
+    """
+    usage = _token_usage.get()
+    for kind, count in tokens.items():
+        AI_TOKENS.labels(backend, kind).inc(count)
+        if usage is not None:
+            usage[kind] = usage.get(kind, 0) + count
+
+
+@contextmanager
+def count_tokens() -> Iterator[dict[str, int]]:
+    """Посчитать токены запросов к AI внутри блока: with count_tokens() as usage: ...
+
+    Считаются только запросы текущего контекста, параллельные запросы
+    других задач в usage не попадают.
+    """
+    usage: dict[str, int] = {}
+    token = _token_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _token_usage.reset(token)
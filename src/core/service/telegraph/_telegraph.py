@@ -1,12 +1,24 @@
+import asyncio
 import json
 
 from urllib.parse import urljoin
 from typing import Callable, TypeVar
 
 from ..._config import config
+from ...metrics import stage
+from ...tracing import span
+from ...utils import Resilience
 from loguru import logger
-from httpx import AsyncClient
-from bs4 import BeautifulSoup
+from httpx import (
+    AsyncClient,
+    ConnectError,
+    ConnectTimeout,
+    HTTPStatusError,
+    PoolTimeout,
+    Response,
+    TransportError,
+)
+from bs4 import BeautifulSoup, PageElement
 from pydantic import BaseModel
 
 from .schemas import PageResponse, AccountResponse, ErrorResponse, Node
@@ -27,7 +39,7 @@ class ParamBuilder:
     def build_page(
         access_token: str,
         title: str,
-        content: list[Node] | list[str],
+        content: list[Node | str],
         author_name: str | None = None,
         author_url: str | None = None,
         return_content: bool = False,
@@ -50,16 +62,36 @@ class ParamBuilder:
 
 
 class Telegraph:
-    base_url = "https://api.telegra.ph"
+    """Клиент Telegraph API. Запросы идут через Resilience: дедлайн,
+    повторы при сетевых ошибках, 429 и 5xx и предохранитель. Hedging выключен,
+    потому что createPage не идемпотентен, по той же причине createPage
+    повторяется, только если запрос точно не был обработан, остальное
+    повторяет очередь публикации."""
 
-    CREATE_ACCOUNT_URL = urljoin(base_url, "/createAccount")
-    CREATE_PAGE_URL = urljoin(base_url, "/createPage")
+    base_url = "https://api.telegra.ph"
 
-    def __init__(self, client: AsyncClient, features: str | None = None):
+    def __init__(
+        self,
+        client: AsyncClient,
+        features: str | None = None,
+        base_url: str | None = None,
+    ):
         self.client = client
+        self.base_url = base_url or config.telegraph_base_url or self.base_url
+        self.CREATE_ACCOUNT_URL = urljoin(self.base_url, "/createAccount")
+        self.CREATE_PAGE_URL = urljoin(self.base_url, "/createPage")
         self.features = features or "html.parser"
         self._access_token: str | None = config.access_token
         self._username = "ai-memory"
+        self._account_lock = asyncio.Lock()
+        self.resilience = Resilience(
+            "telegraph",
+            timeout=config.telegraph_timeout,
+            attempts=config.telegraph_attempts,
+            retryable=self._retryable,
+            failure_threshold=config.circuit_failures,
+            reset_timeout=config.circuit_reset,
+        )
 
     async def create_account(
         self, short_name: str | None = None, author_name: str | None = None
@@ -94,9 +126,8 @@ class Telegraph:
         return_content: bool = False,
     ) -> PageResponse:
         logger.info(f"Создание страницы (title={title})")
-        if access_token is None and not self._access_token:
-            logger.debug("Аккаунт не инцилизирован создание нового.")
-            await self.create_account()
+        if access_token is None:
+            await self.ensure_account()
 
         page = await self._base_fetch(
             self.CREATE_PAGE_URL,
@@ -110,6 +141,7 @@ class Telegraph:
             return_content=return_content,
             type="json",
             method="post",
+            idempotent=False,
         )
         if not page.ok:
             logger.error(f"Не удалось сгенерировать страницу (error={page.error})")
@@ -118,6 +150,31 @@ class Telegraph:
 
         return page
 
+    async def ensure_account(self) -> str | None:
+        """Создать аккаунт, если токена ещё нет.
+        Параллельные вызовы ждут один и тот же createAccount.
+
+        Returns:
+            str | None: Токен доступа или None, если аккаунт создать не удалось.
+        """
+        if self._access_token:
+            return self._access_token
+
+        async with self._account_lock:
+            if not self._access_token:
+                logger.debug("Аккаунт не инцилизирован создание нового.")
+                await self.create_account()
+        return self._access_token
+
+    @property
+    def access_token(self) -> str | None:
+        """Токен доступа текущего аккаунта"""
+        return self._access_token
+
+    @access_token.setter
+    def access_token(self, value: str | None) -> None:
+        self._access_token = value
+
     async def _base_fetch(
         self,
         url: str,
@@ -126,12 +183,27 @@ class Telegraph:
         *args,
         method: str = "GET",
         type: str = "params",
+        idempotent: bool = True,
         **kwargs,
     ):
-        response = await self.client.request(
-            method=method, url=url, **{type: builder(*args, **kwargs)}
-        )
-        response.raise_for_status()
+        params = {type: builder(*args, **kwargs)}
+
+        async def fetch() -> Response:
+            response = await self.client.request(method=method, url=url, **params)
+            response.raise_for_status()
+            return response
+
+        name = f"telegraph.{url.rsplit('/', 1)[-1]}"
+        with stage(name).track(), span(name) as current:
+            response = await self.resilience.call(
+                fetch, retryable=None if idempotent else self._not_processed
+            )
+            if current is not None:
+                current.set(
+                    status=response.status_code,
+                    request_bytes=len(response.request.content),
+                    response_bytes=len(response.content),
+                )
         content = response.json()
 
         if not content["ok"]:
@@ -139,18 +211,55 @@ class Telegraph:
 
         return model.model_validate(content)
 
-    def _create_nodes(self, content: str, features: str | None = None) -> list[Node]:
+    @staticmethod
+    def _retryable(error: BaseException) -> bool:
+        if isinstance(error, HTTPStatusError):
+            return error.response.status_code == 429 or error.response.is_server_error
+        return isinstance(error, TransportError)
+
+    @staticmethod
+    def _not_processed(error: BaseException) -> bool:
+        """Запрос не дошёл до Telegraph или отклонён без обработки"""
+        if isinstance(error, HTTPStatusError):
+            return error.response.status_code == 429
+        return isinstance(error, (ConnectError, ConnectTimeout, PoolTimeout))
+
+    def _create_nodes(
+        self, content: str, features: str | None = None
+    ) -> list[Node | str]:
+        """Преобразовать HTML в список Node для Telegraph.
+        Документ разбирается один раз, затем дерево обходится без повторного парсинга.
+
+        Args:
+            content (str): HTML текст.
+            features (str | None, optional): Парсер BeautifulSoup, если не указан используется self.features. Обычное состояние None.
+
+        Returns:
+            list[Node | str]: Узлы и строки верхнего уровня.
+        """
         soup = BeautifulSoup(content, features=features or self.features)
-        nodes: list[Node] = []
+        return self._convert(soup.contents, merge_strings=False)
+
+    def _convert(
+        self, elements: list[PageElement], merge_strings: bool = True
+    ) -> list[Node | str]:
+        """Рекурсивно обойти уже разобранное дерево.
+        Соседние строки внутри тега склеиваются, как это происходило при повторном парсинге."""
+        nodes: list[Node | str] = []
 
-        for child in soup:
+        for child in elements:
             if child.name is None:
-                nodes.append(str(child.string))
+                text = str(child.string)
+                if merge_strings and nodes and isinstance(nodes[-1], str):
+                    nodes[-1] += text
+                else:
+                    nodes.append(text)
                 continue
-            tag = Node(
-                tag=child.name,
-                attrs=child.attrs,
-                children=self._create_nodes("".join(map(str, child.contents))),
+            nodes.append(
+                Node(
+                    tag=child.name,
+                    attrs=child.attrs,
+                    children=self._convert(child.contents),
+                )
             )
-            nodes.append(tag)
         return nodes
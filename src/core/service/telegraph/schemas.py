@@ -1,4 +1,4 @@
-from typing import TypeVar, Generic, Optional
+from typing import TypeVar, Generic, Optional, Union
 
 from pydantic import BaseModel, HttpUrl, Field
 
@@ -17,7 +17,7 @@ class ErrorResponse(BaseResponse[None]):
 class Node(BaseModel):
     tag: str
     attrs: Optional[dict[str, str]]
-    children: Optional[list["Node"] | list[str]]
+    children: Optional[list[Union["Node", str]]]
 
 
 class Account(BaseModel):
@@ -0,0 +1,166 @@
+"""Профили хранилища: настройка движка базы данных под конкретный бэкенд.
+
+storage = create_storage(config.database_url)
+memory = MemoryManager(storage.engine, reader=storage.reader)
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from ._config import config
+
+
+__all__ = [
+    "Storage",
+    "StorageProfile",
+    "DefaultProfile",
+    "SQLiteProfile",
+    "PostgresProfile",
+    "create_storage",
+]
+
+
+@dataclass
+class Storage:
+    """Движки базы данных: engine для записи, reader для чтения.
+    Если профиль не разделяет чтение и запись, это один и тот же движок."""
+
+    engine: AsyncEngine
+    reader: AsyncEngine
+
+    async def dispose(self) -> None:
+        """Закрыть все соединения"""
+        await self.engine.dispose()
+        if self.reader is not self.engine:
+            await self.reader.dispose()
+
+
+class StorageProfile(ABC):
+    """Профиль хранилища, создаёт настроенные движки для своего бэкенда."""
+
+    name: str = ""
+    """Название профиля для логов и бенчмарков."""
+
+    @abstractmethod
+    def supports(self, url: URL) -> bool:
+        """Подходит ли профиль для этого URL базы данных"""
+
+    @abstractmethod
+    def create(self, url: URL) -> Storage:
+        """Создать движки
+
+        Args:
+            url (URL): URL базы данных.
+
+        Returns:
+            Storage: Движки для записи и чтения.
+        """
+
+
+class DefaultProfile(StorageProfile):
+    """Движок SQLAlchemy с настройками по умолчанию, для остальных бэкендов."""
+
+    name = "default"
+
+    def supports(self, url: URL) -> bool:
+        return True
+
+    def create(self, url: URL) -> Storage:
+        engine = create_async_engine(url)
+        return Storage(engine=engine, reader=engine)
+
+
+class SQLiteProfile(StorageProfile):
+    """SQLite в режиме WAL.
+
+    Все записи идут через одно соединение, поэтому писатели не получают
+    `database is locked`, а читатели работают параллельно через отдельный
+    пул соединений только для чтения и не ждут писателя.
+    """
+
+    name = "sqlite"
+
+    def supports(self, url: URL) -> bool:
+        return url.get_backend_name() == "sqlite" and url.database not in (
+            None,
+            "",
+            ":memory:",
+        )
+
+    def create(self, url: URL) -> Storage:
+        engine = create_async_engine(url, pool_size=1, max_overflow=0)
+        reader = create_async_engine(
+            url, pool_size=config.db_pool_size, max_overflow=config.db_max_overflow
+        )
+        self._pragmas(engine, query_only=False)
+        self._pragmas(reader, query_only=True)
+        return Storage(engine=engine, reader=reader)
+
+    @staticmethod
+    def _pragmas(engine: AsyncEngine, query_only: bool) -> None:
+        pragmas = {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": config.sqlite_busy_timeout,
+            "mmap_size": config.sqlite_mmap_size,
+            "temp_store": "MEMORY",
+            "query_only": int(query_only),
+        }
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+
+class PostgresProfile(StorageProfile):
+    """PostgreSQL через asyncpg с пулом соединений и кэшем подготовленных запросов.
+    Для работы нужен пакет asyncpg."""
+
+    name = "postgres"
+
+    def supports(self, url: URL) -> bool:
+        return url.drivername == "postgresql+asyncpg"
+
+    def create(self, url: URL) -> Storage:
+        engine = create_async_engine(
+            url,
+            pool_size=config.db_pool_size,
+            max_overflow=config.db_max_overflow,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+            connect_args={
+                "prepared_statement_cache_size": config.db_statement_cache_size,
+                "statement_cache_size": config.db_statement_cache_size,
+            },
+        )
+        return Storage(engine=engine, reader=engine)
+
+
+PROFILES: list[StorageProfile] = [SQLiteProfile(), PostgresProfile(), DefaultProfile()]
+"""Профили в порядке проверки, DefaultProfile подходит для любого URL."""
+
+
+def create_storage(url: str | None = None) -> Storage:
+    """Создать движки базы данных с профилем, подходящим под URL
+
+    Args:
+        url (str | None, optional): URL базы данных, если не указан берётся из config. Обычное состояние None.
+
+    Returns:
+        Storage: Движки для записи и чтения.
+    """
+    parsed = make_url(url or config.database_url)
+    if parsed.drivername in ("postgres", "postgresql"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+
+    profile = next(profile for profile in PROFILES if profile.supports(parsed))
+    logger.info(f"Профиль хранилища: {profile.name}")
+    return profile.create(parsed)
@@ -0,0 +1,352 @@
+"""Трассировка запросов: путь одного запроса от бота или API через AI, базу данных и Telegraph.
+
+Трасса начинается в точке входа (trace), вложенные этапы отмечаются span.
+Текущий span хранится в contextvars, поэтому передавать его явно не нужно.
+Если трасса не выбрана (TRACE_SAMPLE_RATE), span возвращает общий пустой
+контекстный менеджер и почти ничего не стоит.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+
+from abc import ABC, abstractmethod
+from contextvars import ContextVar, Token
+from typing import Any
+
+from httpx import AsyncClient
+from loguru import logger
+
+from ._config import config
+
+
+SERVICE_NAME = "sleep-ai"
+
+_current: ContextVar["Span | None"] = ContextVar("trace_span", default=None)
+
+
+class _Trace:
+    __slots__ = ("id", "spans", "finished")
+
+    def __init__(self):
+        self.id = os.urandom(16).hex()
+        self.spans: list[Span] = []
+        self.finished = False
+
+
+class Span:
+    """Этап трассы со временем начала и конца и атрибутами"""
+
+    __slots__ = (
+        "trace",
+        "id",
+        "parent_id",
+        "name",
+        "attributes",
+        "start",
+        "end",
+        "error",
+        "_token",
+    )
+
+    def __init__(self, trace: _Trace, name: str, parent: "Span | None", **attributes):
+        """Инцилизация
+
+        Args:
+            trace (_Trace): Трасса, к которой относится span.
+            name (str): Название этапа, например gemini.generate.
+            parent (Span | None): Родительский span, None для корня трассы.
+        """
+        self.trace = trace
+        self.id = os.urandom(8).hex()
+        self.parent_id = parent.id if parent is not None else None
+        self.name = name
+        self.attributes: dict[str, Any] = attributes
+        self.start = 0
+        self.end = 0
+        self.error: str | None = None
+        self._token: Token | None = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.id
+
+    def set(self, **attributes) -> None:
+        """Добавить атрибуты, например размер ответа или количество токенов"""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.time_ns()
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            self.error = str(exc) or exc_type.__name__
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # span закрыт в другом контексте, например генератор стрима
+            # доигрывается в другой задаче, там он и не устанавливался
+            pass
+        tracer.finish(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace.id,
+            "span_id": self.id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round((self.end - self.start) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoSpan:
+    """Пустой span, когда трасса не ведётся"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+class SpanExporter(ABC):
+    """Куда отправлять законченные span'ы"""
+
+    @abstractmethod
+    async def export(self, spans: list[Span]) -> None: ...
+
+    async def close(self) -> None:
+        """Освободить ресурсы экспортёра"""
+
+
+class JsonFileExporter(SpanExporter):
+    """Запись span'ов в файл, по одному JSON объекту на строку"""
+
+    def __init__(self, path: str):
+        """Инцилизация
+
+        Args:
+            path (str): Путь к файлу, папка создаётся при необходимости.
+        """
+        self.path = path
+
+    async def export(self, spans: list[Span]) -> None:
+        lines = "".join(
+            json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+            for span in spans
+        )
+        await asyncio.to_thread(self._write, lines)
+
+    def _write(self, lines: str) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+
+class OTLPExporter(SpanExporter):
+    """Отправка span'ов в OTLP/HTTP коллектор (JSON кодировка),
+    например OpenTelemetry Collector, Jaeger или Tempo"""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        """Инцилизация
+
+        Args:
+            endpoint (str): Адрес приёма трасс, например http://localhost:4318/v1/traces.
+            timeout (float, optional): Дедлайн отправки в секундах. Обычное состояние 5.0.
+        """
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self._client: AsyncClient | None = None
+
+    async def export(self, spans: list[Span]) -> None:
+        if self._client is None:
+            self._client = AsyncClient(timeout=self.timeout)
+        response = await self._client.post(self.endpoint, json=self.payload(spans))
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+    @classmethod
+    def payload(cls, spans: list[Span]) -> dict[str, Any]:
+        """Тело запроса ExportTraceServiceRequest в JSON кодировке OTLP"""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": cls._attributes({"service.name": SERVICE_NAME})
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": SERVICE_NAME},
+                            "spans": [cls._span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    @classmethod
+    def _span(cls, span: Span) -> dict[str, Any]:
+        result = {
+            "traceId": span.trace.id,
+            "spanId": span.id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start),
+            "endTimeUnixNano": str(span.end),
+            "attributes": cls._attributes(span.attributes),
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id is not None:
+            result["parentSpanId"] = span.parent_id
+        return result
+
+    @staticmethod
+    def _attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+        result = []
+        for key, value in attributes.items():
+            if isinstance(value, bool):
+                typed = {"boolValue": value}
+            elif isinstance(value, int):
+                typed = {"intValue": str(value)}
+            elif isinstance(value, float):
+                typed = {"doubleValue": value}
+            else:
+                typed = {"stringValue": str(value)}
+            result.append({"key": key, "value": typed})
+        return result
+
+
+class Tracer:
+    """Выборка трасс и отправка законченных трасс экспортёру.
+
+    Span'ы трассы копятся в памяти и отправляются одной пачкой, когда
+    закончился корневой span. Span'ы фоновых задач, переживших корень,
+    отправляются по одному. Отправка идёт в фоне и не задерживает запрос.
+    """
+
+    MAX_PENDING = 64
+    """Сколько отправок может выполняться одновременно, лишние трассы отбрасываются."""
+
+    def __init__(self, sample_rate: float, exporter: SpanExporter | None):
+        """Инцилизация
+
+        Args:
+            sample_rate (float): Доля трасс, которые записываются, от 0 до 1.
+            exporter (SpanExporter | None): Экспортёр, None - трассировка выключена.
+        """
+        self.sample_rate = sample_rate if exporter is not None else 0.0
+        self.exporter = exporter
+        self._pending: set[asyncio.Task] = set()
+
+    def trace(self, name: str, **attributes) -> Span | _NoSpan:
+        """Начать трассу, если её ещё нет, иначе вложенный span
+
+        Args:
+            name (str): название точки входа, например bot.process_content
+
+        Returns:
+            Span | _NoSpan: Контекстный менеджер, в with отдаёт Span или None.
+        """
+        parent = _current.get()
+        if parent is not None:
+            return Span(parent.trace, name, parent, **attributes)
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return _NO_SPAN
+        return Span(_Trace(), name, None, **attributes)
+
+    def span(self, name: str, **attributes) -> Span | _NoSpan:
+        """Вложенный span, если трасса ведётся
+
+        Args:
+            name (str): название этапа
+
+        Returns:
+            Span | _NoSpan: Контекстный менеджер, в with отдаёт Span или None.
+        """
+        parent = _current.get()
+        if parent is None:
+            return _NO_SPAN
+        return Span(parent.trace, name, parent, **attributes)
+
+    def finish(self, span: Span) -> None:
+        trace = span.trace
+        if trace.finished:
+            self._export([span])
+            return
+
+        trace.spans.append(span)
+        if span.parent_id is None:
+            trace.finished = True
+            self._export(trace.spans)
+
+    async def close(self) -> None:
+        """Дождаться отправки трасс и закрыть экспортёр"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self.exporter is not None:
+            await self.exporter.close()
+
+    def _export(self, spans: list[Span]) -> None:
+        if len(self._pending) >= self.MAX_PENDING:
+            logger.warning("Экспорт трасс не успевает, трасса отброшена")
+            return
+        task = asyncio.get_running_loop().create_task(self._send(spans))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _send(self, spans: list[Span]) -> None:
+        try:
+            await self.exporter.export(spans)
+        except Exception as e:
+            logger.warning(f"Не удалось отправить трассу: {e}")
+
+
+def create_exporter() -> SpanExporter | None:
+    """Экспортёр по настройкам TRACE_EXPORTER
+
+    Returns:
+        SpanExporter | None: Экспортёр или None, если трассировка выключена.
+    """
+    if config.trace_sample_rate <= 0:
+        return None
+    if config.trace_exporter == "otlp":
+        return OTLPExporter(config.trace_otlp_endpoint)
+    if config.trace_exporter == "json":
+        return JsonFileExporter(config.trace_file)
+    raise ValueError(f"Неизвестный TRACE_EXPORTER: {config.trace_exporter}")
+
+
+tracer = Tracer(config.trace_sample_rate, create_exporter())
+
+
+def trace(name: str, **attributes) -> Span | _NoSpan:
+    """Начать трассу в точке входа, см. Tracer.trace"""
+    return tracer.trace(name, **attributes)
+
+
+def span(name: str, **attributes) -> Span | _NoSpan:
+    """Вложенный span, см. Tracer.span"""
+    return tracer.span(name, **attributes)
+
+
+def current_span() -> Span | None:
+    """Текущий span или None, если трасса не ведётся"""
+    return _current.get()
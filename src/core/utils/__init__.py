@@ -0,0 +1,12 @@
+"""Вспомогательные структуры данных, которые используются в разных частях проекта."""
+
+from ._lru import LRUCache
+from ._resilience import CircuitBreaker, CircuitOpenError, CircuitState, Resilience
+
+__all__ = [
+    "LRUCache",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "CircuitState",
+    "Resilience",
+]
@@ -0,0 +1,58 @@
+import time
+
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+
+class LRUCache(Generic[_K, _V]):
+    """Простой LRU-кэш в памяти процесса с ограничением размера и TTL."""
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        """Инцилизация кэша
+
+        Args:
+            maxsize (int): Максимальное количество записей.
+            ttl (float | None, optional): Время жизни записи в секундах, None - бессрочно. Обычное состояние None.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[_K, tuple[float | None, _V]] = OrderedDict()
+
+    def get(self, key: _K) -> _V | None:
+        """Получить значение и отметить его как недавно использованное"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: _K, value: _V) -> None:
+        """Сохранить значение, вытеснив самое старое при переполнении"""
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: _K) -> None:
+        """Удалить значение, если оно есть"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистить кэш"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,288 @@
+import asyncio
+import time
+
+from collections import deque
+from enum import IntEnum
+from typing import Awaitable, Callable, TypeVar
+
+from loguru import logger
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from ..metrics import UPSTREAM_CALLS, UPSTREAM_CIRCUIT, UPSTREAM_HEDGES
+from ..tracing import current_span, span
+
+
+_T = TypeVar("_T")
+
+
+class CircuitOpenError(RuntimeError):
+    """Предохранитель разомкнут, запрос к внешнему сервису не выполняется"""
+
+    def __init__(self, name: str, retry_after: float):
+        """Инцилизация
+
+        Args:
+            name (str): Название внешнего сервиса.
+            retry_after (float): Через сколько секунд предохранитель пропустит пробный запрос.
+        """
+        self.retry_after = retry_after
+        super().__init__(
+            f"Сервис {name} недоступен, повторите через {max(1, round(retry_after))} сек."
+        )
+
+
+class CircuitState(IntEnum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitBreaker:
+    """Предохранитель: после failure_threshold ошибок подряд запросы сразу
+    отклоняются reset_timeout секунд, затем пропускается один пробный запрос."""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        """Инцилизация
+
+        Args:
+            name (str): Название внешнего сервиса для логов и метрик.
+            failure_threshold (int): Сколько ошибок подряд размыкают предохранитель.
+            reset_timeout (float): Сколько секунд предохранитель разомкнут.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe = False
+        self._set_state(CircuitState.CLOSED)
+
+    def check(self) -> None:
+        """Проверить, можно ли выполнить запрос
+
+        Raises:
+            CircuitOpenError: Если предохранитель разомкнут или пробный запрос уже выполняется.
+        """
+        if self.state == CircuitState.CLOSED:
+            return
+
+        retry_after = self._opened_at + self.reset_timeout - time.monotonic()
+        if self.state == CircuitState.OPEN and retry_after <= 0:
+            self._set_state(CircuitState.HALF_OPEN)
+        if self.state == CircuitState.HALF_OPEN and not self._probe:
+            self._probe = True
+            return
+
+        UPSTREAM_CALLS.labels(self.name, "short_circuit").inc()
+        raise CircuitOpenError(self.name, max(retry_after, 0.0))
+
+    def success(self) -> None:
+        """Запрос выполнен успешно"""
+        self._failures = 0
+        self._probe = False
+        if self.state != CircuitState.CLOSED:
+            logger.success(f"Сервис {self.name} снова доступен")
+            self._set_state(CircuitState.CLOSED)
+
+    def failure(self) -> None:
+        """Запрос завершился ошибкой сервиса"""
+        self._failures += 1
+        self._probe = False
+        if (
+            self.state == CircuitState.HALF_OPEN
+            or self._failures >= self.failure_threshold
+        ):
+            if self.state != CircuitState.OPEN:
+                logger.warning(
+                    f"Сервис {self.name} недоступен, запросы отклоняются {self.reset_timeout:.0f} сек."
+                )
+            self._opened_at = time.monotonic()
+            self._set_state(CircuitState.OPEN)
+
+    def release(self) -> None:
+        """Запрос прерван, не получив ответа: пробный запрос можно повторить"""
+        self._probe = False
+
+    def _set_state(self, state: CircuitState) -> None:
+        self.state = state
+        UPSTREAM_CIRCUIT.labels(self.name).set(state)
+
+
+class Resilience:
+    """Устойчивые вызовы внешнего сервиса: общий для всех клиентов слой
+    с дедлайном на попытку, повторами с джиттером, hedged запросами и предохранителем.
+
+    Повторяются и считаются ошибкой сервиса только исключения, для которых
+    retryable возвращает True, и превышение дедлайна. Hedged запрос - дубликат,
+    который отправляется, если первый не ответил за p95 времени ответа,
+    побеждает тот, кто ответит первым. Включайте hedging только для
+    идемпотентных запросов.
+    """
+
+    LATENCY_WINDOW = 200
+    """Сколько последних времён ответа хранить для оценки p95."""
+
+    MIN_SAMPLES = 20
+    """Сколько ответов нужно, прежде чем начать отправлять hedged запросы."""
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        attempts: int,
+        retryable: Callable[[BaseException], bool],
+        hedge: bool = False,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        """Инцилизация
+
+        Args:
+            name (str): Название внешнего сервиса для логов и метрик.
+            timeout (float): Дедлайн одной попытки в секундах.
+            attempts (int): Сколько всего попыток делать.
+            retryable (Callable[[BaseException], bool]): Можно ли повторить запрос после этой ошибки.
+            hedge (bool, optional): Отправлять дубликат запроса после p95. Обычное состояние False.
+            failure_threshold (int, optional): Сколько ошибок подряд размыкают предохранитель. Обычное состояние 5.
+            reset_timeout (float, optional): Сколько секунд предохранитель разомкнут. Обычное состояние 30.0.
+        """
+        self.name = name
+        self.timeout = timeout
+        self.attempts = attempts
+        self.retryable = retryable
+        self.hedge = hedge
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self._latencies: deque[float] = deque(maxlen=self.LATENCY_WINDOW)
+
+    async def call(
+        self,
+        func: Callable[[], Awaitable[_T]],
+        retryable: Callable[[BaseException], bool] | None = None,
+        discard: Callable[[_T], Awaitable[None]] | None = None,
+    ) -> _T:
+        """Выполнить запрос
+
+        Args:
+            func (Callable[[], Awaitable[_T]]): Функция, которая делает один запрос, вызывается на каждую попытку.
+            retryable (Callable[[BaseException], bool] | None, optional): Какие ошибки повторять для этого запроса вместо is_retryable, для неидемпотентных запросов. Ошибки сервиса для предохранителя по-прежнему определяет is_retryable. Обычное состояние None.
+            discard (Callable[[_T], Awaitable[None]] | None, optional): Освободить результат, который проиграл hedged гонку, например закрыть открытый поток. Обычное состояние None.
+
+        Raises:
+            CircuitOpenError: Если предохранитель разомкнут.
+            Exception: Ошибка последней попытки.
+
+        Returns:
+            _T: Результат запроса.
+        """
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.attempts),
+            wait=wait_random_exponential(multiplier=0.5, max=10),
+            retry=retry_if_exception(retryable or self.is_retryable),
+            before_sleep=self._log_retry,
+            reraise=True,
+        ):
+            with attempt:
+                self.breaker.check()
+                with span(
+                    f"{self.name}.call", attempt=attempt.retry_state.attempt_number
+                ):
+                    return await self._attempt(func, discard)
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Ошибка сервиса, после которой запрос можно повторить"""
+        return isinstance(error, TimeoutError) or self.retryable(error)
+
+    def p95(self) -> float | None:
+        """p95 времени ответа в секундах или None, если ответов ещё мало"""
+        if len(self._latencies) < self.MIN_SAMPLES:
+            return None
+        return sorted(self._latencies)[int(len(self._latencies) * 0.95)]
+
+    async def _attempt(
+        self,
+        func: Callable[[], Awaitable[_T]],
+        discard: Callable[[_T], Awaitable[None]] | None,
+    ) -> _T:
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(self.timeout):
+                result = await self._hedged(func, discard)
+        except Exception as e:
+            retryable = self.is_retryable(e)
+            UPSTREAM_CALLS.labels(
+                self.name, "timeout" if isinstance(e, TimeoutError) else "error"
+            ).inc()
+            if retryable:
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+            raise
+        except BaseException:
+            # отмена не говорит о состоянии сервиса, но пробный запрос освобождается
+            self.breaker.release()
+            raise
+
+        self._latencies.append(time.monotonic() - started)
+        UPSTREAM_CALLS.labels(self.name, "success").inc()
+        self.breaker.success()
+        return result
+
+    async def _hedged(
+        self,
+        func: Callable[[], Awaitable[_T]],
+        discard: Callable[[_T], Awaitable[None]] | None,
+    ) -> _T:
+        delay = self.p95() if self.hedge else None
+        if delay is None:
+            return await func()
+
+        tasks = {asyncio.ensure_future(func())}
+        winner: asyncio.Future | None = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                UPSTREAM_HEDGES.labels(self.name).inc()
+                current = current_span()
+                if current is not None:
+                    current.set(hedged=True)
+                tasks.add(asyncio.ensure_future(func()))
+
+            error: BaseException | None = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            # проигравший запрос мог успеть вернуть результат, который держит соединение
+            for task in tasks:
+                if (
+                    discard is not None
+                    and task is not winner
+                    and task.done()
+                    and not task.cancelled()
+                    and task.exception() is None
+                ):
+                    try:
+                        await discard(task.result())
+                    except Exception as e:
+                        logger.debug(f"Не удалось освободить ответ {self.name}: {e}")
+
+    def _log_retry(self, state) -> None:
+        logger.warning(
+            f"Запрос к {self.name} не удался, попытка {state.attempt_number + 1} "
+            f"через {state.next_action.sleep:.1f} сек.: {state.outcome.exception()}"
+        )
@@ -1,21 +1,59 @@
 import uvicorn
 
 from ..core.manager.create_memory import CreateMemoryManager
+from ..core.manager.jobs import JobManager
+from ..core.manager.backfill import BackfillManager
+from ..core import config
+from ..bot._bot import BaseMemoryBot
 from ._frontend import FrontEnd
 from ._api import create_api
+from ._webhook import create_webhook
 
 
-def setup_frontend(manager: CreateMemoryManager) -> FrontEnd:
+def setup_frontend(
+    manager: CreateMemoryManager,
+    jobs: JobManager,
+    backfill: BackfillManager,
+    bot: BaseMemoryBot | None = None,
+) -> FrontEnd:
     frontend = FrontEnd(manager)
 
-    create_api(manager, frontend)
+    create_api(manager, frontend, jobs, backfill)
+    if bot is not None:
+        create_webhook(frontend, bot, config.webhook_path)
 
     return frontend
 
 
-async def start_frontend(manager: CreateMemoryManager) -> None:
-    frontend = setup_frontend(manager)
-
-    config = uvicorn.Config(app=frontend.app, host="0.0.0.0", port=8000)
-
-    await uvicorn.Server(config).serve()
+async def start_frontend(
+    manager: CreateMemoryManager,
+    jobs: JobManager,
+    backfill: BackfillManager,
+    bot: BaseMemoryBot | None = None,
+) -> None:
+    """Запустить сервер. Если передан бот, он получает обновления
+    через webhook на этом же сервере (WEBHOOK_URL)."""
+    frontend = setup_frontend(manager, jobs, backfill, bot)
+
+    # за обратным прокси адрес клиента берётся из X-Forwarded-For доверенных прокси,
+    # иначе все пользователи делили бы один лимит запросов к AI
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app=frontend.app,
+            host="0.0.0.0",
+            port=8000,
+            proxy_headers=True,
+            forwarded_allow_ips=config.forwarded_allow_ips,
+        )
+    )
+    if bot is None:
+        await server.serve()
+        return
+
+    await bot.start_webhook(
+        config.webhook_url.rstrip("/") + config.webhook_path, bot.webhook_secret
+    )
+    try:
+        await server.serve()
+    finally:
+        await bot.stop_webhook()
@@ -1,43 +1,163 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import PlainTextResponse
+import hashlib
+import json
+import math
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 
 from ..core import config
 from ._frontend import FrontEnd
 from ..core.manager.create_memory import CreateMemoryManager
+from ..core.manager.jobs import JobManager
+from ..core.manager.backfill import BackfillManager
+from ..core.manager.export import MemoryExporter
+from ..core.manager.importer import MemoryImporter
+from ..core.manager.ai.scheduler import AIRejectedError
 from ..core.entites.schemas import (
     SleepMemoryBaseModel,
     BaseResponseModel,
     SleepMemoryUpdateModel,
     SleepMemoryModel,
+    MemoryJobModel,
+    BackfillReportModel,
+    SleepMemoryPageModel,
+    SearchPageModel,
+    SimilarPageModel,
+    MemoryBulkRequestModel,
+    MemoryBulkResultModel,
+    ExportFormat,
+    ImportReportModel,
 )
 
 
-def create_api(manager: CreateMemoryManager, frontend: FrontEnd):
+async def verify_admin(x_admin_token: str | None = Header(default=None)):
+    """Проверяет заголовок X-Admin-Token для админских API"""
+    if not config.admin_token:
+        raise HTTPException(403, "Админские API отключены.")
+    if x_admin_token != config.admin_token:
+        raise HTTPException(401, "Неверный админский токен.")
+
+
+def not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Проверяет условные заголовки запроса, If-None-Match важнее If-Modified-Since
+
+    Args:
+        request (Request): Запрос.
+        etag (str): Текущий ETag ресурса.
+        last_modified (datetime): Время последнего изменения ресурса в UTC.
+
+    Returns:
+        bool: True, если клиент уже имеет актуальную версию и можно ответить 304.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in (
+            tag.strip() for tag in if_none_match.split(",")
+        )
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def create_api(
+    manager: CreateMemoryManager,
+    frontend: FrontEnd,
+    jobs: JobManager,
+    backfill: BackfillManager,
+):
 
     router = APIRouter(prefix="/api", tags=["api"])
+    admin = APIRouter(
+        prefix="/api/admin", tags=["admin"], dependencies=[Depends(verify_admin)]
+    )
+    exporter = MemoryExporter(manager.memory)
+    importer = MemoryImporter(manager.memory)
 
-    @router.post("/add")
+    @router.post("/add", status_code=202)
     async def create_memory(
-        memory: SleepMemoryBaseModel,
-    ) -> BaseResponseModel[SleepMemoryModel]:
-        """Создаёт воспоминание,
+        memory: SleepMemoryBaseModel, request: Request
+    ) -> BaseResponseModel[MemoryJobModel]:
+        """Ставит воспоминание в очередь на создание,
+        статус можно узнать через `GET /api/jobs/{id}`.
 
         Args:
             memory (SleepMemoryBaseModel): Модель воспоминание.
+            request (Request): Запрос, по IP клиента считается лимит запросов к AI. За обратным прокси IP берётся из X-Forwarded-For, если прокси указан в FORWARDED_ALLOW_IPS.
 
         Raises:
-            HTTPException: Если при генерации ответа произошла ошибка.
-            HTTPException: Если при добавлении памяти произошла ошибка.
+            HTTPException: 429, если исчерпан лимит запросов к AI или очередь заполнена.
+            HTTPException: Если не удалось поставить воспоминание в очередь.
 
         Returns:
-            BaseResponseModel[SleepMemoryModel]: Модель ответа с воспоминанием.
+            BaseResponseModel[MemoryJobModel]: Модель ответа с задачей.
         """
-        response = await manager.create_memory(memory)
+        client = request.client.host if request.client else "unknown"
+        retry_after = manager.scheduler.admit(f"ip:{client}")
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=429,
+                detail=str(AIRejectedError(retry_after)),
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+        response = await jobs.submit(memory)
         if not response.success:
             raise HTTPException(status_code=500, detail=response.message)
 
         return response
 
+    @router.get("/jobs/{id}")
+    async def get_job(id: str) -> BaseResponseModel[MemoryJobModel]:
+        """Получить статус задачи по ID
+
+        Args:
+            id (str): Уникальный идентификатор задачи.
+
+        Raises:
+            HTTPException: Если задача не найдена.
+
+        Returns:
+            BaseResponseModel[MemoryJobModel]: Модель ответа с задачей и результатом.
+        """
+        response = await jobs.get_job(id)
+        if not response.success:
+            raise HTTPException(status_code=404, detail=response.message)
+
+        return response
+
+    @router.get("/jobs/{id}/stream", response_class=StreamingResponse)
+    async def stream_job(id: str):
+        """Server-Sent Events с ответом AI по мере генерации.
+        События `chunk` содержат очередной фрагмент текста, `done` - итоговую задачу.
+
+        Args:
+            id (str): Уникальный идентификатор задачи.
+        """
+
+        async def events():
+            async for chunk in jobs.follow(id):
+                yield f"event: chunk\ndata: {json.dumps({'text': chunk})}\n\n"
+
+            response = await jobs.get_job(id)
+            yield f"event: done\ndata: {response.model_dump_json()}\n\n"
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     @router.delete("/delete/{id}")
     async def delete_memory(id: int) -> BaseResponseModel[None]:
         """Удаляет воспоминание по ID
@@ -50,9 +170,10 @@ def create_api(manager: CreateMemoryManager, frontend: FrontEnd):
         """
         return await manager.memory.delete_memory(id)
 
-    @router.get("/memory/{id}")
-    async def get_memory(id: int) -> BaseResponseModel[SleepMemoryModel]:
-        """Получить память по ID
+    @router.get("/memory/{id}", response_model=BaseResponseModel[SleepMemoryModel])
+    async def get_memory(id: int, request: Request):
+        """Получить память по ID.
+        Ответ содержит ETag и Last-Modified, на условный запрос с актуальной версией возвращается 304.
 
         Args:
             id (int): Уникальный идентификатор воспоминания.
@@ -60,7 +181,206 @@ def create_api(manager: CreateMemoryManager, frontend: FrontEnd):
         Returns:
             BaseResponseModel[SleepMemoryModel]: Модель ответа с воспоминанием.
         """
-        return await manager.memory.get_memory(id)
+        response = await manager.memory.get_memory(id)
+        if not response.success:
+            return response
+
+        body = response.model_dump_json().encode()
+        last_modified = (
+            response.content.updated_at or response.content.created_at
+        ).astimezone(timezone.utc)
+        headers = {
+            "ETag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            "Last-Modified": format_datetime(last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+        if not_modified(request, headers["ETag"], last_modified):
+            return Response(status_code=304, headers=headers)
+
+        return Response(body, media_type="application/json", headers=headers)
+
+    @router.get("/memory/{id}/similar")
+    async def similar_memories(
+        id: int, limit: int = Query(default=5, ge=1, le=50)
+    ) -> BaseResponseModel[SimilarPageModel]:
+        """Похожие воспоминания по тексту названия и содержания
+
+        Args:
+            id (int): Уникальный идентификатор воспоминания.
+            limit (int): Сколько похожих вернуть.
+
+        Raises:
+            HTTPException: Если воспоминание не найдено.
+
+        Returns:
+            BaseResponseModel[SimilarPageModel]: Похожие воспоминания, от самых похожих.
+        """
+        response = await manager.similar.similar(id, limit=limit)
+        if not response.success:
+            raise HTTPException(status_code=404, detail=response.message)
+
+        return response
+
+    @router.get("/memories")
+    async def list_memories(
+        limit: int = Query(default=20, ge=1, le=100),
+        cursor: str | None = None,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        fields: str | None = None,
+    ) -> BaseResponseModel[SleepMemoryPageModel]:
+        """Список воспоминаний от новых к старым с пагинацией по курсору
+
+        Args:
+            limit (int): Размер страницы.
+            cursor (str | None): Курсор `next_cursor` из предыдущей страницы.
+            date_from (datetime | None): Не раньше этой даты.
+            date_to (datetime | None): Раньше этой даты.
+            fields (str | None): Поля через запятую, например `id,title,created_at`.
+
+        Raises:
+            HTTPException: Если курсор или поля указаны неверно.
+
+        Returns:
+            BaseResponseModel[SleepMemoryPageModel]: Страница воспоминаний.
+        """
+        response = await manager.memory.list_memories(
+            limit=limit,
+            cursor=cursor,
+            date_from=date_from,
+            date_to=date_to,
+            fields=[field.strip() for field in fields.split(",") if field.strip()]
+            if fields
+            else None,
+        )
+        if not response.success:
+            raise HTTPException(status_code=400, detail=response.message)
+
+        return response
+
+    @router.post("/memories/bulk", dependencies=[Depends(verify_admin)])
+    async def bulk_memories(
+        request: MemoryBulkRequestModel,
+    ) -> BaseResponseModel[MemoryBulkResultModel]:
+        """Пакетное создание, изменение и удаление воспоминаний в одной транзакции.
+        Требует заголовок X-Admin-Token.
+
+        Args:
+            request (MemoryBulkRequestModel): Операции `create`, `update` и `delete`.
+
+        Raises:
+            HTTPException: Если транзакция не удалась, тогда не применена ни одна операция.
+
+        Returns:
+            BaseResponseModel[MemoryBulkResultModel]: Результат каждой операции в порядке запроса.
+        """
+        response = await manager.memory.bulk(request.operations)
+        if not response.success:
+            raise HTTPException(status_code=500, detail=response.message)
+
+        return response
+
+    @router.get(
+        "/export",
+        response_class=StreamingResponse,
+        dependencies=[Depends(verify_admin)],
+    )
+    async def export_memories(
+        format: ExportFormat = ExportFormat.NDJSON,
+        gzip: bool = False,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        after_id: int | None = None,
+    ):
+        """Потоковая выгрузка всех воспоминаний по возрастанию id.
+        Прерванную выгрузку можно продолжить, передав id последней полученной строки в `after_id`.
+        Требует заголовок X-Admin-Token.
+
+        Args:
+            format (ExportFormat): `ndjson` или `csv`.
+            gzip (bool): Сжимать выгрузку gzip на лету.
+            date_from (datetime | None): Не раньше этой даты.
+            date_to (datetime | None): Раньше этой даты.
+            after_id (int | None): Продолжить после воспоминания с этим id.
+        """
+        media_type = (
+            "application/x-ndjson" if format == ExportFormat.NDJSON else "text/csv"
+        )
+        filename = f"memories.{format}"
+        if gzip:
+            media_type, filename = "application/gzip", f"{filename}.gz"
+
+        return StreamingResponse(
+            exporter.export(
+                format=format,
+                date_from=date_from,
+                date_to=date_to,
+                after_id=after_id,
+                gzip=gzip,
+            ),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    @router.post("/import", dependencies=[Depends(verify_admin)])
+    async def import_memories(
+        request: Request,
+        analyze: bool = False,
+        publish: bool = False,
+        rpm: int | None = None,
+    ) -> ImportReportModel:
+        """Массовый импорт воспоминаний из NDJSON в теле запроса, по одному SleepMemoryBaseModel в строке.
+        AI не вызывается во время импорта. Требует заголовок X-Admin-Token.
+
+        Args:
+            request (Request): Запрос с телом в формате NDJSON.
+            analyze (bool): После импорта запустить повторный анализ воспоминаний без ответа AI в фоне.
+            publish (bool): Публиковать в Telegraph воспоминания с ответом AI, сразу или после анализа.
+            rpm (int | None): Максимум запросов к AI в минуту для анализа.
+
+        Returns:
+            ImportReportModel: Отчёт со скоростью и ошибками по номерам строк.
+        """
+        report = await importer.import_lines(
+            importer.split_lines(request.stream()), publish=publish
+        )
+        if publish:
+            manager.publisher.notify()
+
+        if analyze and report.imported:
+            try:
+                backfill.start(rpm=rpm, publish=publish)
+            except RuntimeError:
+                # уже запущенный анализ дойдёт до новых строк, их id больше контрольной точки
+                pass
+            report.analysis_queued = True
+
+        return report
+
+    @router.get("/search")
+    async def search_memories(
+        q: str,
+        limit: int = Query(default=10, ge=1, le=50),
+        offset: int = Query(default=0, ge=0),
+    ) -> BaseResponseModel[SearchPageModel]:
+        """Полнотекстовый поиск по названию, содержанию и ответу AI
+
+        Args:
+            q (str): Поисковый запрос.
+            limit (int): Размер страницы.
+            offset (int): Сколько результатов пропустить, `next_offset` из предыдущей страницы.
+
+        Raises:
+            HTTPException: Если запрос пустой.
+
+        Returns:
+            BaseResponseModel[SearchPageModel]: Найденные воспоминания с подсвеченными фрагментами.
+        """
+        response = await manager.search.search(q, limit=limit, offset=offset)
+        if not response.success:
+            raise HTTPException(status_code=400, detail=response.message)
+
+        return response
 
     @router.patch("/memory/{id}")
     async def update_memory(
@@ -84,4 +404,62 @@ def create_api(manager: CreateMemoryManager, frontend: FrontEnd):
             return PlainTextResponse(config.bot_url)
         raise HTTPException(404, "Бот не указан.")
 
+    @admin.post("/backfill", status_code=202)
+    async def start_backfill(
+        concurrency: int | None = None,
+        rpm: int | None = None,
+        batch_size: int | None = None,
+        resume: bool = True,
+        publish: bool = False,
+    ) -> BackfillReportModel:
+        """Запустить повторный анализ воспоминаний без ответа AI в фоне
+
+        Args:
+            concurrency (int | None): Сколько запросов к AI выполнять одновременно.
+            rpm (int | None): Максимум запросов к AI в минуту.
+            batch_size (int | None): Размер пачки для чтения и записи.
+            resume (bool): Продолжить с контрольной точки, иначе начать сначала.
+            publish (bool): Поставить проанализированные воспоминания без страницы в очередь Telegraph.
+
+        Raises:
+            HTTPException: Если повторный анализ уже запущен.
+
+        Returns:
+            BackfillReportModel: Текущий отчёт.
+        """
+        try:
+            backfill.start(
+                concurrency=concurrency,
+                rpm=rpm,
+                batch_size=batch_size,
+                resume=resume,
+                publish=publish,
+            )
+        except RuntimeError as e:
+            raise HTTPException(409, str(e))
+
+        return backfill.report
+
+    @admin.get("/backfill")
+    async def get_backfill() -> BackfillReportModel:
+        """Получить отчёт о последнем повторном анализе"""
+        return backfill.report
+
+    @admin.post("/search/rebuild")
+    async def rebuild_search() -> BaseResponseModel[None]:
+        """Перестроить поисковый индекс по существующим воспоминаниям"""
+        if not await manager.search.rebuild():
+            raise HTTPException(409, "Полнотекстовый поиск недоступен.")
+
+        return BaseResponseModel(success=True, message="Поисковый индекс перестроен")
+
+    @admin.post("/similar/rebuild")
+    async def rebuild_similar() -> BaseResponseModel[None]:
+        """Перестроить индекс похожих снов по существующим воспоминаниям"""
+        count = await manager.similar.rebuild()
+        return BaseResponseModel(
+            success=True, message=f"Индекс похожих снов перестроен ({count} шт.)"
+        )
+
     frontend.add_router(router)
+    frontend.add_router(admin)
@@ -0,0 +1,270 @@
+import gzip
+import hashlib
+import mimetypes
+import re
+import time
+
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import Request
+from fastapi.responses import Response
+from loguru import logger
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+_STATIC_URL = re.compile(r"/static/([\w./-]+)")
+
+COMPRESSIBLE = {
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+    "image/x-icon",
+    "image/vnd.microsoft.icon",
+    "text/javascript",
+}
+"""Типы кроме text/*, которые имеет смысл сжимать."""
+
+
+@dataclass
+class Asset:
+    """Файл фронтенда в памяти вместе со сжатыми вариантами"""
+
+    body: bytes
+    media_type: str
+    etag: str
+    gzip: bytes | None = None
+    br: bytes | None = None
+
+    @classmethod
+    def create(cls, body: bytes, media_type: str, quality: int = 11) -> "Asset":
+        """Посчитать хэш содержимого и заранее сжать файл
+
+        Args:
+            body (bytes): содержимое файла
+            media_type (str): MIME тип
+            quality (int, optional): степень сжатия brotli, 11 - максимальная. Обычное состояние 11.
+
+        Returns:
+            Asset: Файл с ETag и сжатыми вариантами, если сжатие даёт выигрыш.
+        """
+        asset = cls(
+            body=body,
+            media_type=media_type,
+            etag=hashlib.blake2b(body, digest_size=8).hexdigest(),
+        )
+        if len(body) < AssetStore.MIN_COMPRESS_SIZE or not (
+            media_type.startswith("text/") or media_type in COMPRESSIBLE
+        ):
+            return asset
+
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            asset.gzip = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=quality)
+            if len(compressed) < len(body):
+                asset.br = compressed
+        return asset
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        """Ответ с подходящим под Accept-Encoding вариантом файла
+
+        Args:
+            request (Request): Запрос.
+            cache_control (str): Значение заголовка Cache-Control.
+
+        Returns:
+            Response: Ответ 200 или 304, если у клиента уже есть этот файл.
+        """
+        accept = request.headers.get("accept-encoding", "")
+        body, encoding = self.body, None
+        if self.br is not None and "br" in accept:
+            body, encoding = self.br, "br"
+        elif self.gzip is not None and "gzip" in accept:
+            body, encoding = self.gzip, "gzip"
+
+        etag = f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if self.gzip is not None or self.br is not None:
+            headers["Vary"] = "Accept-Encoding"
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and etag in (
+            tag.strip() for tag in if_none_match.split(",")
+        ):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+class AssetStore:
+    """Статика и HTML страницы фронтенда в памяти.
+
+    Файлы читаются и сжимаются (gzip, brotli) один раз при запуске. Каждый
+    статический файл доступен по адресу с хэшем содержимого, например
+    /static/css/style.3f2a9c1d0b4e5f67.css, такие ответы кэшируются браузером
+    навсегда (immutable). Ссылки на /static/... в HTML страницах заменяются
+    на адреса с хэшем. В режиме разработки файлы перечитываются при изменении.
+    """
+
+    MIN_COMPRESS_SIZE = 512
+    """Файлы меньше этого размера (в байтах) не сжимаются."""
+
+    IMMUTABLE = "public, max-age=31536000, immutable"
+    """Cache-Control для адресов с хэшем содержимого."""
+
+    REVALIDATE = "no-cache"
+    """Cache-Control для адресов без хэша, браузер сверяет ETag."""
+
+    CHECK_INTERVAL = 1.0
+    """Как часто (в секундах) в режиме разработки проверять изменения файлов."""
+
+    def __init__(self, static: Path, templates: Path, dev: bool = False):
+        """Инцилизация, файлы сразу загружаются в память
+
+        Args:
+            static (Path): Папка со статикой.
+            templates (Path): Папка с HTML страницами.
+            dev (bool, optional): Перечитывать файлы при изменении. Обычное состояние False.
+        """
+        self.static = static
+        self.templates = templates
+        self.dev = dev
+        self._assets: dict[str, Asset] = {}
+        self._fingerprinted: dict[str, Asset] = {}
+        self._urls: dict[str, str] = {}
+        self._pages: dict[str, Asset] = {}
+        self._templates: dict[str, str] = {}
+        self._mtimes: dict[Path, float] = {}
+        self._checked = 0.0
+        self.load()
+
+    def load(self) -> None:
+        """Прочитать, сжать и проиндексировать все файлы"""
+        assets: dict[str, Asset] = {}
+        fingerprinted: dict[str, Asset] = {}
+        urls: dict[str, str] = {}
+        for path in sorted(self.static.rglob("*")):
+            if not path.is_file():
+                continue
+            name = path.relative_to(self.static).as_posix()
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            asset = Asset.create(path.read_bytes(), media_type)
+            stem, dot, suffix = name.rpartition(".")
+            hashed = f"{stem}.{asset.etag}.{suffix}" if dot else f"{name}.{asset.etag}"
+            assets[name] = asset
+            fingerprinted[hashed] = asset
+            urls[name] = f"/static/{hashed}"
+
+        self._assets, self._fingerprinted, self._urls = assets, fingerprinted, urls
+        self._templates = {
+            path.name: self.rewrite(path.read_text(encoding="utf-8"))
+            for path in self.templates.glob("*.html")
+        }
+        self._pages = {
+            name: Asset.create(html.encode(), "text/html; charset=utf-8")
+            for name, html in self._templates.items()
+        }
+        self._mtimes = self._scan()
+        logger.info(
+            f"Статика загружена в память ({len(assets)} файлов, {len(self._pages)} страниц)"
+        )
+
+    def url(self, name: str) -> str:
+        """Адрес статического файла с хэшем содержимого
+
+        Args:
+            name (str): путь внутри папки static, например css/style.css
+
+        Returns:
+            str: Адрес с хэшем или обычный адрес, если файла нет.
+        """
+        self._reload_changed()
+        return self._urls.get(name, f"/static/{name}")
+
+    def rewrite(self, html: str) -> str:
+        """Заменить ссылки /static/... в HTML на адреса с хэшем
+
+        Args:
+            html (str): HTML
+
+        Returns:
+            str: HTML со ссылками на адреса с хэшем.
+        """
+        return _STATIC_URL.sub(
+            lambda match: self._urls.get(match.group(1), match.group(0)), html
+        )
+
+    def template(self, name: str) -> str | None:
+        """HTML страница как шаблон, ссылки на статику уже заменены на адреса с хэшем
+
+        Args:
+            name (str): имя файла в папке templates
+
+        Returns:
+            str | None: HTML или None, если страницы нет.
+        """
+        self._reload_changed()
+        return self._templates.get(name)
+
+    def page(self, name: str, request: Request) -> Response | None:
+        """Ответ с HTML страницей
+
+        Args:
+            name (str): имя файла в папке templates
+            request (Request): Запрос.
+
+        Returns:
+            Response | None: Ответ или None, если страницы нет.
+        """
+        self._reload_changed()
+        page = self._pages.get(name)
+        if page is None:
+            return None
+        return page.response(request, self.REVALIDATE)
+
+    def static_file(self, path: str, request: Request) -> Response | None:
+        """Ответ со статическим файлом
+
+        Args:
+            path (str): путь внутри папки static, с хэшем или без
+            request (Request): Запрос.
+
+        Returns:
+            Response | None: Ответ или None, если файла нет.
+        """
+        self._reload_changed()
+        asset = self._fingerprinted.get(path)
+        if asset is not None:
+            return asset.response(request, self.IMMUTABLE)
+
+        asset = self._assets.get(path)
+        if asset is not None:
+            return asset.response(request, self.REVALIDATE)
+        return None
+
+    def _scan(self) -> dict[Path, float]:
+        return {
+            path: path.stat().st_mtime
+            for folder in (self.static, self.templates)
+            for path in folder.rglob("*")
+            if path.is_file()
+        }
+
+    def _reload_changed(self) -> None:
+        if not self.dev:
+            return
+        now = time.monotonic()
+        if now - self._checked < self.CHECK_INTERVAL:
+            return
+        self._checked = now
+        if self._scan() != self._mtimes:
+            logger.info("Файлы фронтенда изменились, перечитываю")
+            self.load()
@@ -1,12 +1,16 @@
 from pathlib import Path
 
-import aiofiles
-
 from fastapi import FastAPI, APIRouter
 from fastapi import Request
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+from ..core import config
 from ..core.manager.create_memory import CreateMemoryManager
+from ._assets import AssetStore
+from ._metrics import MetricsMiddleware
+from ._tracing import TracingMiddleware
+from ._pages import MemoryPages
 
 
 app = FastAPI()
@@ -15,13 +19,17 @@ app = FastAPI()
 class FrontEnd:
     def __init__(self, manager: CreateMemoryManager):
         self._app = FastAPI()
+        self._app.add_middleware(TracingMiddleware)
+        self._app.add_middleware(MetricsMiddleware)
         self.manager = manager
+        self.assets = AssetStore(
+            Path(__file__).parent / "static",
+            Path(__file__).parent / "templates",
+            dev=config.frontend_dev,
+        )
+        self.pages = MemoryPages(manager.memory, self.assets)
         self.register_handlers()
 
-        self._index_path = Path(__file__).parent / "templates" / "index.html"
-        self._memory_path = Path(__file__).parent / "templates" / "memory.html"
-        self._static_path = Path(__file__).parent / "static"
-
     def register_handlers(self):
         """Регистрирует хэндлеры"""
         self.app.add_api_route(
@@ -40,33 +48,36 @@ class FrontEnd:
             "/static/{path:path}",
             self._get_feature,
             methods=["GET"],
-            response_class=FileResponse,
             tags=["static"],
         )
 
+        self.app.add_api_route(
+            "/metrics",
+            self.metrics,
+            methods=["GET"],
+            include_in_schema=False,
+        )
+
     async def index(self, request: Request):
-        if self._index_path.exists():
-            async with aiofiles.open(self._index_path, "rb") as f:
-                return HTMLResponse(await f.read(), status_code=200)
-        else:
+        response = self.assets.page("index.html", request)
+        if response is None:
             return HTMLResponse(
                 content="Не удалось получить index.html", status_code=500
             )
+        return response
 
     async def memory(self, id: int, request: Request):
-        if self._static_path.exists():
-            async with aiofiles.open(self._memory_path, "rb") as f:
-                return HTMLResponse(await f.read(), status_code=200)
-        else:
-            return HTMLResponse(
-                content=f"Не удалось получить восопмиание под ID {id}", status_code=500
-            )
+        return await self.pages.response(id, request)
+
+    async def _get_feature(self, path: str, request: Request):
+        response = self.assets.static_file(path, request)
+        if response is None:
+            return HTMLResponse(content="Не удалось получить файл", status_code=404)
+        return response
 
-    async def _get_feature(self, path: str):
-        if (self._static_path / path).is_file():
-            return FileResponse(self._static_path / path)
-        else:
-            return HTMLResponse(content="Не удалось получить файл", status_code=500)
+    async def metrics(self):
+        """Метрики в формате Prometheus"""
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
     def add_router(self, router: APIRouter):
         """Добавить роутер
@@ -0,0 +1,45 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS
+
+
+class MetricsMiddleware:
+    """ASGI middleware с метриками HTTP запросов.
+    Маршрут в метках - шаблон пути (/api/memory/{id}), а не сам путь,
+    поэтому количество рядов метрик не растёт с количеством воспоминаний."""
+
+    def __init__(self, app: ASGIApp):
+        """Инцилизация
+
+        Args:
+            app (ASGIApp): Приложение.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_LATENCY.labels(scope["method"], path).observe(
+                time.perf_counter() - started
+            )
+            HTTP_REQUESTS.labels(scope["method"], path, str(status)).inc()
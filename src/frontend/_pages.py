@@ -0,0 +1,176 @@
+import html
+import json
+
+from datetime import datetime
+from string import Template
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+
+from ..core import config
+from ..core.abstract.memory import MemoryListener
+from ..core.entites.schemas import SleepMemoryModel
+from ..core.manager.memory import MemoryManager
+from ..core.utils import LRUCache
+from ._assets import Asset, AssetStore
+from ._sanitize import sanitize_telegram_html
+
+
+MONTHS = (
+    "января",
+    "февраля",
+    "марта",
+    "апреля",
+    "мая",
+    "июня",
+    "июля",
+    "августа",
+    "сентября",
+    "октября",
+    "ноября",
+    "декабря",
+)
+
+
+class MemoryPages(MemoryListener):
+    """Страницы воспоминаний, отрисованные на сервере.
+
+    Воспоминание подставляется прямо в memory.html вместе с Open Graph тегами
+    для превью ссылок, поэтому страница готова без JavaScript и без запросов к API.
+    Готовые страницы вместе со сжатыми вариантами лежат в LRU-кэше и убираются
+    из него, когда воспоминание меняется или удаляется. Изменения из других
+    процессов, например из cli.py, видны через MEMORY_CACHE_TTL секунд.
+    """
+
+    TEMPLATE = "memory.html"
+    """Шаблон страницы в папке templates."""
+
+    DESCRIPTION_LENGTH = 200
+    """Длина описания для превью ссылки."""
+
+    BROTLI_QUALITY = 5
+    """Степень сжатия brotli для страниц, максимальная слишком медленная для каждой страницы."""
+
+    def __init__(
+        self, memory: MemoryManager, assets: AssetStore, cache_size: int | None = None
+    ):
+        """Инцилизация, кэш сразу подписывается на изменения воспоминаний
+
+        Args:
+            memory (MemoryManager): Менеджер воспоминаний.
+            assets (AssetStore): Статика и шаблоны фронтенда.
+            cache_size (int | None, optional): Размер кэша страниц, если не указан берётся из config. Обычное состояние None.
+        """
+        self.memory = memory
+        self.assets = assets
+        self._cache: LRUCache[int, tuple[str, Asset]] = LRUCache(
+            config.memory_page_cache_size if cache_size is None else cache_size,
+            ttl=config.memory_cache_ttl,
+        )
+        self._template: str | None = None
+        self._version = 0
+        memory.add_listener(self)
+
+    async def response(self, memory_id: int, request: Request) -> Response:
+        """Ответ со страницей воспоминания
+
+        Args:
+            memory_id (int): идентификатор воспоминания
+            request (Request): Запрос.
+
+        Returns:
+            Response: Страница, 304 если она не изменилась, или 404.
+        """
+        template = self.assets.template(self.TEMPLATE)
+        if template is None:
+            return HTMLResponse(
+                content=f"Не удалось получить восопмиание под ID {memory_id}",
+                status_code=500,
+            )
+        if template is not self._template:
+            self._template = template
+            self._cache.clear()
+
+        base_url = str(request.base_url)
+        cached = self._cache.get(memory_id)
+        if cached is not None and cached[0] == base_url:
+            page = cached[1]
+        else:
+            version = self._version
+            response = await self.memory.get_memory(memory_id)
+            if not response.success:
+                return HTMLResponse(
+                    content=f'{html.escape(response.message)}. <a href="/">На главную</a>',
+                    status_code=404,
+                )
+
+            page = Asset.create(
+                self.render(template, response.content, base_url).encode(),
+                "text/html; charset=utf-8",
+                quality=self.BROTLI_QUALITY,
+            )
+            if version == self._version:
+                self._cache.set(memory_id, (base_url, page))
+
+        return page.response(request, AssetStore.REVALIDATE)
+
+    def render(self, template: str, memory: SleepMemoryModel, base_url: str) -> str:
+        """Подставить воспоминание в шаблон
+
+        Args:
+            template (str): HTML шаблон
+            memory (SleepMemoryModel): воспоминание
+            base_url (str): адрес сайта со слэшем на конце, для абсолютных ссылок Open Graph
+
+        Returns:
+            str: Готовая страница.
+        """
+        description = " ".join(memory.content.split())
+        if len(description) > self.DESCRIPTION_LENGTH:
+            description = description[: self.DESCRIPTION_LENGTH - 1].rstrip() + "…"
+
+        links = []
+        if memory.telegraph_url:
+            links.append(
+                f'<a href="{html.escape(memory.telegraph_url)}" class="telegram telegraph">Пост в Telegraph</a>'
+            )
+        if config.bot_url:
+            links.append(
+                f'<a href="{html.escape(config.bot_url)}?start={memory.id}" class="telegram phone">Версия для телеграм</a>'
+            )
+
+        data = json.dumps(memory.model_dump(mode="json"), ensure_ascii=False).replace(
+            "<", "\\u003c"
+        )
+
+        return Template(template).safe_substitute(
+            title=html.escape(memory.title),
+            description=html.escape(description),
+            url=html.escape(f"{base_url}memory/{memory.id}"),
+            image=html.escape(
+                base_url + self.assets.url("images/icon.png").removeprefix("/")
+            ),
+            content=html.escape(memory.content),
+            # ai_thoughts меняется через API, поэтому в страницу попадает только разметка Telegram
+            ai_thoughts=sanitize_telegram_html(memory.ai_thoughts or ""),
+            created_at=memory.created_at.isoformat(),
+            created_at_text=self.format_date(memory.created_at),
+            links="\n            <br>\n            ".join(links),
+            data=data,
+        )
+
+    @staticmethod
+    def format_date(date: datetime) -> str:
+        """Дата в виде "2026 года 18 октября в 12:30", как на странице раньше"""
+        return f"{date.year} года {date.day} {MONTHS[date.month - 1]} в {date:%H:%M}"
+
+    async def memory_saved(self, memory: SleepMemoryModel) -> None:
+        self.memories_invalidated(memory.id)
+
+    async def memory_deleted(self, memory: SleepMemoryModel) -> None:
+        self.memories_invalidated(memory.id)
+
+    def memories_invalidated(self, *memory_ids: int) -> None:
+        self._version += 1
+        for memory_id in memory_ids:
+            self._cache.pop(memory_id)
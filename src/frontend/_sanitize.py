@@ -0,0 +1,94 @@
+import html
+
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+
+TELEGRAM_TAGS = {
+    "b": (),
+    "strong": (),
+    "i": (),
+    "em": (),
+    "u": (),
+    "ins": (),
+    "s": (),
+    "strike": (),
+    "del": (),
+    "span": ("class",),
+    "tg-spoiler": (),
+    "a": ("href",),
+    "code": ("class",),
+    "pre": (),
+    "blockquote": ("expandable",),
+}
+"""Теги HTML разметки Telegram и их допустимые атрибуты."""
+
+DROP_CONTENT = {"script", "style", "iframe", "object", "embed", "template"}
+"""Теги, которые удаляются вместе с содержимым."""
+
+LINK_SCHEMES = {"http", "https", "tg", "mailto"}
+"""Схемы ссылок, которые остаются в href."""
+
+
+class _TelegramHTML(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.open: list[str] = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in DROP_CONTENT:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in TELEGRAM_TAGS:
+            return
+
+        allowed = TELEGRAM_TAGS[tag]
+        rendered = ""
+        for name, value in attrs:
+            if name not in allowed:
+                continue
+            scheme = urlparse(value or "").scheme.lower()
+            if name == "href" and scheme not in LINK_SCHEMES:
+                continue
+            rendered += (
+                f" {name}" if value is None else f' {name}="{html.escape(value)}"'
+            )
+        self.parts.append(f"<{tag}{rendered}>")
+        self.open.append(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in DROP_CONTENT:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open:
+            return
+        while self.open:
+            name = self.open.pop()
+            self.parts.append(f"</{name}>")
+            if name == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if not self.dropping:
+            self.parts.append(html.escape(data, quote=False))
+
+
+def sanitize_telegram_html(text: str) -> str:
+    """Оставить в HTML только разметку Telegram: остальные теги и атрибуты
+    удаляются (script и подобные вместе с содержимым), текст экранируется,
+    незакрытые теги закрываются.
+
+    Args:
+        text (str): HTML, например ответ AI.
+
+    Returns:
+        str: HTML, который можно вставить в страницу.
+    """
+    parser = _TelegramHTML()
+    parser.feed(text)
+    parser.close()
+    return "".join(parser.parts) + "".join(
+        f"</{name}>" for name in reversed(parser.open)
+    )
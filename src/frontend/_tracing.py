@@ -0,0 +1,47 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.tracing import trace
+
+
+class TracingMiddleware:
+    """ASGI middleware, которое начинает трассу на каждый выбранный HTTP запрос.
+    Идентификатор трассы возвращается в заголовке X-Trace-Id."""
+
+    def __init__(self, app: ASGIApp):
+        """Инцилизация
+
+        Args:
+            app (ASGIApp): Приложение.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with trace("http", method=scope["method"]) as span:
+            if span is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set(status=message["status"])
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-trace-id", span.trace_id.encode()),
+                    ]
+                elif message["type"] == "http.response.body":
+                    span.set(
+                        response_bytes=span.attributes.get("response_bytes", 0)
+                        + len(message.get("body", b""))
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", "unmatched")
+                span.name = f"{scope['method']} {route}"
+                span.set(route=route, path=scope["path"])
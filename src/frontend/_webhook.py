@@ -0,0 +1,40 @@
+import hmac
+
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+
+from ..bot._bot import BaseMemoryBot
+from ._frontend import FrontEnd
+
+
+def create_webhook(frontend: FrontEnd, bot: BaseMemoryBot, path: str):
+    """Маршрут, через который Telegram присылает обновления боту
+
+    Args:
+        frontend (FrontEnd): Фронтенд, к приложению которого добавляется маршрут.
+        bot (BaseMemoryBot): Бот, в диспетчер которого передаются обновления.
+        path (str): Путь webhook, например /telegram/webhook.
+    """
+    router = APIRouter(tags=["telegram"])
+    secret = bot.webhook_secret.encode()
+
+    @router.post(path, include_in_schema=False)
+    async def telegram_webhook(
+        request: Request,
+        x_telegram_bot_api_secret_token: str | None = Header(default=None),
+    ):
+        """Принимает обновление и сразу отвечает 200,
+        обработка идёт в фоне, чтобы Telegram не ждал ответа AI."""
+        if not hmac.compare_digest(
+            (x_telegram_bot_api_secret_token or "").encode(), secret
+        ):
+            raise HTTPException(status_code=403, detail="Неверный секрет webhook")
+
+        try:
+            update = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Обновление не в формате JSON")
+
+        bot.feed_webhook_update(update)
+        return Response(status_code=200)
+
+    frontend.add_router(router)
@@ -1,24 +1,15 @@
-interface BaseResponse<T> {
-    success: boolean
-    message: string
-    content: T | null
-}
-
 interface SleepMemoryResponse {
     id: number
     title: string
     content: string
     ai_thoughts: string
     created_at: string
+    updated_at: string | null
     telegraph_url: string | null
 }
 
-interface MemoryResponse extends BaseResponse<SleepMemoryResponse> {}
-
-var href = document.location.href;
-var splitHref = href.split("/")
-
-const ID = splitHref[splitHref.length - 1]
+// Страница уже отрисована на сервере, скрипт только берёт данные воспоминания
+// из встроенного JSON и показывает дату создания в часовом поясе браузера.
 
 function formatDate(dateString: string) {
     const date = new Date(dateString);
@@ -39,103 +30,18 @@ function formatDate(dateString: string) {
     return `${year} года ${day} ${month} в ${hours}:${minutes}`;
 }
 
-async function getBot(): Promise<string | null> {
-    try {
-        var response = await fetch("/api/bot", {
-            headers: {
-                'accept': 'application/json'
-            }
-        });
-        if (response.status == 200) {
-            return await response.text()
-        }
-    } catch (error) {
-        console.log(error);
+function getMemory(): SleepMemoryResponse | null {
+    const data = document.getElementById("memory-data");
+    if (!data || !data.textContent) {
+        return null;
     }
-    return null
+    return JSON.parse(data.textContent) as SleepMemoryResponse;
 }
 
-async function LoadMemory(id: string | number) {
-    var response = await fetch(`/api/memory/${id}`, {
-        headers: {
-            'accept': 'application/json'
-        }
-    });
-    if (response.status != 200) {
-        return;
-    }
-    
-    const result = JSON.parse(await response.text()) as MemoryResponse
-    if (!result.success) {
-        console.log("Not Found!");
-        
-        alert(result.message);
-        window.location.href = "/";
-        return;
-    } else if (!result.content) {
-        alert("No content");
-        return
-    }
-    
-    const mainBox = document.querySelector("main");
-    if (!mainBox) {
-        alert("Не удалось найти элемент main");
-        return
-    } else {
-        var h1 = mainBox.querySelector("h1");
-        h1?.remove()
-    }
-
-    const infoBox = document.createElement("div");
-    
-    const title = document.createElement("h1");
-    title.textContent = result.content.title;
-
-    document.title = result.content.title;
-
-    const content = document.createElement("p");
-    content.setAttribute("class", "content-text")
-    content.textContent = result.content.content;
-
-    const aiText = document.createElement("p");
-    aiText.setAttribute("class", "ai-text");
-    aiText.innerHTML = result.content.ai_thoughts;
-
-    const createdAt = document.createElement("p");
-    createdAt.setAttribute("class", "created-at");
-    createdAt.textContent = formatDate(result.content.created_at);
-
-    const TelegraphUrl = document.createElement("a");
-    if (result.content.telegraph_url) {
-        TelegraphUrl.setAttribute("href", result.content.telegraph_url);
-        TelegraphUrl.setAttribute("class", "telegram telegraph");
-        TelegraphUrl.textContent = "Пост в Telegraph";
+document.addEventListener("DOMContentLoaded", () => {
+    const memory = getMemory();
+    const createdAt = document.querySelector(".created-at time");
+    if (memory && createdAt) {
+        createdAt.textContent = formatDate(memory.created_at);
     }
-    
-    var bot = await getBot()
-    const TelegramUrl = document.createElement("a");
-    if (bot) {
-        TelegramUrl.setAttribute("href", `${bot}?start=${id}`);
-        TelegramUrl.setAttribute("class", "telegram phone");
-        TelegramUrl.textContent = "Версия для телеграм";
-    }
-
-    console.log(result.content.telegraph_url);
-    
-    infoBox.appendChild(title);
-    infoBox.appendChild(content);
-    infoBox.appendChild(aiText);
-    infoBox.appendChild(createdAt);
-    if (result.content.telegraph_url) {
-        infoBox.appendChild(TelegraphUrl);
-    }
-    if (bot) {
-        infoBox.appendChild(document.createElement("br"))
-        infoBox.appendChild(TelegramUrl);
-    }
-    
-    mainBox.appendChild(infoBox);
-}
-
-
-LoadMemory(ID)
\ No newline at end of file
+});
@@ -29,7 +29,51 @@ async function startTitleSwap(loadingText, abortSignal) {
         await sleep(3000);
     }
 }
+async function WaitJob(id) {
+    while (true) {
+        const response = await fetch(`/api/jobs/${id}`, {
+            headers: {
+                'accept': 'application/json'
+            }
+        });
+        if (response.status !== 200) {
+            throw new Error("Не удалось получить статус задачи");
+        }
+        const result = JSON.parse(await response.text());
+        if (result.content && (result.content.status === "done" || result.content.status === "failed")) {
+            return result.content;
+        }
+        await sleep(2000);
+    }
+}
+// Показывает ответ AI по мере генерации, при обрыве соединения переходит на опрос статуса
+function StreamJob(id, output) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`/api/jobs/${id}/stream`);
+        let text = "";
+        source.addEventListener("chunk", (event) => {
+            text += JSON.parse(event.data).text;
+            if (output)
+                output.innerHTML = text;
+        });
+        source.addEventListener("done", (event) => {
+            source.close();
+            const result = JSON.parse(event.data);
+            if (result.content) {
+                resolve(result.content);
+            }
+            else {
+                reject(new Error(result.message));
+            }
+        });
+        source.onerror = () => {
+            source.close();
+            WaitJob(id).then(resolve, reject);
+        };
+    });
+}
 async function FetchCreateMemory(title, content) {
+    var _a;
     const loadingText = document.querySelector("span.loading-text");
     const abortController = new AbortController();
     try {
@@ -42,29 +86,34 @@ async function FetchCreateMemory(title, content) {
             },
             body: JSON.stringify({ title, content })
         });
-        abortController.abort();
-        await titleSwapPromise;
-        if (response.status !== 200) {
+        if (response.status !== 202) {
+            abortController.abort();
+            await titleSwapPromise;
             hideLoading(); // скрываем загрузку перед алертом
             alert("Ошибка во время добавления сна");
             return;
         }
         const result = JSON.parse(await response.text());
-        if (!result.success) {
+        if (!result.success || !result.content) {
+            abortController.abort();
+            await titleSwapPromise;
             hideLoading();
             alert(result.message);
             return;
         }
-        loadingText.innerText = "Готово!";
-        console.log(result.message);
-        if (result.content != null) {
-            // Редирект – загрузка остаётся видимой, страница уйдёт
-            window.location.href = "/memory/" + result.content.id;
-        }
-        else {
-            // На всякий случай, если нет контента, но success=true
+        // Сон принят, показываем ответ AI пока воркер его обрабатывает
+        const job = await StreamJob(result.content.id, document.querySelector("div.stream-text"));
+        abortController.abort();
+        await titleSwapPromise;
+        if (job.status === "failed" || job.memory_id == null) {
             hideLoading();
+            alert((_a = job.error) !== null && _a !== void 0 ? _a : "Ошибка во время добавления сна");
+            return;
         }
+        loadingText.innerText = "Готово!";
+        console.log(result.message);
+        // Редирект – загрузка остаётся видимой, страница уйдёт
+        window.location.href = "/memory/" + job.memory_id;
     }
     catch (error) {
         abortController.abort();
@@ -14,6 +14,15 @@ interface SleepMemoryResponse {
 
 interface MemoryResponse extends BaseResponse<SleepMemoryResponse> {}
 
+interface MemoryJob {
+    id: string
+    status: "pending" | "running" | "done" | "failed"
+    memory_id: number | null
+    error: string | null
+}
+
+interface JobResponse extends BaseResponse<MemoryJob> {}
+
 // Элементы управления загрузкой
 const loadingOverlay = document.getElementById('loadingOverlay') as HTMLDivElement;
 const submitBtn = document.getElementById('submitBtn') as HTMLButtonElement;
@@ -44,6 +53,51 @@ async function startTitleSwap(loadingText: HTMLElement, abortSignal?: AbortSigna
     }
 }
 
+async function WaitJob(id: string): Promise<MemoryJob> {
+    while (true) {
+        const response = await fetch(`/api/jobs/${id}`, {
+            headers: {
+                'accept': 'application/json'
+            }
+        });
+        if (response.status !== 200) {
+            throw new Error("Не удалось получить статус задачи");
+        }
+
+        const result = JSON.parse(await response.text()) as JobResponse;
+        if (result.content && (result.content.status === "done" || result.content.status === "failed")) {
+            return result.content;
+        }
+        await sleep(2000);
+    }
+}
+
+// Показывает ответ AI по мере генерации, при обрыве соединения переходит на опрос статуса
+function StreamJob(id: string, output: HTMLElement | null): Promise<MemoryJob> {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`/api/jobs/${id}/stream`);
+        let text = "";
+
+        source.addEventListener("chunk", (event) => {
+            text += JSON.parse((event as MessageEvent).data).text;
+            if (output) output.innerHTML = text;
+        });
+        source.addEventListener("done", (event) => {
+            source.close();
+            const result = JSON.parse((event as MessageEvent).data) as JobResponse;
+            if (result.content) {
+                resolve(result.content);
+            } else {
+                reject(new Error(result.message));
+            }
+        });
+        source.onerror = () => {
+            source.close();
+            WaitJob(id).then(resolve, reject);
+        };
+    });
+}
+
 async function FetchCreateMemory(title: string, content: string) {
     const loadingText = document.querySelector("span.loading-text") as HTMLElement;
     const abortController = new AbortController();
@@ -58,32 +112,40 @@ async function FetchCreateMemory(title: string, content: string) {
             },
             body: JSON.stringify({ title, content })
         });
-        abortController.abort();
-        await titleSwapPromise;
 
-        if (response.status !== 200) {
+        if (response.status !== 202) {
+            abortController.abort();
+            await titleSwapPromise;
             hideLoading(); // скрываем загрузку перед алертом
             alert("Ошибка во время добавления сна");
             return;
         }
 
-        const result = JSON.parse(await response.text()) as MemoryResponse;
-        if (!result.success) {
+        const result = JSON.parse(await response.text()) as JobResponse;
+        if (!result.success || !result.content) {
+            abortController.abort();
+            await titleSwapPromise;
             hideLoading();
             alert(result.message);
             return;
         }
 
-        loadingText.innerText = "Готово!";
-        console.log(result.message);
+        // Сон принят, показываем ответ AI пока воркер его обрабатывает
+        const job = await StreamJob(result.content.id, document.querySelector("div.stream-text"));
+        abortController.abort();
+        await titleSwapPromise;
 
-        if (result.content != null) {
-            // Редирект – загрузка остаётся видимой, страница уйдёт
-            window.location.href = "/memory/" + result.content.id;
-        } else {
-            // На всякий случай, если нет контента, но success=true
+        if (job.status === "failed" || job.memory_id == null) {
             hideLoading();
+            alert(job.error ?? "Ошибка во время добавления сна");
+            return;
         }
+
+        loadingText.innerText = "Готово!";
+        console.log(result.message);
+
+        // Редирект – загрузка остаётся видимой, страница уйдёт
+        window.location.href = "/memory/" + job.memory_id;
     } catch (error) {
         abortController.abort();
         loadingText.innerText = "Ошибка!";